@@ -0,0 +1,99 @@
+'''
+Compare JSON and protobuf decoding of events and encoding of calls
+
+Usage, from repository root::
+
+    PYTHONPATH=. python benchmark/bench_codec.py [--capture capture.recordio] [--offers 2000]
+
+Protobuf numbers require protobuf package and generated mesos v1 modules,
+see `mesoshttp.codec.ProtobufCodec`.
+'''
+from __future__ import print_function
+
+import argparse
+import sys
+import timeit
+
+from mesoshttp.codec import JsonCodec, ProtobufCodec
+from mesoshttp.exception import MesosException
+
+import payloads
+
+
+def accept_call(offer):
+    return {
+        'framework_id': {'value': offer['framework_id']['value']},
+        'type': 'ACCEPT',
+        'accept': {
+            'offer_ids': [{'value': offer['id']['value']}],
+            'operations': [{
+                'type': 'LAUNCH',
+                'launch': {'task_infos': [{
+                    'name': 'benchmark',
+                    'task_id': {'value': offer['id']['value'] + '-task'},
+                    'agent_id': offer['agent_id'],
+                    'resources': offer['resources'][:2],
+                    'command': {'value': 'sleep 10'}
+                }]}
+            }]
+        }
+    }
+
+
+def measure(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON vs protobuf codec benchmark')
+    parser.add_argument('--capture', help='RecordIO JSON capture of a scheduler stream')
+    parser.add_argument('--offers', type=int, default=2000, help='offers in synthetic OFFERS event')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--proto-module', default='mesos.v1.scheduler.scheduler_pb2')
+    args = parser.parse_args()
+
+    if args.capture:
+        records = payloads.read_capture(args.capture)
+    else:
+        records = [
+            payloads.encode_event(payloads.make_offers_event(args.offers)),
+            payloads.encode_event(payloads.make_update_event())
+        ]
+
+    json_codec = JsonCodec()
+    proto_codec = None
+    try:
+        proto_codec = ProtobufCodec(args.proto_module)
+    except MesosException as e:
+        print('Protobuf codec not available: %s' % (str(e)))
+
+    events = [json_codec.decode(record) for record in records]
+    offers = []
+    for event in events:
+        if event['type'] == 'OFFERS':
+            offers.extend(event['offers']['offers'])
+    calls = [accept_call(offer) for offer in offers]
+
+    print('%-24s %10s %12s %12s' % ('payload', 'bytes', 'json (ms)', 'proto (ms)'))
+    for record, event in zip(records, events):
+        json_time = measure(lambda: json_codec.decode(record), args.repeat)
+        line = '%-24s %10d %12.3f' % ('decode ' + event['type'], len(record), json_time * 1000)
+        if proto_codec is not None:
+            message = proto_codec._json_format.ParseDict(event, proto_codec._event(), ignore_unknown_fields=True)
+            proto_record = message.SerializeToString()
+            proto_time = measure(lambda: proto_codec.decode(proto_record), args.repeat)
+            line += ' %12.3f (%d bytes)' % (proto_time * 1000, len(proto_record))
+        print(line)
+
+    if calls:
+        json_time = measure(lambda: [json_codec.encode(call) for call in calls], args.repeat)
+        line = '%-24s %10d %12.3f' % ('encode ACCEPT', len(calls), json_time * 1000)
+        if proto_codec is not None:
+            proto_time = measure(lambda: [proto_codec.encode(call) for call in calls], args.repeat)
+            line += ' %12.3f' % (proto_time * 1000)
+        print(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
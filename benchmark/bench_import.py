@@ -0,0 +1,75 @@
+'''
+Measure cold import time and memory of mesoshttp.client
+
+Each measure imports the module in a new interpreter. Optional dependencies
+(kazoo, jwt, cryptography) must not be loaded by the import.
+
+Usage, from repository root::
+
+    PYTHONPATH=. python benchmark/bench_import.py [--runs 10] [--max-ms 300]
+
+Exit code is 1 if an optional dependency is loaded or if median import time
+is over --max-ms.
+'''
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+OPTIONAL_MODULES = ['kazoo', 'jwt', 'cryptography', 'google.protobuf']
+
+CHILD = '''
+import json, resource, sys, time
+start = time.time()
+import %(module)s
+elapsed = time.time() - start
+print(json.dumps({
+    'time': elapsed,
+    'maxrss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': [name for name in %(optional)r if name in sys.modules]
+}))
+'''
+
+
+def measure(module):
+    code = CHILD % {'module': module, 'optional': OPTIONAL_MODULES}
+    output = subprocess.check_output([sys.executable, '-c', code], env=os.environ.copy())
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='mesoshttp import time benchmark')
+    parser.add_argument('--module', default='mesoshttp.client')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, default=None, help='fail if median import time is higher')
+    args = parser.parse_args()
+
+    baseline = [measure('json') for i in range(args.runs)]
+    results = [measure(args.module) for i in range(args.runs)]
+
+    import_time = median([result['time'] for result in results]) * 1000
+    maxrss = median([result['maxrss'] for result in results])
+    base_maxrss = median([result['maxrss'] for result in baseline])
+    loaded = sorted(set(name for result in results for name in result['modules']))
+
+    print('%-24s %12s %16s' % ('module', 'import (ms)', 'max rss (KB)'))
+    print('%-24s %12.1f %16d (+%d)' % (args.module, import_time, maxrss, maxrss - base_maxrss))
+    if loaded:
+        print('Optional dependencies loaded: %s' % (', '.join(loaded)))
+        return 1
+    if args.max_ms is not None and import_time > args.max_ms:
+        print('Import time over %.1f ms' % (args.max_ms))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+'''
+Micro-benchmarks of stream parsing, event dispatch and calls building
+
+Calls are answered by a `payloads.NullSession`, no master is needed.
+Results can be saved as a baseline and compared with a later run to
+measure a change on the client hot paths::
+
+    PYTHONPATH=. python benchmark/bench_micro.py --save before.json
+    # change code
+    PYTHONPATH=. python benchmark/bench_micro.py --compare before.json --max-ratio 1.10
+
+Use --capture to add benchmarks on records of a captured scheduler stream
+(see `payloads.read_capture`) and --filter to run a subset of benchmarks.
+
+The same benchmarks run with pytest-benchmark in tests/test_benchmarks.py.
+'''
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+import timeit
+
+from mesoshttp.client import MesosClient
+from mesoshttp.core import MesosContext
+from mesoshttp.offers import Offer
+from mesoshttp.stream import decode_record, iter_records
+from mesoshttp.update import Update
+
+import payloads
+
+OFFERS_SIZES = (10, 100, 1000)
+# Size of chunks read from master connection
+CHUNK_SIZE = 65536
+
+
+def chunks(data, size=CHUNK_SIZE):
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+
+def make_client(session):
+    client = MesosClient(mesos_urls=['http://127.0.0.1:5050'])
+    client.set_session(session)
+    client.open_stream('http://127.0.0.1:5050', 'benchmark-stream')
+    client.process_record(payloads.encode_event(payloads.make_subscribed_event()))
+    return client
+
+
+def get_benchmarks(capture=None):
+    '''
+    Get benchmarks as (name, function, operations per call)
+    '''
+    session = payloads.NullSession()
+    client = make_client(session)
+    driver = client.get_driver()
+    context = MesosContext(
+        'http://127.0.0.1:5050', 'benchmark-framework', 'benchmark-stream', session=session
+    )
+    benchmarks = []
+
+    update_record = payloads.encode_event(payloads.make_update_event('benchmark-task'))
+    updates_stream = chunks(payloads.to_recordio([update_record] * 1000))
+    benchmarks.append(('recordio/updates x1000', lambda: list(iter_records(updates_stream)), 1000))
+    benchmarks.append(('decode/update', lambda: decode_record(update_record), 1))
+
+    for size in OFFERS_SIZES:
+        event = payloads.make_offers_event(size)
+        record = payloads.encode_event(event)
+        stream = chunks(payloads.to_recordio([record]))
+        benchmarks.append(('recordio/offers x%d' % (size), lambda stream=stream: list(iter_records(stream)), 1))
+        benchmarks.append(('decode/offers x%d' % (size), lambda record=record: decode_record(record), 1))
+
+    if capture:
+        records = payloads.read_capture(capture)
+        stream = chunks(payloads.to_recordio(records))
+        benchmarks.append(('capture/recordio x%d' % (len(records)), lambda: list(iter_records(stream)), len(records)))
+        benchmarks.append(('capture/decode x%d' % (len(records)), lambda: [decode_record(r) for r in records],
+                           len(records)))
+
+    mesos_offers = payloads.make_offers_event(1000)['offers']['offers']
+    mesos_update = payloads.make_update_event('benchmark-task')['update']
+    benchmarks.append(('object/Offer x1000', lambda: [Offer.from_context(context, o) for o in mesos_offers], 1000))
+    benchmarks.append(('object/Offer.resources x1000',
+                       lambda: [Offer.from_context(context, o).resources.cpus for o in mesos_offers], 1000))
+    benchmarks.append(('object/Update', lambda: Update.from_context(context, mesos_update), 1))
+
+    event_callback = client._MesosClient__event_callback
+    client.on(MesosClient.HEARTBEAT, lambda heartbeat: None)
+    heartbeat_record = payloads.encode_event({'type': 'HEARTBEAT'})
+    benchmarks.append(('dispatch/event_callback', lambda: event_callback(MesosClient.HEARTBEAT, 'HEARTBEAT'), 1))
+    benchmarks.append(('dispatch/process_record HEARTBEAT', lambda: client.process_record(heartbeat_record), 1))
+    benchmarks.append(('dispatch/process_record UPDATE', lambda: client.process_record(update_record), 1))
+
+    offer = Offer.from_context(context, mesos_offers[0])
+    task = {
+        'name': 'benchmark',
+        'task_id': {'value': 'benchmark-task'},
+        'agent_id': mesos_offers[0]['agent_id'],
+        'resources': mesos_offers[0]['resources'][:2],
+        'command': {'value': 'sleep 10'}
+    }
+    update = Update.from_context(context, mesos_update)
+    reconcile_tasks = [{'task_id': {'value': 'task-%d' % (index)}, 'agent_id': {'value': 'agent-S1'}}
+                       for index in range(100)]
+    benchmarks.append(('call/accept', lambda: offer.accept([task]), 1))
+    benchmarks.append(('call/decline', lambda: offer.decline(), 1))
+    benchmarks.append(('call/ack', lambda: update.ack(), 1))
+    benchmarks.append(('call/reconcile x100', lambda: driver.reconcile(reconcile_tasks), 1))
+    benchmarks.append(('call/kill', lambda: driver.kill('agent-S1', 'benchmark-task'), 1))
+
+    def reset_calls():
+        del session.calls[:]
+    return benchmarks, reset_calls
+
+
+def measure(func, repeat, min_time):
+    '''
+    Get best time of one call, calling function enough times per repeat to last min_time
+    '''
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number *= 2
+    return min([elapsed] + timer.repeat(repeat - 1, number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description='mesoshttp micro-benchmarks')
+    parser.add_argument('--capture', help='RecordIO JSON capture of a scheduler stream')
+    parser.add_argument('--filter', help='only run benchmarks whose name contains this string')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05, help='minimal duration of a measure (seconds)')
+    parser.add_argument('--save', help='save results as baseline in this JSON file')
+    parser.add_argument('--compare', help='compare with a baseline JSON file')
+    parser.add_argument('--max-ratio', type=float, default=None,
+                        help='fail if a benchmark is slower than baseline by more than this ratio')
+    args = parser.parse_args()
+
+    benchmarks, reset_calls = get_benchmarks(args.capture)
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    results = {}
+    regressions = []
+    print('%-36s %14s %14s %10s' % ('benchmark', 'per call (us)', 'per op (us)', 'ratio'))
+    for (name, func, operations) in benchmarks:
+        if args.filter and args.filter not in name:
+            continue
+        duration = measure(func, args.repeat, args.min_time)
+        reset_calls()
+        results[name] = duration
+        line = '%-36s %14.2f %14.3f' % (name, duration * 1e6, duration * 1e6 / operations)
+        if name in baseline:
+            ratio = duration / baseline[name]
+            line += ' %10.2f' % (ratio)
+            if args.max_ratio is not None and ratio > args.max_ratio:
+                regressions.append(name)
+                line += ' REGRESSION'
+        print(line)
+
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+    if regressions:
+        print('Slower than baseline: %s' % (', '.join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+'''
+Measure task queue scheduling on a simulated cluster
+
+A MesosClient is run against a `mesoshttp.simulator.ClusterSimulator`:
+tasks are submitted at a steady rate with SchedulerDriver.submit, run for
+--task-duration simulated seconds, agents fail at random. Throughput,
+utilisation and decision latency of the scheduler are displayed.
+
+Usage, from repository root::
+
+    PYTHONPATH=. python benchmark/bench_simulator.py [--agents 1000] [--duration 60] [--rate 100]
+
+Defaults run in a few seconds, larger clusters take longer (about 20 s
+for 10000 agents over 60 simulated seconds).
+'''
+from __future__ import print_function
+
+import argparse
+import sys
+
+from mesoshttp.client import MesosClient
+from mesoshttp.simulator import ClusterSimulator
+
+from bench_submit import make_task
+
+
+def main():
+    parser = argparse.ArgumentParser(description='simulated cluster scheduling benchmark')
+    parser.add_argument('--agents', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=60.0, help='simulated seconds')
+    parser.add_argument('--rate', type=int, default=100, help='tasks submitted per simulated second')
+    parser.add_argument('--cpus', type=float, default=1.0)
+    parser.add_argument('--mem', type=float, default=1024.0)
+    parser.add_argument('--task-duration', type=float, default=30.0, help='simulated seconds a task runs')
+    parser.add_argument('--refuse-seconds', type=float, default=5.0)
+    parser.add_argument('--max-per-rack', type=int, default=0, help='placement constraint, 0 for no constraint')
+    parser.add_argument('--fit-cache', type=int, default=0, help='size of fit results cache, 0 to disable')
+    parser.add_argument('--mtbf', type=float, default=None, help='mean simulated seconds between agent failures')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    client = MesosClient(mesos_urls=[])
+    client.set_fit_cache(args.fit_cache)
+    simulator = ClusterSimulator(
+        client,
+        agents=args.agents,
+        task_duration=args.task_duration,
+        refuse_seconds=args.refuse_seconds,
+        mean_time_between_failures=args.mtbf,
+        seed=args.seed
+    )
+    constraints = None
+    if args.max_per_rack:
+        constraints = [client.constraint_engine.group('benchmark', [['rack', 'MAX_PER', args.max_per_rack]])]
+    state = {'submitted': 0}
+
+    def submit():
+        driver = client.get_driver()
+        for index in range(args.rate):
+            driver.submit(make_task(state['submitted'], args.cpus, args.mem), constraints)
+            state['submitted'] += 1
+        simulator.schedule(1, submit)
+
+    def decline(offers):
+        for offer in offers:
+            offer.decline()
+
+    client.on(MesosClient.SUBSCRIBED, lambda driver: simulator.schedule(0, submit))
+    client.on(MesosClient.OFFERS, decline)
+    simulator.run(duration=args.duration)
+
+    print('tasks submitted: %d, waiting: %d' % (state['submitted'], len(client.task_queue)))
+    print(simulator.report())
+    if client.task_queue.fit_cache is not None:
+        print('fit cache:   %s' % (client.task_queue.fit_cache.stats()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
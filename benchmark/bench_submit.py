@@ -0,0 +1,93 @@
+'''
+Measure sustained launch rate of tasks submitted with SchedulerDriver.submit
+
+Offers and updates are fed to a MesosClient without master, calls are
+answered by a `payloads.NullSession`.
+
+Usage, from repository root::
+
+    PYTHONPATH=. python benchmark/bench_submit.py [--tasks 20000] [--offers 100] [--fit-cache 10000]
+'''
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+import time
+
+from mesoshttp.client import MesosClient
+
+import payloads
+
+
+def make_task(index, cpus, mem):
+    return {
+        'name': 'benchmark-%d' % (index),
+        'task_id': {'value': 'benchmark-T%d' % (index)},
+        'resources': [
+            {'name': 'cpus', 'type': 'SCALAR', 'scalar': {'value': cpus}},
+            {'name': 'mem', 'type': 'SCALAR', 'scalar': {'value': mem}}
+        ],
+        'command': {'value': 'sleep 10'}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='task submission benchmark')
+    parser.add_argument('--tasks', type=int, default=20000)
+    parser.add_argument('--offers', type=int, default=100, help='offers per OFFERS event')
+    parser.add_argument('--agents', type=int, default=1000)
+    parser.add_argument('--cpus', type=float, default=1.0)
+    parser.add_argument('--mem', type=float, default=1024.0)
+    parser.add_argument('--fit-cache', type=int, default=0, help='size of fit results cache, 0 to disable')
+    args = parser.parse_args()
+
+    session = payloads.NullSession()
+    client = MesosClient(mesos_urls=['http://127.0.0.1:5050'])
+    client.set_session(session)
+    client.set_fit_cache(args.fit_cache)
+    client.open_stream('http://127.0.0.1:5050', 'benchmark-stream')
+    client.process_record(payloads.encode_event(payloads.make_subscribed_event()))
+    driver = client.get_driver()
+
+    start = time.time()
+    futures = [driver.submit(make_task(index, args.cpus, args.mem)) for index in range(args.tasks)]
+    submitted = time.time()
+
+    events = 0
+    offer_index = 0
+    matching = 0
+    while client.task_queue:
+        event = payloads.make_offers_event(0)
+        event['offers']['offers'] = [
+            payloads.make_offer(offer_index + index, args.agents) for index in range(args.offers)
+        ]
+        offer_index += args.offers
+        record = payloads.encode_event(event)
+        session.calls = []
+        event_start = time.time()
+        client.process_record(record)
+        matching += time.time() - event_start
+        events += 1
+        for call in session.calls:
+            call = json.loads(call)
+            if call['type'] != 'ACCEPT':
+                continue
+            for task in call['accept']['operations'][0]['launch']['task_infos']:
+                update = payloads.make_update_event(task['task_id']['value'], 'TASK_RUNNING', task['agent_id']['value'])
+                client.process_record(payloads.encode_event(update))
+    elapsed = time.time() - start
+
+    running = len([future for future in futures if future.done() and future.exception() is None])
+    print('tasks submitted:  %d in %.3f s' % (args.tasks, submitted - start))
+    print('OFFERS events:    %d (%d offers each)' % (events, args.offers))
+    print('tasks running:    %d' % (running))
+    print('offers handling:  %.3f s (%.0f tasks/s)' % (matching, args.tasks / matching))
+    print('total:            %.3f s (%.0f tasks/s)' % (elapsed, args.tasks / elapsed))
+    if client.task_queue.fit_cache is not None:
+        print('fit cache:        %s' % (client.task_queue.fit_cache.stats()))
+    return 0 if running == args.tasks else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
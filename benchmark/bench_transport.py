@@ -0,0 +1,186 @@
+'''
+Compare per call CPU time of transports sending calls to master
+
+Small calls (DECLINE, ACKNOWLEDGE, KILL) are sent with
+CoreMesosObject.send_call to a local stand-in master, run in a separate
+process so that only client CPU time is measured, answering 202 on
+persistent connections. Transports compared:
+
+* requests: no session, `requests.post` per call (default client behaviour)
+* session: `mesoshttp.transport.RequestsTransport`, pooled requests.Session
+* http: `mesoshttp.transport.HTTPTransport`
+
+Usage, from repository root::
+
+    PYTHONPATH=. python benchmark/bench_transport.py [--calls 5000] [--auth]
+'''
+from __future__ import print_function
+
+import argparse
+import multiprocessing
+import sys
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from requests.auth import HTTPBasicAuth
+
+from mesoshttp.core import CoreMesosObject
+from mesoshttp.transport import HTTPTransport, RequestsTransport
+
+try:
+    process_time = time.process_time
+except AttributeError:
+    process_time = time.clock
+
+
+class StandInMaster(ThreadingMixIn, HTTPServer):
+    '''
+    Master answering 202 to all calls
+    '''
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _AcceptedHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(202)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def serve(port):
+    StandInMaster(('127.0.0.1', port), _AcceptedHandler).serve_forever()
+
+
+def start_master():
+    '''
+    Start stand-in master in a new process
+
+    :return: (process, url)
+    '''
+    server = HTTPServer(('127.0.0.1', 0), _AcceptedHandler)
+    port = server.server_address[1]
+    server.server_close()
+    process = multiprocessing.Process(target=serve, args=(port,))
+    process.daemon = True
+    process.start()
+    # wait for server to listen
+    transport = HTTPTransport(timeout=1)
+    for _ in range(100):
+        try:
+            transport.post('http://127.0.0.1:%d/' % (port), b'{}')
+            break
+        except Exception:
+            time.sleep(0.05)
+    transport.close()
+    return (process, 'http://127.0.0.1:%d' % (port))
+
+
+def make_calls(count):
+    '''
+    Get a mix of DECLINE, ACKNOWLEDGE and KILL calls
+    '''
+    calls = []
+    for index in range(count):
+        kind = index % 3
+        if kind == 0:
+            calls.append({
+                "framework_id": {"value": 'benchmark-framework'},
+                "type": "DECLINE",
+                "decline": {
+                    "offer_ids": [{'value': 'benchmark-offer-%d' % (index)}],
+                    "filters": {'refuse_seconds': 5.0}
+                }
+            })
+        elif kind == 1:
+            calls.append({
+                "framework_id": {"value": 'benchmark-framework'},
+                "type": "ACKNOWLEDGE",
+                "acknowledge": {
+                    "agent_id": {'value': 'benchmark-agent'},
+                    "task_id": {'value': 'benchmark-task-%d' % (index)},
+                    "uuid": 'aGVsbG8gd29ybGQ='
+                }
+            })
+        else:
+            calls.append({
+                "framework_id": {"value": 'benchmark-framework'},
+                "type": "KILL",
+                "kill": {
+                    "task_id": {'value': 'benchmark-task-%d' % (index)},
+                    "agent_id": {'value': 'benchmark-agent'}
+                }
+            })
+    return calls
+
+
+def run(url, transport, calls, auth):
+    sender = CoreMesosObject(url, 'benchmark-framework', 'benchmark-stream', auth, True, None, transport)
+    # warm connections and imports
+    for call in calls[:50]:
+        sender.send_call(call)
+    cpu = process_time()
+    wall = time.time()
+    for call in calls:
+        r = sender.send_call(call)
+        if r.status_code != 202:
+            raise Exception('unexpected status %d' % (r.status_code))
+    cpu = process_time() - cpu
+    wall = time.time() - wall
+    if transport is not None:
+        transport.close()
+    return (cpu, wall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='transport per call CPU time benchmark')
+    parser.add_argument('--calls', type=int, default=5000)
+    parser.add_argument('--auth', action='store_true', help='send calls with basic authentication')
+    parser.add_argument('--transports', default='requests,session,http')
+    args = parser.parse_args()
+
+    (process, url) = start_master()
+    calls = make_calls(args.calls)
+    auth = None
+    if args.auth:
+        auth = HTTPBasicAuth('benchmark', 'benchmark')
+    transports = {
+        'requests': lambda: None,
+        'session': lambda: RequestsTransport(),
+        'http': lambda: HTTPTransport()
+    }
+    results = {}
+    try:
+        for name in args.transports.split(','):
+            results[name] = run(url, transports[name](), calls, auth)
+    finally:
+        process.terminate()
+
+    reference = results.get('requests')
+    print('%-10s %12s %12s %10s' % ('transport', 'cpu us/call', 'wall us/call', 'cpu ratio'))
+    for name in args.transports.split(','):
+        (cpu, wall) = results[name]
+        ratio = ''
+        if reference is not None:
+            ratio = '%.2f' % (cpu / reference[0])
+        print('%-10s %12.1f %12.1f %10s' % (
+            name, cpu * 1000000 / args.calls, wall * 1000000 / args.calls, ratio))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
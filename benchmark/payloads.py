@@ -0,0 +1,131 @@
+'''
+Recorded and synthetic Mesos scheduler payloads used by benchmarks
+'''
+import json
+import random
+import uuid
+
+from mesoshttp.stream import iter_records
+
+
+def make_offer(index, agent_count=1000, framework_id='benchmark-framework'):
+    '''
+    Get a synthetic JSON offer, similar to offers of a large cluster agent
+    '''
+    agent = index % agent_count
+    return {
+        'id': {'value': '%s-O%d' % (framework_id, index)},
+        'framework_id': {'value': framework_id},
+        'agent_id': {'value': 'agent-S%d' % (agent)},
+        'hostname': 'node%d.cluster.local' % (agent),
+        'url': {
+            'scheme': 'http',
+            'address': {'hostname': 'node%d.cluster.local' % (agent), 'ip': '10.0.%d.%d' % (agent // 250, agent % 250), 'port': 5051},
+            'path': '/slave(1)'
+        },
+        'resources': [
+            {'name': 'cpus', 'type': 'SCALAR', 'scalar': {'value': 32.0}, 'role': '*', 'allocation_info': {'role': '*'}},
+            {'name': 'mem', 'type': 'SCALAR', 'scalar': {'value': 128000.0}, 'role': '*', 'allocation_info': {'role': '*'}},
+            {'name': 'disk', 'type': 'SCALAR', 'scalar': {'value': 500000.0}, 'role': '*', 'allocation_info': {'role': '*'}},
+            {'name': 'ports', 'type': 'RANGES', 'role': '*', 'allocation_info': {'role': '*'},
+             'ranges': {'range': [{'begin': 31000, 'end': 31500}, {'begin': 31502, 'end': 32000}]}}
+        ],
+        'attributes': [
+            {'name': 'rack', 'type': 'TEXT', 'text': {'value': 'rack-%d' % (agent % 40)}},
+            {'name': 'zone', 'type': 'TEXT', 'text': {'value': 'zone-%d' % (agent % 3)}}
+        ],
+        'allocation_info': {'role': '*'}
+    }
+
+
+def make_offers_event(count, agent_count=1000):
+    '''
+    Get a synthetic OFFERS event with count offers
+    '''
+    return {
+        'type': 'OFFERS',
+        'offers': {'offers': [make_offer(index, agent_count) for index in range(count)]}
+    }
+
+
+def make_update_event(task_id=None, state='TASK_RUNNING', agent_id='agent-S1'):
+    '''
+    Get a synthetic UPDATE event
+    '''
+    return {
+        'type': 'UPDATE',
+        'update': {
+            'status': {
+                'task_id': {'value': task_id or uuid.uuid4().hex},
+                'agent_id': {'value': agent_id},
+                'state': state,
+                'source': 'SOURCE_EXECUTOR',
+                'timestamp': 1500000000.0 + random.random(),
+                'uuid': 'W7ZLtbRkS4u1rrW4uPmnKA==',
+                'container_status': {
+                    'network_infos': [{'ip_addresses': [{'ip_address': '10.0.0.1', 'protocol': 'IPv4'}]}]
+                }
+            }
+        }
+    }
+
+
+def encode_event(event):
+    '''
+    Encode an event as master does
+    '''
+    return json.dumps(event, separators=(',', ':')).encode('utf-8')
+
+
+def to_recordio(records):
+    '''
+    Frame raw records as a RecordIO stream
+    '''
+    return b''.join([str(len(record)).encode('ascii') + b'\n' + record for record in records])
+
+
+def read_capture(path):
+    '''
+    Read raw records of a captured scheduler stream
+
+    Capture can be done with curl on a test framework, for example::
+
+        curl -N -X POST -H 'Content-Type: application/json' \\
+            -d '{"type": "SUBSCRIBE", "subscribe": {"framework_info": {"user": "root", "name": "capture"}}}' \\
+            http://master:5050/api/v1/scheduler > capture.recordio
+    '''
+    with open(path, 'rb') as capture:
+        return list(iter_records([capture.read()]))
+
+
+class NullResponse(object):
+    status_code = 202
+    text = ''
+
+
+class NullSession(object):
+    '''
+    Session answering all calls without network, keeping sent calls
+
+    Set with `MesosClient.set_session` to measure client side costs only.
+    '''
+
+    def __init__(self):
+        self.calls = []
+
+    def post(self, url, data=None, **kwargs):
+        self.calls.append(data)
+        return NullResponse()
+
+
+def make_subscribed_event(framework_id='benchmark-framework'):
+    '''
+    Get a SUBSCRIBED event
+    '''
+    return {
+        'type': 'SUBSCRIBED',
+        'subscribed': {
+            'framework_id': {'value': framework_id},
+            'heartbeat_interval_seconds': 15
+        }
+    }
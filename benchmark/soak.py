@@ -0,0 +1,287 @@
+'''
+Soak test of MesosClient against a local stand-in master
+
+The stand-in master streams OFFERS, UPDATE, RESCIND and HEARTBEAT events
+and closes the subscription connection every --events-per-connection
+events, so that register() reconnection cycles are exercised. Offers are
+declined and updates acknowledged by the client, calls are answered by the
+stand-in master.
+
+RSS and traced python memory are sampled during the run. Memory growth per
+million events is computed after warmup, and the top growing allocation
+sites are displayed::
+
+    PYTHONPATH=. python benchmark/soak.py [--events 1000000] [--max-growth-mb 5] [--dcos]
+
+With --dcos, calls are authenticated with a DCOSServiceAuth whose token is
+refreshed from the stand-in master every --refresh-every events (needs
+pyjwt and cryptography).
+
+Exit code is 1 if memory growth is over --max-growth-mb per million events.
+'''
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import requests
+
+from mesoshttp.client import MesosClient
+
+import payloads
+
+
+class StandInMaster(ThreadingMixIn, HTTPServer):
+    '''
+    Minimal master serving scheduler subscriptions and calls
+    '''
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, total_events, events_per_connection, records):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), _StandInHandler)
+        self.total_events = total_events
+        self.events_per_connection = events_per_connection
+        self.records = records
+        self.sent = 0
+        self.subscriptions = 0
+        self.calls = 0
+        self.logins = 0
+        self.url = 'http://127.0.0.1:%d' % (self.server_address[1])
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def __answer(self, status, body=b''):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __write_chunk(self, data):
+        self.wfile.write(('%x\r\n' % (len(data))).encode('ascii') + data + b'\r\n')
+
+    def do_POST(self):
+        master = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.endswith('/login'):
+            master.logins += 1
+            return self.__answer(200, json.dumps({'token': 'soak-token-%d' % (master.logins)}).encode('utf-8'))
+        call = json.loads(body.decode('utf-8'))
+        if call['type'] != 'SUBSCRIBE':
+            master.calls += 1
+            return self.__answer(202)
+
+        master.subscriptions += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Mesos-Stream-Id', 'soak-stream-%d' % (master.subscriptions))
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.__write_chunk(payloads.to_recordio([payloads.encode_event(payloads.make_subscribed_event())]))
+        records = master.records
+        count = min(master.events_per_connection, master.total_events - master.sent)
+        index = 0
+        try:
+            while index < count:
+                batch = [records[(master.sent + i) % len(records)] for i in range(min(100, count - index))]
+                self.__write_chunk(payloads.to_recordio(batch))
+                master.sent += len(batch)
+                index += len(batch)
+            self.__write_chunk(b'')
+        except Exception:
+            pass
+        self.close_connection = True
+
+
+def make_records(offers_per_event):
+    '''
+    Get the cycle of events sent by stand-in master
+    '''
+    records = []
+    for index in range(10):
+        offers = payloads.make_offers_event(0)
+        offers['offers']['offers'] = [
+            payloads.make_offer(index * offers_per_event + offer, 1000) for offer in range(offers_per_event)
+        ]
+        records.append(payloads.encode_event(offers))
+        records.append(payloads.encode_event(
+            payloads.make_update_event('soak-task-%d' % (index), 'TASK_RUNNING')
+        ))
+        records.append(payloads.encode_event({
+            'type': 'RESCIND',
+            'rescind': {'offer_id': {'value': 'benchmark-framework-O%d' % (index)}}
+        }))
+        for heartbeat in range(7):
+            records.append(payloads.encode_event({'type': 'HEARTBEAT'}))
+    return records
+
+
+def current_rss():
+    '''
+    Get current resident memory in MB
+    '''
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1048576.0
+    except (IOError, OSError):
+        # maximum RSS only, in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def growth_per_million(samples, key):
+    '''
+    Get slope of memory over events (least squares), in MB per million events
+    '''
+    count = len(samples)
+    if count < 2:
+        return 0.0
+    mean_events = sum([sample['events'] for sample in samples]) / float(count)
+    mean_memory = sum([sample[key] for sample in samples]) / float(count)
+    covariance = sum([(sample['events'] - mean_events) * (sample[key] - mean_memory) for sample in samples])
+    variance = sum([(sample['events'] - mean_events) ** 2 for sample in samples])
+    if not variance:
+        return 0.0
+    return covariance / variance * 1000000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MesosClient soak test')
+    parser.add_argument('--events', type=int, default=1000000)
+    parser.add_argument('--events-per-connection', type=int, default=20000)
+    parser.add_argument('--offers', type=int, default=5, help='offers per OFFERS event')
+    parser.add_argument('--sample-every', type=int, default=20000)
+    parser.add_argument('--warmup', type=float, default=0.2, help='part of events ignored for growth')
+    parser.add_argument('--max-growth-mb', type=float, default=5.0, help='max memory growth per million events')
+    parser.add_argument('--dcos', action='store_true', help='authenticate calls with a DCOS service account')
+    parser.add_argument('--refresh-every', type=int, default=10000, help='events between DCOS token refreshes')
+    parser.add_argument('--top', type=int, default=10, help='number of growing allocation sites displayed')
+    parser.add_argument('--trace-frames', type=int, default=1,
+                        help='frames kept per traced allocation, 0 to disable tracemalloc')
+    args = parser.parse_args()
+
+    master = StandInMaster(args.events, args.events_per_connection, make_records(args.offers))
+    server = threading.Thread(target=master.serve_forever)
+    server.daemon = True
+    server.start()
+
+    MesosClient.WAIT_TIME = 0.01
+    reconnections = args.events // args.events_per_connection + 10
+    client = MesosClient(mesos_urls=[master.url], frameworkName='soak', max_reconnect=reconnections)
+    # reuse connections, calls are not the measured part
+    session = requests.Session()
+    session.trust_env = False
+    client.set_session(session)
+    auth = None
+    if args.dcos:
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from mesoshttp.acs import DCOSServiceAuth
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048, backend=default_backend())
+        private_key = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        auth = DCOSServiceAuth({
+            'uid': 'soak', 'private_key': private_key, 'scheme': 'RS256',
+            'login_endpoint': master.url + '/acs/api/v1/auth/login'
+        })
+        client.requests_auth = auth
+
+    tracing = tracemalloc is not None and args.trace_frames > 0
+    state = {'events': 0}
+    samples = []
+    snapshots = {}
+    warmup_events = int(args.events * args.warmup)
+
+    def on_event(*event):
+        state['events'] += 1
+        events = state['events']
+        if auth is not None and events % args.refresh_every == 0:
+            # expire token, next call logs in again
+            auth._expiration = 0
+        if events % args.sample_every == 0:
+            gc.collect()
+            sample = {'events': events, 'time': time.time(), 'rss': current_rss(), 'traced': 0.0}
+            if tracing:
+                sample['traced'] = tracemalloc.get_traced_memory()[0] / 1048576.0
+                if 'warmup' not in snapshots and events >= warmup_events:
+                    snapshots['warmup'] = tracemalloc.take_snapshot()
+            samples.append(sample)
+            print('%10d events %8.1f MB rss %8.1f MB traced %6d subscriptions' % (
+                events, sample['rss'], sample['traced'], master.subscriptions))
+            sys.stdout.flush()
+        if events >= args.events:
+            client.stop = True
+
+    def on_offers(offers):
+        for offer in offers:
+            offer.decline()
+        on_event()
+
+    client.on(MesosClient.OFFERS, on_offers)
+    for event in (MesosClient.UPDATE, MesosClient.RESCIND, MesosClient.HEARTBEAT):
+        client.on(event, on_event)
+
+    if tracing:
+        tracemalloc.start(args.trace_frames)
+    start = time.time()
+    client.register()
+    elapsed = time.time() - start
+    if tracing and 'warmup' in snapshots:
+        snapshots['end'] = tracemalloc.take_snapshot()
+    master.shutdown()
+
+    measured = [sample for sample in samples if sample['events'] >= warmup_events]
+    rss_growth = growth_per_million(measured, 'rss')
+    traced_growth = growth_per_million(measured, 'traced')
+    print('')
+    print('events:        %d in %.1f s (%.0f events/s)' % (state['events'], elapsed, state['events'] / elapsed))
+    print('subscriptions: %d, calls: %d, logins: %d' % (master.subscriptions, master.calls, master.logins))
+    print('rss growth:    %.3f MB per million events' % (rss_growth))
+    if tracing:
+        print('traced growth: %.3f MB per million events' % (traced_growth))
+    if 'end' in snapshots:
+        print('')
+        print('Top growing allocation sites:')
+        for stat in snapshots['end'].compare_to(snapshots['warmup'], 'traceback')[:args.top]:
+            frame = stat.traceback[0]
+            print('%+10.1f KB %8d blocks  %s:%d' % (stat.size_diff / 1024.0, stat.count_diff, frame.filename, frame.lineno))
+
+    if state['events'] < args.events:
+        print('Client stopped after %d events' % (state['events']))
+        return 1
+    growth = traced_growth if tracing else rss_growth
+    if growth > args.max_growth_mb:
+        print('Memory growth over %.1f MB per million events' % (args.max_growth_mb))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+import logging
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from mesoshttp.core import CoreMesosObject
+
+
+# Default number of calls sent at once
+DEFAULT_CONCURRENCY = 16
+
+logger = logging.getLogger(__name__)
+
+
+class BulkResult(object):
+    '''
+    Results of a bulk operation, by item key
+
+    Keys are task identifiers for `kill_many`, agent identifiers for
+    `accept_many` and message index for `message_many`.
+    '''
+
+    def __init__(self, total):
+        '''
+        :param total: number of items
+        :type total: int
+        '''
+        self.total = total
+        self.done = 0
+        # key => HTTP status of call
+        self.results = OrderedDict()
+        # key => error message
+        self.errors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.total
+
+    def ok(self):
+        '''
+        Check if all calls succeeded
+
+        :return: bool
+        '''
+        return self.done == self.total and not self.errors
+
+    def succeeded(self):
+        return [key for key in self.results if key not in self.errors]
+
+    def failed(self):
+        return list(self.errors)
+
+    def _add(self, key, status_code=None, error=None):
+        with self._lock:
+            self.done += 1
+            if status_code is not None:
+                self.results[key] = status_code
+            if error is not None:
+                self.errors[key] = error
+            return self.done
+
+
+def _get_sender(context, concurrency):
+    '''
+    Get an object sending calls with context settings over pooled connections
+
+    :return: (sender, session to close or None)
+    '''
+    session = context.session
+    owned = None
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        owned = session
+    sender = CoreMesosObject(
+        context.mesos_url, context.frameworkId, context.streamId, context.requests_auth, context.verify,
+        context.codec, session
+    )
+    return (sender, owned)
+
+
+def run_calls(context, calls, concurrency=DEFAULT_CONCURRENCY, progress=None):
+    '''
+    Send calls concurrently, with a bounded number of calls at once
+
+    :param context: connection settings of calls
+    :type context: `mesoshttp.core.MesosContext`
+    :param calls: list of (key, JSON call, function(status_code) called after call or None),
+        status_code is None if call failed
+    :type calls: list
+    :param concurrency: maximum number of calls sent at once
+    :type concurrency: int
+    :param progress: function(done, total, errors) called after each call, from sending threads
+    :type progress: def
+    :return: `BulkResult`
+    '''
+    result = BulkResult(len(calls))
+    if not calls:
+        return result
+    (sender, owned) = _get_sender(context, concurrency)
+    items = iter(calls)
+    items_lock = threading.Lock()
+
+    def send():
+        while True:
+            with items_lock:
+                item = next(items, None)
+            if item is None:
+                return
+            (key, message, on_done) = item
+            status_code = None
+            error = None
+            try:
+                r = sender.send_call(message)
+                status_code = r.status_code
+                if status_code >= 300:
+                    error = 'Mesos:%s:Error:%d:%s' % (message['type'].capitalize(), status_code, r.text)
+            except Exception as e:
+                error = str(e)
+            if error is not None:
+                logger.error(error)
+            if on_done is not None:
+                on_done(status_code)
+            done = result._add(key, status_code, error)
+            if progress is not None:
+                progress(done, result.total, len(result.errors))
+
+    threads = []
+    for _ in range(min(concurrency, len(calls))):
+        thread = threading.Thread(target=send)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    if owned is not None:
+        owned.close()
+    return result
+
+
+def kill_many(driver, tasks, concurrency=DEFAULT_CONCURRENCY, progress=None):
+    '''
+    Kill tasks concurrently
+
+    :param driver: scheduler driver
+    :type driver: `mesoshttp.client.MesosClient.SchedulerDriver`
+    :param tasks: list of (agent_id, task_id)
+    :type tasks: list
+    :param concurrency: maximum number of calls sent at once
+    :type concurrency: int
+    :param progress: function(done, total, errors) called after each call
+    :type progress: def
+    :return: `BulkResult` by task identifier
+    '''
+    calls = []
+    for (agent_id, task_id) in tasks:
+        calls.append((task_id, {
+            "framework_id": {"value": driver.frameworkId},
+            "type": "KILL",
+            "kill": {
+                "task_id": {'value': task_id},
+                "agent_id": {'value': agent_id}
+            }
+        }, None))
+    return run_calls(driver.context, calls, concurrency, progress)
+
+
+def message_many(driver, messages, concurrency=DEFAULT_CONCURRENCY, progress=None):
+    '''
+    Send messages to executors concurrently
+
+    :param driver: scheduler driver
+    :type driver: `mesoshttp.client.MesosClient.SchedulerDriver`
+    :param messages: list of (agent_id, executor_id, message), message being raw bytes encoded as Base64
+    :type messages: list
+    :param concurrency: maximum number of calls sent at once
+    :type concurrency: int
+    :param progress: function(done, total, errors) called after each call
+    :type progress: def
+    :return: `BulkResult` by message index
+    '''
+    calls = []
+    for index, (agent_id, executor_id, message) in enumerate(messages):
+        calls.append((index, {
+            "framework_id": {"value": driver.frameworkId},
+            "type": "MESSAGE",
+            "message": {
+                "executor_id": {'value': executor_id},
+                "agent_id": {'value': agent_id},
+                "data": message
+            }
+        }, None))
+    return run_calls(driver.context, calls, concurrency, progress)
+
+
+def accept_many(launches, options=None, concurrency=DEFAULT_CONCURRENCY, progress=None):
+    '''
+    Accept offers with tasks, one ACCEPT per agent, sent concurrently
+
+    Offers of an agent are combined, and tasks launched on these offers are
+    sent in a single LAUNCH operation, tasks agent_id is set if missing.
+
+    :param launches: list of (offer, JSON TaskInfo instances)
+    :type launches: list of (`mesoshttp.offers.Offer`, list)
+    :param options: Optional offer additional params (filters, ...)
+    :type options: dict
+    :param concurrency: maximum number of calls sent at once
+    :type concurrency: int
+    :param progress: function(done, total, errors) called after each call
+    :type progress: def
+    :return: `BulkResult` by agent identifier
+    '''
+    if not launches:
+        return BulkResult(0)
+    agents = OrderedDict()
+    for (offer, task_infos) in launches:
+        mesos_offer = offer.get_offer()
+        agent_id = mesos_offer['agent_id']
+        (offers, agent_tasks) = agents.setdefault(agent_id['value'], ([], []))
+        offers.append(offer)
+        for task_info in task_infos:
+            if 'agent_id' not in task_info and 'slave_id' not in task_info:
+                task_info = dict(task_info)
+                task_info['agent_id'] = agent_id
+            agent_tasks.append(task_info)
+
+    context = launches[0][0].context
+    tracer = context.tracer
+    calls = []
+    for agent_id, (offers, task_infos) in agents.items():
+        if context.decline_filter is not None:
+            for offer in offers:
+                context.decline_filter.used(offer.get_offer())
+        message = {
+            "framework_id": {"value": context.frameworkId},
+            "type": "ACCEPT",
+            "accept": {
+                "offer_ids": [{'value': offer.get_offer()['id']['value']} for offer in offers],
+                "operations": [{
+                    'type': 'LAUNCH',
+                    'launch': {'task_infos': task_infos}
+                }]
+            }
+        }
+        if options and options.get('filters'):
+            message["accept"]["filters"] = options.get('filters')
+        on_done = None
+        if tracer is not None:
+            task_ids = tracer.accept_started(message)
+            on_done = lambda status_code, task_ids=task_ids: tracer.accept_done(task_ids, status_code)
+        calls.append((agent_id, message, on_done))
+    return run_calls(context, calls, concurrency, progress)
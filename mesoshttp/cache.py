@@ -0,0 +1,136 @@
+import threading
+from collections import OrderedDict
+
+
+def resources_signature(resources):
+    '''
+    Get a hashable signature of resources
+
+    :param resources: resources
+    :type resources: `mesoshttp.resources.Resources`
+    :return: tuple
+    '''
+    return (
+        tuple(sorted(resources.scalars.items())),
+        tuple(sorted([(key, tuple(intervals)) for key, intervals in resources.ranges.items()])),
+        tuple(sorted([(key, frozenset(items)) for key, items in resources.sets.items()]))
+    )
+
+
+class FitCache(object):
+    '''
+    LRU cache of task fit results per agent
+
+    Results are keyed by agent and task shape (resources signature and
+    constraints), and are valid for an agent resource signature. When an
+    agent is offered with another signature, all its results are dropped.
+
+    Constraints of cached shapes must only depend on offer agent, stateful
+    constraints (`mesoshttp.constraints.PlacementGroup`) must not be cached.
+    '''
+
+    def __init__(self, maxsize=10000):
+        '''
+        :param maxsize: maximum number of results kept
+        :type maxsize: int
+        '''
+        self.maxsize = maxsize
+        self._results = OrderedDict()
+        # agent_id => (resources signature, set of cached keys)
+        self._agents = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    def set_agent(self, agent_id, signature):
+        '''
+        Set current resources signature of an agent, dropping results
+        computed for another signature
+
+        :param agent_id: agent identifier
+        :type agent_id: str
+        :param signature: signature of offered resources, see `resources_signature`
+        :type signature: tuple
+        '''
+        with self._lock:
+            agent = self._agents.get(agent_id)
+            if agent is not None and agent[0] == signature:
+                return
+            if agent is not None:
+                for key in agent[1]:
+                    self._results.pop(key, None)
+            self._agents[agent_id] = (signature, set())
+
+    def invalidate(self, agent_id):
+        '''
+        Drop all results of an agent
+
+        :param agent_id: agent identifier
+        :type agent_id: str
+        '''
+        with self._lock:
+            agent = self._agents.pop(agent_id, None)
+            if agent is not None:
+                for key in agent[1]:
+                    self._results.pop(key, None)
+
+    def get(self, agent_id, shape):
+        '''
+        Get cached fit result
+
+        :param agent_id: agent identifier
+        :type agent_id: str
+        :param shape: task shape
+        :type shape: tuple
+        :return: True, False or None if not cached
+        '''
+        key = (agent_id, shape)
+        with self._lock:
+            result = self._results.pop(key, None)
+            if result is None:
+                self.misses += 1
+                return None
+            self._results[key] = result
+            self.hits += 1
+            return result
+
+    def put(self, agent_id, shape, result):
+        '''
+        Cache a fit result for current agent signature
+
+        :param agent_id: agent identifier
+        :type agent_id: str
+        :param shape: task shape
+        :type shape: tuple
+        :param result: fit result
+        :type result: bool
+        '''
+        key = (agent_id, shape)
+        with self._lock:
+            agent = self._agents.get(agent_id)
+            if agent is None:
+                return
+            self._results.pop(key, None)
+            self._results[key] = result
+            agent[1].add(key)
+            while len(self._results) > self.maxsize:
+                (old_agent_id, old_shape), old_result = self._results.popitem(last=False)
+                old_agent = self._agents.get(old_agent_id)
+                if old_agent is not None:
+                    old_agent[1].discard((old_agent_id, old_shape))
+
+    def clear(self):
+        with self._lock:
+            self._results = OrderedDict()
+            self._agents = {}
+
+    def stats(self):
+        '''
+        Get cache statistics
+
+        :return: dict with size, hits and misses
+        '''
+        return {'size': len(self._results), 'hits': self.hits, 'misses': self.misses}
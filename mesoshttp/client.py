@@ -3,18 +3,25 @@ import time
 import logging
 import socket
 import sys
+import threading
 
 import requests
 from requests.exceptions import ConnectionError
 
-from mesoshttp.acs import DCOSServiceAuth
-
 from mesoshttp.offers import Offer
-from mesoshttp.core import CoreMesosObject
+from mesoshttp import bulk
+from mesoshttp.cache import FitCache
+from mesoshttp.codec import JSON_CODEC
+from mesoshttp.constraints import ConstraintEngine
+from mesoshttp.core import CoreMesosObject, MesosContext
 from mesoshttp.exception import MesosException
-from mesoshttp.update import Update
-
-from kazoo.client import KazooClient
+from mesoshttp.operations import OperationBuilder
+from mesoshttp.operator_api import OperatorClient
+from mesoshttp.priority import PriorityEventQueue
+from mesoshttp.stream import LazyOffers, iter_records
+from mesoshttp.tasks import TaskQueue
+from mesoshttp.update import Update, UpdateCoalescer
+from mesoshttp.watch import UpdateDispatcher
 
 
 class MesosClient(object):
@@ -26,6 +33,8 @@ class MesosClient(object):
     '''
 
     WAIT_TIME = 10
+    # Maximum size of data read at once from master stream
+    CHUNK_SIZE = 65536
 
     SUBSCRIBED = 'SUBSCRIBED'
     OFFERS = 'OFFERS'
@@ -34,6 +43,7 @@ class MesosClient(object):
     FAILURE = 'FAILURE'
     RESCIND = 'RESCIND'
     HEARTBEAT = 'HEARTBEAT'
+    MESSAGE = 'MESSAGE'
 
     DISCONNECTED = 'DISCONNECTED'
     RECONNECTED = 'RECONNECTED'
@@ -45,34 +55,50 @@ class MesosClient(object):
         `MesosClient.SchedulerDriver` instance is available after the
         SUBSCRIBED event with the subscribed event.
         '''
-        def __init__(self, mesos_url, frameworkId, streamId, requests_auth=None, verify=True):
+        def __init__(self, mesos_url, frameworkId, streamId, requests_auth=None, verify=True, codec=None,
+                     session=None, task_queue=None, decline_filter=None):
             '''
             Create a driver instance related to created framework
             '''
-            CoreMesosObject.__init__(self, mesos_url, frameworkId, streamId, requests_auth, verify)
+            CoreMesosObject.__init__(self, mesos_url, frameworkId, streamId, requests_auth, verify, codec, session)
             self.driver = None
+            self.task_queue = task_queue
+            self.decline_filter = decline_filter
+
+        def submit(self, task_info, constraints=None):
+            '''
+            Queue a task, launched on the first matching offer
+
+            Offers are revived if no task was waiting and no offer was
+            received recently, see `mesoshttp.tasks.TaskQueue.revive_needed`.
+
+            :param task_info: JSON TaskInfo, agent_id is set on launch
+            :type task_info: dict
+            :param constraints: functions(offer) returning True if task can run on offer,
+                or placement groups of `MesosClient.constraint_engine`
+            :type constraints: list
+            :return: `mesoshttp.watch.TaskFuture` resolved when task is running or fails
+            '''
+            if self.task_queue is None:
+                raise MesosException('No task queue available')
+            revive = not self.task_queue
+            future = self.task_queue.submit(task_info, constraints)
+            if revive and self.task_queue.revive_needed():
+                self.revive()
+            elif self.decline_filter is not None:
+                self.decline_filter.workload_changed()
+            return future
 
         def tearDown(self):
             '''
             Undeclare framework
             '''
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'Mesos-Stream-Id': self.streamId
-            }
             teardown = {
                 "framework_id": {"value": self.frameworkId},
                 "type": "TEARDOWN"
             }
             try:
-                requests.post(
-                    self.mesos_url + '/api/v1/scheduler',
-                    json.dumps(teardown),
-                    headers=headers,
-                    auth=self.requests_auth,
-                    verify=self.verify
-                )
+                self.send_call(teardown)
             except Exception as e:
                 self.logger.error('Mesos:Teardown:Error:' + str(e))
 
@@ -83,12 +109,6 @@ class MesosClient(object):
             :param requests: list of resources request [{'agent_id': : XX, 'resources': {}}]
             :type requests: list
             '''
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'Mesos-Stream-Id': self.streamId
-            }
-
             revive = {
                 "framework_id": {"value": self.frameworkId},
                 "type": "REQUEST",
@@ -96,41 +116,62 @@ class MesosClient(object):
             }
 
             try:
-                requests.post(
-                    self.mesos_url + '/api/v1/scheduler',
-                    json.dumps(revive),
-                    headers=headers,
-                    auth=self.requests_auth,
-                    verify=self.verify
-                )
+                self.send_call(revive)
             except Exception as e:
                 raise MesosException(e)
 
         def revive(self):
             '''
             Send REVIVE request
-            '''
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'Mesos-Stream-Id': self.streamId
-            }
 
+            Refuse seconds of the decline filter are reset, if any.
+            '''
+            if self.decline_filter is not None:
+                self.decline_filter.workload_changed()
             revive = {
                 "framework_id": {"value": self.frameworkId},
                 "type": "REVIVE"
             }
 
             try:
-                requests.post(
-                    self.mesos_url + '/api/v1/scheduler',
-                    json.dumps(revive),
-                    headers=headers,
-                    auth=self.requests_auth,
-                    verify=self.verify
-                )
+                self.send_call(revive)
+            except Exception as e:
+                raise MesosException(e)
+
+        def update_framework(self, framework_info, offer_constraints=None, suppressed_roles=None):
+            '''
+            Send UPDATE_FRAMEWORK call, changing framework settings without resubscribing
+
+            Offer constraints and suppressed roles not set are removed.
+
+            :param framework_info: JSON FrameworkInfo, see `MesosClient.get_framework_info`
+            :type framework_info: dict
+            :param offer_constraints: offer constraints
+            :type offer_constraints: `mesoshttp.constraints.OfferConstraints`
+            :param suppressed_roles: roles for which offers are suppressed
+            :type suppressed_roles: list
+            '''
+            if 'id' not in framework_info:
+                framework_info = dict(framework_info)
+                framework_info['id'] = {'value': self.frameworkId}
+            message = {
+                "framework_id": {"value": self.frameworkId},
+                "type": "UPDATE_FRAMEWORK",
+                "update_framework": {
+                    "framework_info": framework_info
+                }
+            }
+            if offer_constraints:
+                message['update_framework']['offer_constraints'] = offer_constraints.to_json()
+            if suppressed_roles:
+                message['update_framework']['suppressed_roles'] = suppressed_roles
+            try:
+                r = self.send_call(message)
             except Exception as e:
                 raise MesosException(e)
+            if r.status_code >= 300:
+                raise MesosException('Mesos:UpdateFramework:Error:%d:%s' % (r.status_code, r.text))
+            return True
 
         def kill(self, agent_id, task_id):
             '''
@@ -142,11 +183,6 @@ class MesosClient(object):
             :type task_id: str
             '''
             self.logger.debug('Kill task %s' % (str(task_id)))
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'Mesos-Stream-Id': self.streamId
-            }
             message = {
                 "framework_id": {"value": self.frameworkId},
                 "type": "KILL",
@@ -156,18 +192,56 @@ class MesosClient(object):
                 }
             }
             try:
-                requests.post(
-                    self.mesos_url + '/api/v1/scheduler',
-                    json.dumps(message),
-                    headers=headers,
-                    auth=self.requests_auth,
-                    verify=self.verify
-                )
+                self.send_call(message)
             except Exception as e:
                 self.logger.error('Mesos:Kill:Exception:' + str(e))
                 raise MesosException(e)
             return True
 
+        def kill_many(self, tasks, concurrency=bulk.DEFAULT_CONCURRENCY, progress=None):
+            '''
+            Kill tasks concurrently over pooled connections
+
+            :param tasks: list of (agent_id, task_id)
+            :type tasks: list
+            :param concurrency: maximum number of KILL calls sent at once
+            :type concurrency: int
+            :param progress: function(done, total, errors) called after each call
+            :type progress: def
+            :return: `mesoshttp.bulk.BulkResult` by task identifier
+            '''
+            return bulk.kill_many(self, tasks, concurrency, progress)
+
+        def accept_many(self, launches, options=None, concurrency=bulk.DEFAULT_CONCURRENCY, progress=None):
+            '''
+            Launch tasks on offers, with one ACCEPT per agent, sent concurrently
+
+            :param launches: list of (offer, JSON TaskInfo instances)
+            :type launches: list
+            :param options: Optional offer additional params (filters, ...)
+            :type options: dict
+            :param concurrency: maximum number of ACCEPT calls sent at once
+            :type concurrency: int
+            :param progress: function(done, total, errors) called after each call
+            :type progress: def
+            :return: `mesoshttp.bulk.BulkResult` by agent identifier
+            '''
+            return bulk.accept_many(launches, options, concurrency, progress)
+
+        def message_many(self, messages, concurrency=bulk.DEFAULT_CONCURRENCY, progress=None):
+            '''
+            Send messages to executors concurrently
+
+            :param messages: list of (agent_id, executor_id, message), message being raw bytes encoded as Base64
+            :type messages: list
+            :param concurrency: maximum number of MESSAGE calls sent at once
+            :type concurrency: int
+            :param progress: function(done, total, errors) called after each call
+            :type progress: def
+            :return: `mesoshttp.bulk.BulkResult` by message index
+            '''
+            return bulk.message_many(self, messages, concurrency, progress)
+
         def shutdown(self, agent_id, executor_id):
             '''
             Shutdown an executor
@@ -178,11 +252,6 @@ class MesosClient(object):
             :type executor_id: str
             '''
             self.logger.debug('Shutdown executor %s' % (str(executor_id)))
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'Mesos-Stream-Id': self.streamId
-            }
             message = {
                 "framework_id": {"value": self.frameworkId},
                 "type": "SHUTDOWN",
@@ -192,13 +261,7 @@ class MesosClient(object):
                 }
             }
             try:
-                requests.post(
-                    self.mesos_url + '/api/v1/scheduler',
-                    json.dumps(message),
-                    headers=headers,
-                    auth=self.requests_auth,
-                    verify=self.verify
-                )
+                self.send_call(message)
             except Exception as e:
                 raise MesosException(e)
             return True
@@ -217,11 +280,6 @@ class MesosClient(object):
             self.logger.debug(
                 'Send message to executor %s' % (str(executor_id))
             )
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'Mesos-Stream-Id': self.streamId
-            }
             message = {
                 "framework_id": {"value": self.frameworkId},
                 "type": "MESSAGE",
@@ -232,13 +290,7 @@ class MesosClient(object):
                 }
             }
             try:
-                requests.post(
-                    self.mesos_url + '/api/v1/scheduler',
-                    json.dumps(message),
-                    headers=headers,
-                    auth=self.requests_auth,
-                    verify=self.verify
-                )
+                self.send_call(message)
             except Exception as e:
                 raise MesosException(e)
             return True
@@ -254,12 +306,6 @@ class MesosClient(object):
 
             if not tasks:
                 return True
-
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'Mesos-Stream-Id': self.streamId
-            }
             message = {
                 "framework_id": {"value": self.frameworkId},
                 "type": "RECONCILE",
@@ -269,13 +315,7 @@ class MesosClient(object):
             }
 
             try:
-                requests.post(
-                    self.mesos_url + '/api/v1/scheduler',
-                    json.dumps(message),
-                    headers=headers,
-                    auth=self.requests_auth,
-                    verify=self.verify
-                )
+                self.send_call(message)
             except Exception as e:
                 raise MesosException(e)
             return True
@@ -292,10 +332,33 @@ class MesosClient(object):
                 frameworkId=self.frameworkId,
                 streamId=self.streamId,
                 requests_auth=self.requests_auth,
-                verify=self.verify
+                verify=self.verify,
+                codec=self.codec,
+                session=self.session,
+                task_queue=self.task_queue,
+                decline_filter=self.decline_filter
             )
         return self.driver
 
+    def get_operator_client(self, mesos_url=None):
+        '''
+        Get a master operator API client using framework authentication settings
+
+        :param mesos_url: master http endpoint, defaults to connected master
+        :type mesos_url: str
+        :return: `mesoshttp.operator_api.OperatorClient`
+        '''
+        if mesos_url is None:
+            mesos_url = self.mesos_url
+        if mesos_url is None:
+            raise MesosException('Not connected to a mesos master')
+        return OperatorClient(
+            mesos_url,
+            requests_auth=self.requests_auth,
+            verify=self.verify,
+            connection_timeout=self.connection_timeout
+        )
+
     def disconnect_framework(self):
         '''
         Stops framework but does not teardown (unregister) the framework
@@ -308,13 +371,162 @@ class MesosClient(object):
 
     def set_role(self, role_name):
         '''
-        Set Mesos role to use by framework
+        Set Mesos role to use by framework, on next SUBSCRIBE
+
+        Use `update_framework` to change role of a subscribed framework.
 
         :param role_name: Mesos role name
         :type role_name: str
         '''
         self.frameworkRole = role_name
 
+    def set_offer_constraints(self, offer_constraints):
+        '''
+        Set agent attribute constraints per role, sent on SUBSCRIBE so that
+        master does not send offers of agents the framework will not use
+
+        Roles of constraints must be framework roles ('*' if no role is set).
+        Needs Mesos >= 1.11, older masters ignore constraints. Use
+        `update_framework` to change constraints of a subscribed framework.
+
+        :param offer_constraints: constraints, None to remove constraints
+        :type offer_constraints: `mesoshttp.constraints.OfferConstraints`
+        '''
+        self.offer_constraints = offer_constraints
+
+    def set_offers_streaming(self, streaming):
+        '''
+        Decode offers of OFFERS events while callbacks iterate over them
+
+        When activated, OFFERS callbacks get an iterable decoding offers one
+        at a time instead of a list, so that callbacks can start handling first
+        offers of a large event before others are decoded. The iterable can be
+        iterated several times, each offer is decoded once and the same `Offer`
+        is returned by all iterations. It does not support len() or indexing.
+
+        :param streaming: de/activate offers streaming
+        :type streaming: bool
+        '''
+        if streaming:
+            self.__raw_events.add('OFFERS')
+        else:
+            self.__raw_events.discard('OFFERS')
+
+    def set_update_coalescing(self, window):
+        '''
+        Deliver only the latest update of each task within a time window
+
+        All updates are still acknowledged on receive, but UPDATE callbacks
+        get only the latest state of a task received during the window.
+        Updates in a terminal state are delivered immediately. Pending updates
+        are delivered when an event is received after the window, so delivery
+        may be delayed up to the heartbeat interval.
+
+        :param window: window in seconds, None or 0 to deliver all updates
+        :type window: float
+        '''
+        self.__flush_updates(force=True)
+        if window:
+            self.update_coalescer = UpdateCoalescer(window)
+        else:
+            self.update_coalescer = None
+
+    def set_priority_dispatch(self, priority_dispatch, maxsize=PriorityEventQueue.MAXSIZE):
+        '''
+        Handle events by priority instead of arrival order
+
+        When activated, events are read from master connection in
+        `MesosClient.register` thread and handled in a separate thread,
+        SUBSCRIBED/ERROR/HEARTBEAT first, then RESCIND/FAILURE, UPDATE,
+        MESSAGE and OFFERS events. Offers rescinded while their OFFERS
+        event is waiting are not delivered. Master connection is not read
+        while maxsize events are waiting.
+
+        :param priority_dispatch: de/activate priority dispatch
+        :type priority_dispatch: bool
+        :param maxsize: maximum number of waiting events, 0 for no limit
+        :type maxsize: int
+        '''
+        self.priority_dispatch = priority_dispatch
+        self.priority_maxsize = maxsize
+
+    def set_tracer(self, tracer):
+        '''
+        Trace launch stages of tasks (offer reception, ACCEPT, updates)
+
+        :param tracer: tracer, None to stop tracing
+        :type tracer: `mesoshttp.tracing.LaunchTracer`
+        '''
+        self.tracer = tracer
+        self.__context = None
+
+    def set_fit_cache(self, maxsize):
+        '''
+        Cache results of submitted tasks fit checks per agent and task shape
+
+        Useful when many tasks have the same resources and constraints, fit
+        of a shape on an agent is checked once while agent resources do not
+        change. Constraint functions must only depend on offer agent.
+
+        :param maxsize: maximum number of cached results, 0 to disable cache
+        :type maxsize: int
+        '''
+        if maxsize:
+            self.task_queue.fit_cache = FitCache(maxsize)
+        else:
+            self.task_queue.fit_cache = None
+
+    def set_session(self, session):
+        '''
+        Set a `requests.Session` used to send calls to master
+
+        Session connections are reused between calls, and can be shared by
+        several frameworks connected to the same master.
+
+        :param session: session to use, None to use a new connection per call
+        :type session: `requests.Session` or `mesoshttp.transport.Transport`
+        '''
+        self.session = session
+        self.__context = None
+        self.driver = None
+
+    def set_transport(self, transport):
+        '''
+        Set transport used to send calls to master
+
+        Example: `client.set_transport(HTTPTransport())` to send calls on
+        lightweight persistent connections instead of requests.
+
+        :param transport: transport to use, None to use a new requests connection per call
+        :type transport: `mesoshttp.transport.Transport`
+        '''
+        self.set_session(transport)
+
+    def set_codec(self, codec):
+        '''
+        Set encoding of scheduler stream and calls
+
+        Example: `client.set_codec(ProtobufCodec())` to use application/x-protobuf
+        content type. Protobuf events are converted to the same dicts as JSON
+        events. Offers streaming is only supported with JSON.
+
+        :param codec: codec to use, defaults to JSON
+        :type codec: `mesoshttp.codec.JsonCodec` or `mesoshttp.codec.ProtobufCodec`
+        '''
+        self.codec = codec or JSON_CODEC
+        self.__context = None
+
+    def set_decline_filter(self, decline_filter):
+        '''
+        Set a decline filter computing refuse_seconds when declining offers
+
+        :param decline_filter: filter to use, None to disable
+        :type decline_filter: `mesoshttp.filters.AdaptiveDeclineFilter`
+        '''
+        self.decline_filter = decline_filter
+        self.__context = None
+        self.driver = None
+
     def __init__(
             self,
             mesos_urls,
@@ -353,6 +565,7 @@ class MesosClient(object):
         self.frameworkUser = frameworkUser
         self.mesos_urls = mesos_urls
         self.mesos_url_index = 0
+        self.mesos_url = None
         self.max_reconnect = max_reconnect
         self.driver = None
         self.streamId = None
@@ -368,7 +581,22 @@ class MesosClient(object):
             MesosClient.RESCIND: [],
             MesosClient.DISCONNECTED: [],
             MesosClient.RECONNECTED: [],
-            MesosClient.HEARTBEAT: []
+            MesosClient.HEARTBEAT: [],
+            MesosClient.MESSAGE: []
+        }
+        # Event handlers, events whose payload is only used by callbacks
+        # are not decoded if there is no callback, events in __raw_events
+        # are not decoded before calling handler
+        self.__raw_events = set(['HEARTBEAT'])
+        self.__handlers = {
+            'SUBSCRIBED': self.__handle_subscribed,
+            'OFFERS': self.__handle_offers,
+            'UPDATE': self.__handle_update,
+            'ERROR': self.__handle_error,
+            'RESCIND': self.__handle_callback_only,
+            'MESSAGE': self.__handle_callback_only,
+            'FAILURE': self.__handle_callback_only,
+            'HEARTBEAT': self.__handle_heartbeat
         }
 
         self.principal = None
@@ -382,6 +610,23 @@ class MesosClient(object):
         self.disconnected = False
         self.requests_auth = None
         self.verify = True
+        self.decline_filter = None
+        self.__context = None
+        self.update_coalescer = None
+        self.update_dispatcher = UpdateDispatcher()
+        self.task_queue = TaskQueue(self.update_dispatcher)
+        self.constraint_engine = ConstraintEngine()
+        self.constraint_engine.attach(self.update_dispatcher)
+        self.offer_constraints = None
+        self.codec = JSON_CODEC
+        self.session = None
+        self.tracer = None
+        # Reception time of record being processed, set if tracer is set
+        self.__record_time = None
+        self.priority_dispatch = False
+        self.priority_maxsize = PriorityEventQueue.MAXSIZE
+        # Offers rescinded while their OFFERS event was waiting for dispatch
+        self.__rescinded = None
 
     def set_credentials(self, principal, secret):
         '''
@@ -405,7 +650,12 @@ class MesosClient(object):
         :type verify: bool
         '''
 
+        try:
+            from mesoshttp.acs import DCOSServiceAuth
+        except ImportError as e:
+            raise MesosException('DCOS support not available, install mesoshttp[dcos]: %s' % (str(e)))
         self.requests_auth = DCOSServiceAuth(service_secret)
+        self.__context = None
         self.principal = self.requests_auth.principal
 
         cert_file = 'dcos-ca.crt'
@@ -443,29 +693,79 @@ class MesosClient(object):
         :param callback: function to call on event
         :type callback: def
         '''
-        if eventName == MesosClient.SUBSCRIBED:
-            self.callbacks[MesosClient.SUBSCRIBED].append(callback)
-        elif eventName == MesosClient.OFFERS:
-            self.callbacks[MesosClient.OFFERS].append(callback)
-        elif eventName == MesosClient.UPDATE:
-            self.callbacks[MesosClient.UPDATE].append(callback)
-        elif eventName == MesosClient.ERROR:
-            self.callbacks[MesosClient.ERROR].append(callback)
-        elif eventName == MesosClient.FAILURE:
-            self.callbacks[MesosClient.FAILURE].append(callback)
-        elif eventName == MesosClient.RESCIND:
-            self.callbacks[MesosClient.RESCIND].append(callback)
-        elif eventName == MesosClient.DISCONNECTED:
-            self.callbacks[MesosClient.DISCONNECTED].append(callback)
-        elif eventName == MesosClient.RECONNECTED:
-            self.callbacks[MesosClient.RECONNECTED].append(callback)
-        elif eventName == MesosClient.HEARTBEAT:
-            self.callbacks[MesosClient.HEARTBEAT].append(callback)
-        else:
+        if eventName not in self.callbacks:
             self.logger.error('No event %s' % (eventName))
             return False
+        self.callbacks[eventName].append(callback)
         return True
 
+    def watch_task(self, task_id, callback):
+        '''
+        Register callback for the updates of a task
+
+        :param task_id: task identifier
+        :type task_id: str
+        :param callback: function to call with update
+        :type callback: def
+        '''
+        return self.update_dispatcher.watch_task(task_id, callback)
+
+    def unwatch_task(self, task_id, callback):
+        '''
+        Unregister a task update callback
+        '''
+        return self.update_dispatcher.unwatch_task(task_id, callback)
+
+    def watch_agent(self, agent_id, callback):
+        '''
+        Register callback for the updates of tasks on an agent
+
+        :param agent_id: agent identifier
+        :type agent_id: str
+        :param callback: function to call with update
+        :type callback: def
+        '''
+        return self.update_dispatcher.watch_agent(agent_id, callback)
+
+    def unwatch_agent(self, agent_id, callback):
+        '''
+        Unregister an agent update callback
+        '''
+        return self.update_dispatcher.unwatch_agent(agent_id, callback)
+
+    def watch_state(self, state, callback):
+        '''
+        Register callback for the updates with a task state
+
+        :param state: task state (TASK_RUNNING, ...)
+        :type state: str
+        :param callback: function to call with update
+        :type callback: def
+        '''
+        return self.update_dispatcher.watch_state(state, callback)
+
+    def unwatch_state(self, state, callback):
+        '''
+        Unregister a state update callback
+        '''
+        return self.update_dispatcher.unwatch_state(state, callback)
+
+    def wait_for_task(self, task_id, states=('TASK_RUNNING',), fail_on_terminal=True):
+        '''
+        Get a future resolved when a task reaches one of the states
+
+        Example: `client.wait_for_task(task_id).result(timeout=60)`
+
+        :param task_id: task identifier
+        :type task_id: str
+        :param states: expected task states, defaults to TASK_RUNNING
+        :type states: list
+        :param fail_on_terminal: fail future if task reaches another terminal state
+        :type fail_on_terminal: bool
+        :return: `mesoshttp.watch.TaskFuture`
+        '''
+        return self.update_dispatcher.wait_for(task_id, states, fail_on_terminal)
+
     def __event_offers(self, offers):
         return self.__event_callback(MesosClient.OFFERS, offers)
 
@@ -473,7 +773,8 @@ class MesosClient(object):
         return self.__event_callback(MesosClient.ERROR, message)
 
     def __event_update(self, update):
-        return self.__event_callback(MesosClient.UPDATE, update)
+        is_ok = self.__event_callback(MesosClient.UPDATE, update)
+        return self.update_dispatcher.dispatch(update) and is_ok
 
     def __event_subscribed(self):
         return self.__event_callback(MesosClient.SUBSCRIBED, self.get_driver())
@@ -574,6 +875,23 @@ class MesosClient(object):
         '''
         self.capabilities.append({'type': capability})
 
+    def resolve_master_url(self, mesos_url):
+        '''
+        Get master http endpoint from a mesos url, detecting master in zookeeper for zk:// urls
+
+        :param mesos_url: http(s):// or zk:// url
+        :type mesos_url: str
+        :return: str master http endpoint
+        '''
+        if not mesos_url.startswith('zk://'):
+            return mesos_url
+        self.logger.debug('Use zookeeper url, try to detect master')
+        zk_info = mesos_url.replace('zk://', '').split('/')
+        zk_url = self.__zk_detect(zk_info[0], '/'.join(zk_info[1:]))
+        if zk_url is None:
+            raise Exception('Could not detect master in zookeeper')
+        return zk_url
+
     def __zk_detect(self, zk_url, prefix='/mesos'):
         '''
         Try to get master url info from zookeeper
@@ -583,6 +901,10 @@ class MesosClient(object):
         :param prefix: prefix to search for in zookeeper
         :type prefix: str
         '''
+        try:
+            from kazoo.client import KazooClient
+        except ImportError as e:
+            raise MesosException('Zookeeper support not available, install mesoshttp[zookeeper]: %s' % (str(e)))
         mesos_master = None
         mesos_prefix = prefix
         if not prefix.startswith('/'):
@@ -612,58 +934,262 @@ class MesosClient(object):
         self.logger.debug('Zookeeper mesos master: %s' % (str(mesos_master)))
         return mesos_master
 
-    def __register(self):
-        python_version = sys.version_info.major
-        headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        }
-        subscribe = {
-            "type": "SUBSCRIBE",
-            "subscribe": {
-                "framework_info": {
-                    "user": self.frameworkUser,
-                    "name": self.frameworkName,
-                    "hostname": self.frameworkHostname,
-                    "webui_url": self.frameworkWebUI
-                }
-            }
+    def process_record(self, record):
+        '''
+        Dispatch a raw event record to its handler
+
+        Record is decoded only if the handler or a callback needs it.
+
+        :param record: raw event received from master
+        :type record: bytes
+        '''
+        if self.tracer is not None:
+            self.__record_time = time.time()
+        self.__flush_updates()
+        event_type = self.codec.peek_event_type(record)
+        body = None
+        if event_type is None:
+            body = self.codec.decode(record)
+            event_type = body['type']
+        self.logger.debug('Mesos:Event:%s' % (event_type))
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('Mesos:Message:' + record.decode('utf-8', 'replace'))
+        handler = self.__handlers.get(event_type)
+        if handler is None:
+            self.logger.warn(
+                '%s event no yet implemented' % (str(event_type))
+            )
+            return
+        if handler == self.__handle_callback_only and not self.callbacks[event_type]:
+            return
+        if body is None and event_type not in self.__raw_events:
+            body = self.codec.decode(record)
+        handler(event_type, body, record)
+
+    def __handle_subscribed(self, event_type, body, record):
+        self.frameworkId = body['subscribed']['framework_id']['value']
+        self.__context = None
+        self.logger.info(
+            'Mesos:Subscribe:Framework-Id:' + self.frameworkId
+        )
+        self.logger.info(
+            'Mesos:Subscribe:Stream-Id:' + self.streamId
+        )
+        if 'master_info' in body['subscribed']:
+            self.master_info = body['subscribed']['master_info']
+        self.__event_subscribed()
+
+    def __get_context(self):
+        '''
+        Get connection settings shared by offers and updates of current stream
+        '''
+        if self.__context is None:
+            self.__context = MesosContext(
+                self.mesos_url,
+                frameworkId=self.frameworkId,
+                streamId=self.streamId,
+                requests_auth=self.requests_auth,
+                verify=self.verify,
+                decline_filter=self.decline_filter,
+                codec=self.codec,
+                session=self.session,
+                tracer=self.tracer
+            )
+        return self.__context
+
+    def __create_offer(self, mesos_offer):
+        if self.tracer is not None:
+            self.tracer.offer_received(mesos_offer['id']['value'], self.__record_time)
+        return Offer.from_context(self.__get_context(), mesos_offer)
+
+    def __handle_offers(self, event_type, body, record):
+        if body is None:
+            if self.codec.streaming and not self.task_queue and self.callbacks[MesosClient.OFFERS]:
+                self.__event_offers(LazyOffers(record, self.__create_offer, self.__rescinded))
+                return
+            body = self.codec.decode(record)
+        mesos_offers = body['offers']['offers']
+        offers = []
+        for mesos_offer in mesos_offers:
+            if self.__rescinded and mesos_offer['id']['value'] in self.__rescinded:
+                self.logger.debug('Mesos:Offer:Rescinded:' + mesos_offer['id']['value'])
+                continue
+            offers.append(self.__create_offer(mesos_offer))
+        if self.task_queue:
+            offers = self.task_queue.launch(offers)
+        if not self.callbacks[MesosClient.OFFERS]:
+            # no one else can use offers, do not keep them outstanding
+            for offer in offers:
+                offer.decline()
+            return
+        self.__event_offers(offers)
+
+    def __handle_update(self, event_type, body, record):
+        mesos_update = body['update']
+        if self.tracer is not None:
+            self.tracer.update(mesos_update, self.__record_time)
+        update_event = Update.from_context(self.__get_context(), mesos_update)
+        update_event.ack()
+        if self.update_coalescer is None:
+            self.__event_update(mesos_update)
+            return
+        for update in self.update_coalescer.add(mesos_update):
+            self.__event_update(update)
+
+    def __flush_updates(self, force=False):
+        if self.update_coalescer is None:
+            return
+        for update in self.update_coalescer.flush(force):
+            self.__event_update(update)
+
+    def __handle_error(self, event_type, body, record):
+        self.logger.error('Mesos:Error:' + body['error']['message'])
+        self.__event_error(body['error']['message'])
+
+    def __handle_callback_only(self, event_type, body, record):
+        self.__event_callback(event_type, body[event_type.lower()])
+
+    def __handle_heartbeat(self, event_type, body, record):
+        self.logger.debug('Mesos:Heartbeat')
+        self.__event_heartbeat(event_type)
+
+    def get_framework_info(self):
+        '''
+        Get the FrameworkInfo of the framework, from current settings
+
+        :return: dict JSON FrameworkInfo
+        '''
+        framework_info = {
+            "user": self.frameworkUser,
+            "name": self.frameworkName,
+            "hostname": self.frameworkHostname,
+            "webui_url": self.frameworkWebUI
         }
 
         if self.frameworkRole:
-            subscribe['subscribe']['framework_info']['role'] = self.frameworkRole
+            framework_info['role'] = self.frameworkRole
 
         if self.capabilities:
-            subscribe['subscribe']['framework_info']['capabilities'] = self.capabilities
+            framework_info['capabilities'] = self.capabilities
 
         if self.failover_timeout:
-            subscribe['subscribe']['framework_info']['failover_timeout'] = self.failover_timeout
+            framework_info['failover_timeout'] = self.failover_timeout
 
         if self.principal:
-            subscribe['subscribe']['framework_info']['principal'] = self.principal
-            if self.secret:
-                credentials = [
-                    {'principal': self.principal, 'secret': self.secret}
-                ]
-                subscribe['subscribe']['credentials'] = credentials
+            framework_info['principal'] = self.principal
 
         if self.frameworkId:
-            subscribe['subscribe']['framework_info']['id'] = {
+            framework_info['id'] = {
                 'value': self.frameworkId
             }
+        return framework_info
+
+    def get_subscribe_call(self):
+        '''
+        Get the SUBSCRIBE call of the framework
+
+        :return: dict JSON call
+        '''
+        subscribe = {
+            "type": "SUBSCRIBE",
+            "subscribe": {
+                "framework_info": self.get_framework_info()
+            }
+        }
+
+        if self.principal and self.secret:
+            credentials = [
+                {'principal': self.principal, 'secret': self.secret}
+            ]
+            subscribe['subscribe']['credentials'] = credentials
+
+        if self.frameworkId:
             subscribe['framework_id'] = {'value': self.frameworkId}
+
+        if self.offer_constraints:
+            subscribe['subscribe']['offer_constraints'] = self.offer_constraints.to_json()
+        return subscribe
+
+    def update_framework(self, role=None, capabilities=None, failover_timeout=None, offer_constraints=None):
+        '''
+        Change framework settings, applied in place with an UPDATE_FRAMEWORK
+        call if framework is subscribed (Mesos >= 1.9), else on next SUBSCRIBE
+
+        Settings which are None are not changed. Local settings are kept if
+        master refuses the update.
+
+        :param role: Mesos role name
+        :type role: str
+        :param capabilities: capability names, replacing current capabilities
+        :type capabilities: list
+        :param failover_timeout: framework failover timeout, in seconds
+        :type failover_timeout: int
+        :param offer_constraints: offer constraints, empty constraints to remove them
+        :type offer_constraints: `mesoshttp.constraints.OfferConstraints`
+        :return: True if update was sent to master, False if framework is not subscribed
+        '''
+        previous = (self.frameworkRole, self.capabilities, self.failover_timeout, self.offer_constraints)
+        if role is not None:
+            self.frameworkRole = role
+        if capabilities is not None:
+            self.capabilities = [{'type': capability} for capability in capabilities]
+        if failover_timeout is not None:
+            self.failover_timeout = failover_timeout
+        if offer_constraints is not None:
+            self.offer_constraints = offer_constraints
+        if not self.frameworkId or not self.streamId:
+            return False
+        try:
+            self.get_driver().update_framework(self.get_framework_info(), self.offer_constraints)
+        except MesosException:
+            (self.frameworkRole, self.capabilities, self.failover_timeout, self.offer_constraints) = previous
+            raise
+        return True
+
+    def open_stream(self, mesos_url, stream_id):
+        '''
+        Set connected master and stream identifier once subscription is accepted
+
+        Called by `MesosClient.register`, or by `mesoshttp.multiplex.FrameworkMultiplexer`
+        when it manages the subscription connection.
+
+        :param mesos_url: connected master http endpoint
+        :type mesos_url: str
+        :param stream_id: Mesos-Stream-Id of the subscription
+        :type stream_id: str
+        '''
+        self.mesos_url = mesos_url
+        self.streamId = stream_id
+        self.driver = None
+        self.__context = None
+        if self.disconnected:
+            self.__event_reconnected()
+            self.disconnected = False
+
+    def close_stream(self, error=None):
+        '''
+        Handle end of the subscription connection
+
+        :param error: reason if connection was lost
+        :type error: str
+        '''
+        self.__flush_updates(force=True)
+        if error is not None:
+            self.logger.error('Mesos:Stream:Closed:' + error)
+            self.__event_disconnected()
+            self.disconnected = True
+
+    def __register(self):
+        headers = {
+            'Content-Type': self.codec.content_type,
+            'Accept': self.codec.content_type
+        }
+        subscribe = self.get_subscribe_call()
         ok = False
         self.long_pool = None
         while (not ok) and self.mesos_url_index < len(self.mesos_urls):
             try:
-                self.mesos_url = self.mesos_urls[self.mesos_url_index]
-                if self.mesos_url.startswith('zk://'):
-                    self.logger.debug('Use zookeeper url, try to detect master')
-                    zk_info = self.mesos_url.replace('zk://', '').split('/')
-                    zk_url = self.__zk_detect(zk_info[0], '/'.join(zk_info[1:]))
-                    if zk_url is None:
-                        raise Exception('Could not detect master in zookeeper')
-                    self.mesos_url = zk_url
+                self.mesos_url = self.resolve_master_url(self.mesos_urls[self.mesos_url_index])
                 self.logger.warn(
                     'Try to connect to master: %s' % (self.mesos_url)
                 )
@@ -672,7 +1198,7 @@ class MesosClient(object):
                     self.logger.debug("connection timeout set")
                     self.long_pool = requests.post(
                         self.mesos_url + '/api/v1/scheduler',
-                        json.dumps(subscribe),
+                        self.codec.encode(subscribe),
                         stream=True,
                         headers=headers,
                         verify=self.verify,
@@ -682,7 +1208,7 @@ class MesosClient(object):
                 else:
                     self.long_pool = requests.post(
                         self.mesos_url + '/api/v1/scheduler',
-                        json.dumps(subscribe),
+                        self.codec.encode(subscribe),
                         stream=True,
                         headers=headers,
                         verify=self.verify,
@@ -697,7 +1223,7 @@ class MesosClient(object):
                         self.mesos_url = self.long_pool.headers['Location']
                         self.long_pool = requests.post(
                             self.mesos_url + '/api/v1/scheduler',
-                            json.dumps(subscribe),
+                            self.codec.encode(subscribe),
                             stream=True,
                             headers=headers,
                             auth=self.requests_auth,
@@ -721,88 +1247,48 @@ class MesosClient(object):
             )
             return False
 
-        self.streamId = self.long_pool.headers['Mesos-Stream-Id']
+        self.open_stream(self.mesos_url, self.long_pool.headers['Mesos-Stream-Id'])
 
-        if self.disconnected:
-            self.__event_reconnected()
-            self.disconnected = False
+        events = None
+        if self.priority_dispatch:
+            events = PriorityEventQueue(self.codec, self.priority_maxsize)
+            dispatcher = threading.Thread(target=self.__dispatch_events, args=(events,))
+            dispatcher.daemon = True
+            dispatcher.start()
 
-        first_line = True
-        for line in self.long_pool.iter_lines():
-            if self.stop or self.disconnect:
-                if self.stop and self.driver:
-                    self.driver.tearDown()
-                break
-            # filter out keep-alive new lines
-            if first_line:
-                count_bytes = int(line)
-                first_line = False
-                continue
-            else:
-                if python_version == 3:
-                    line = line.decode('UTF-8')
-                body = json.loads(line[:count_bytes])
-                self.logger.debug('Mesos:Event:%s' % (str(body['type'])))
-                self.logger.debug('Mesos:Message:' + str(body))
-                if body['type'] == 'SUBSCRIBED':
-                    self.frameworkId = body['subscribed']['framework_id']['value']
-                    self.logger.info(
-                        'Mesos:Subscribe:Framework-Id:' + self.frameworkId
-                    )
-                    self.logger.info(
-                        'Mesos:Subscribe:Stream-Id:' + self.streamId
-                    )
-                    if 'master_info' in body['subscribed']:
-                        self.master_info = body['subscribed']['master_info']
-                    self.__event_subscribed()
-                elif body['type'] == 'OFFERS':
-                    mesos_offers = body['offers']['offers']
-                    offers = []
-                    for mesos_offer in mesos_offers:
-                        offers.append(
-                            Offer(
-                                self.mesos_url,
-                                frameworkId=self.frameworkId,
-                                streamId=self.streamId,
-                                mesosOffer=mesos_offer,
-                                requests_auth=self.requests_auth,
-                                verify=self.verify
-                            )
-                        )
-                    self.__event_offers(offers)
-                elif body['type'] == 'UPDATE':
-                    mesos_update = body['update']
-                    update_event = Update(
-                        self.mesos_url,
-                        frameworkId=self.frameworkId,
-                        streamId=self.streamId,
-                        mesosUpdate=mesos_update,
-                        requests_auth=self.requests_auth,
-                        verify=self.verify 
-                    )
-                    update_event.ack()
-                    self.__event_update(mesos_update)
-                elif body['type'] == 'ERROR':
-                    self.logger.error('Mesos:Error:' + body['error']['message'])
-                    self.__event_error(body['error']['message'])
-                elif body['type'] == 'RESCIND':
-                    self.__event_callback(body['type'], body['rescind'])
-                elif body['type'] == 'MESSAGE':
-                    self.__event_callback(body['type'], body['message'])
-                elif body['type'] == 'FAILURE':
-                    self.__event_callback(body['type'], body['failure'])
-                elif body['type'] == 'HEARTBEAT':
-                    self.logger.debug('Mesos:Heartbeat')
-                    self.__event_heartbeat(body['type'])
+        try:
+            for record in iter_records(self.long_pool.iter_content(MesosClient.CHUNK_SIZE)):
+                if self.stop or self.disconnect:
+                    if self.stop and self.driver:
+                        self.driver.tearDown()
+                    break
+                if events is None:
+                    self.process_record(record)
                 else:
-                    self.logger.warn(
-                        '%s event no yet implemented' % (str(body['type']))
-                    )
-
-                if line[count_bytes:]:
-                    count_bytes = int(line[count_bytes:])
+                    events.put(record)
+        finally:
+            if events is not None:
+                events.close(discard=self.stop or self.disconnect)
+                dispatcher.join()
+        self.close_stream()
         return True
 
+    def __dispatch_events(self, events):
+        '''
+        Handle queued events by priority until queue is closed
+        '''
+        while True:
+            item = events.get()
+            if item is None:
+                break
+            (record, self.__rescinded) = item
+            try:
+                self.process_record(record)
+            except Exception:
+                self.logger.exception('Mesos:Dispatch:Error')
+            finally:
+                self.__rescinded = None
+
     def combine_offers(self, offers, operations, options=None):
         '''
         Accept offers with task operations
@@ -810,12 +1296,14 @@ class MesosClient(object):
         :param offers: offers to be accepted
         :type offers: list
         :param operations: JSON TaskInfo instances to accept
-        :type operations: list of json TaskInfo
+        :type operations: list of json TaskInfo or `mesoshttp.operations.OperationBuilder`
         :param options: optional filters
         :type options: JSON filters instances
 
-        This method does not check if the operations are valid
+        If operations is a list, this method does not check if the operations are valid
         JSON TaskInfo instances and if conform with the offers.
+        If operations is an `OperationBuilder`, operations are validated against
+        the offers resources before being sent in one ACCEPT.
         '''
         if not operations:
             self.logger.debug('Mesos:Accept:no operation to accept')
@@ -829,37 +1317,41 @@ class MesosClient(object):
         offer_ids = [{'value': oid} for oid in ids]
         self.logger.debug('Mesos:COMBINE Offer ids:' + ','.join(ids))
 
-        headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'Mesos-Stream-Id': self.streamId
-        }
+        if isinstance(operations, OperationBuilder):
+            operations.validate(offers)
+            accept_operations = operations.get_operations(offers[0].get_offer()['agent_id']['value'])
+        else:
+            accept_operations = [{
+                'type': 'LAUNCH',
+                'launch': {'task_infos': operations}
+            }]
 
         message = {
             "framework_id": {"value": self.frameworkId},
             "type": "ACCEPT",
             "accept": {
                 "offer_ids": offer_ids,
-                "operations": [{
-                    'type': 'LAUNCH',
-                    'launch': {'task_infos': operations}
-                }]
+                "operations": accept_operations
             }
         }
         if options and options.get('filters'):
             message["accept"]["filters"] = options.get('filters')
 
-        message = json.dumps(message)
+        tracer = self.tracer
+        task_ids = None
+        if tracer is not None:
+            task_ids = tracer.accept_started(message)
         try:
-            r = requests.post(
-                self.mesos_url + '/api/v1/scheduler',
-                message,
-                headers=headers,
-                auth=self.requests_auth,
-                verify=self.verify
-            )
+            r = self.get_driver().send_call(message)
             self.logger.debug('Mesos:Accept:' + str(message))
             self.logger.debug('Mesos:Accept:Anwser:%d:%s' % (r.status_code, r.text))
         except Exception as e:
+            if tracer is not None:
+                tracer.accept_done(task_ids)
             raise MesosException(e)
+        if tracer is not None:
+            tracer.accept_done(task_ids, r.status_code)
+        if self.decline_filter is not None:
+            for offer in offers:
+                self.decline_filter.used(offer.get_offer())
         return True
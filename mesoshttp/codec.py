@@ -0,0 +1,173 @@
+import importlib
+import json
+
+from mesoshttp.exception import MesosException
+from mesoshttp.stream import decode_record, peek_event_type
+
+
+class JsonCodec(object):
+    '''
+    Encode calls and decode events as JSON (default)
+    '''
+
+    content_type = 'application/json'
+    streaming = True
+
+    def encode(self, message):
+        '''
+        Encode a call
+
+        :param message: JSON call
+        :type message: dict
+        :return: str
+        '''
+        return json.dumps(message)
+
+    def decode(self, record):
+        '''
+        Decode an event record
+
+        :param record: raw event
+        :type record: bytes
+        :return: dict
+        '''
+        return decode_record(record)
+
+    def peek_event_type(self, record):
+        '''
+        Get the type of an event record without decoding it
+
+        :param record: raw event
+        :type record: bytes
+        :return: event type or None if type could not be found
+        '''
+        return peek_event_type(record)
+
+
+class ProtobufCodec(object):
+    '''
+    Encode calls and decode events as protobuf messages (application/x-protobuf)
+
+    Events are converted to dicts with the same fields as JSON events, so
+    callbacks work the same with both codecs.
+
+    Generated mesos v1 python modules are not bundled with mesoshttp (they
+    depend on the protobuf runtime version), they must be generated from
+    Mesos sources and available in python path::
+
+        pip install mesoshttp[protobuf]
+        protoc -I mesos/include --python_out=. \\
+            mesos/include/mesos/v1/mesos.proto \\
+            mesos/include/mesos/v1/scheduler/scheduler.proto
+    '''
+
+    content_type = 'application/x-protobuf'
+    # Offers can not be decoded one at a time
+    streaming = False
+
+    def __init__(self, scheduler_module='mesos.v1.scheduler.scheduler_pb2'):
+        '''
+        :param scheduler_module: generated module of mesos/v1/scheduler/scheduler.proto
+        :type scheduler_module: str or module
+        '''
+        try:
+            from google.protobuf import json_format
+            from google.protobuf.descriptor import FieldDescriptor
+            if not hasattr(scheduler_module, 'Call'):
+                scheduler_module = importlib.import_module(scheduler_module)
+        except ImportError as e:
+            raise MesosException('Protobuf support not available: %s' % (str(e)))
+        self._json_format = json_format
+        self._int64_types = (
+            FieldDescriptor.TYPE_INT64, FieldDescriptor.TYPE_UINT64, FieldDescriptor.TYPE_SINT64,
+            FieldDescriptor.TYPE_FIXED64, FieldDescriptor.TYPE_SFIXED64
+        )
+        self._call = scheduler_module.Call
+        self._event = scheduler_module.Event
+        self._event_types = self._event.Type
+
+    def encode(self, message):
+        '''
+        Encode a call
+
+        :param message: JSON call
+        :type message: dict
+        :return: bytes
+        '''
+        call = self._json_format.ParseDict(message, self._call())
+        return call.SerializeToString()
+
+    def decode(self, record):
+        '''
+        Decode an event record
+
+        :param record: serialized Event message
+        :type record: bytes
+        :return: dict
+        '''
+        event = self._event.FromString(record)
+        value = self._json_format.MessageToDict(event, preserving_proto_field_name=True)
+        self.__cast_int64(event.DESCRIPTOR, value)
+        return value
+
+    def __cast_int64(self, descriptor, value):
+        '''
+        Convert back 64 bits integer fields, set as strings by MessageToDict,
+        to integers as in JSON events (ranges, timestamps, ...)
+
+        :param descriptor: descriptor of message
+        :type descriptor: `google.protobuf.descriptor.Descriptor`
+        :param value: dict of message, updated in place
+        :type value: dict
+        '''
+        for field in descriptor.fields:
+            if field.name not in value:
+                continue
+            if field.type in self._int64_types:
+                if isinstance(value[field.name], list):
+                    value[field.name] = [int(item) for item in value[field.name]]
+                else:
+                    value[field.name] = int(value[field.name])
+            elif field.message_type is not None:
+                message_type = field.message_type
+                if message_type.GetOptions().map_entry:
+                    value_field = message_type.fields_by_name['value']
+                    items = value[field.name]
+                    for key in items:
+                        if value_field.type in self._int64_types:
+                            items[key] = int(items[key])
+                        elif value_field.message_type is not None:
+                            self.__cast_int64(value_field.message_type, items[key])
+                elif isinstance(value[field.name], list):
+                    for item in value[field.name]:
+                        self.__cast_int64(message_type, item)
+                else:
+                    self.__cast_int64(message_type, value[field.name])
+
+    def peek_event_type(self, record):
+        '''
+        Get the type of an event record without decoding it
+
+        Event type is field 1, serialized first as varint (tag 0x08)
+
+        :param record: serialized Event message
+        :type record: bytes
+        :return: event type or None if type could not be found
+        '''
+        record = bytearray(record[:6])
+        if not record or record[0] != 0x08:
+            return None
+        value = 0
+        shift = 0
+        for byte in record[1:]:
+            value |= (byte & 0x7f) << shift
+            if not byte & 0x80:
+                try:
+                    return self._event_types.Name(value)
+                except ValueError:
+                    return None
+            shift += 7
+        return None
+
+
+JSON_CODEC = JsonCodec()
@@ -0,0 +1,528 @@
+import logging
+import re
+import threading
+
+from mesoshttp.exception import MesosException
+from mesoshttp.update import TERMINAL_STATES
+
+
+def _attribute_value(attribute):
+    '''
+    Get an agent attribute value as string, as displayed by Mesos
+    '''
+    attribute_type = attribute.get('type')
+    if attribute_type == 'TEXT':
+        return attribute['text']['value']
+    if attribute_type == 'SCALAR':
+        value = attribute['scalar']['value']
+        if value == int(value):
+            return str(int(value))
+        return str(value)
+    if attribute_type == 'RANGES':
+        ranges = attribute['ranges'].get('range', [])
+        return '[' + ','.join(['%d-%d' % (r['begin'], r['end']) for r in ranges]) + ']'
+    if attribute_type == 'SET':
+        return '{' + ','.join(attribute['set'].get('item', [])) + '}'
+    return None
+
+
+class PlacementGroup(object):
+    '''
+    Constraints shared by a group of tasks, with counters of placed tasks
+
+    Constraints are lists `[field, operator, value]`, field being
+    `hostname` or an agent attribute name:
+
+    * UNIQUE: at most one task per field value
+    * MAX_PER n: at most n tasks per field value
+    * CLUSTER value: only on agents with this value, or on the value of
+      first placed task if value is not set
+    * GROUP_BY n: spread tasks evenly across n field values, or across
+      field values of known agents if n is not set
+    * LIKE regex / UNLIKE regex: field value must / must not match regex
+
+    Group is a callable checking an offer, so it can be used as a
+    `SchedulerDriver.submit` constraint. Tasks placed outside of the task
+    queue must be declared with `placed`.
+    '''
+
+    OPERATORS = ('UNIQUE', 'MAX_PER', 'CLUSTER', 'GROUP_BY', 'LIKE', 'UNLIKE')
+
+    def __init__(self, engine, name, constraints):
+        '''
+        :param engine: engine indexing agent attributes
+        :type engine: `ConstraintEngine`
+        :param name: group name
+        :type name: str
+        :param constraints: list of [field, operator, value]
+        :type constraints: list
+        '''
+        self.engine = engine
+        self.name = name
+        self._rules = []
+        self._fields = set()
+        for constraint in constraints:
+            field = constraint[0]
+            operator = constraint[1].upper()
+            value = None
+            if len(constraint) > 2:
+                value = constraint[2]
+            if operator not in PlacementGroup.OPERATORS:
+                raise MesosException('Unknown constraint operator %s' % (operator))
+            if operator == 'MAX_PER':
+                value = int(value or 1)
+            elif operator == 'GROUP_BY' and value is not None:
+                value = int(value)
+            elif operator in ('LIKE', 'UNLIKE'):
+                if value is None:
+                    raise MesosException('Constraint %s needs a regular expression' % (operator))
+                # regex is matched once per distinct field value
+                value = (re.compile('^(?:' + value + ')$'), {})
+            self._rules.append((field, operator, value))
+            self._fields.add(field)
+        # field => {value: number of placed tasks}
+        self._counts = dict([(field, {}) for field in self._fields])
+        # field => {number of placed tasks: number of values}, for GROUP_BY
+        self._histograms = dict([(field, {}) for field in self._fields])
+        # task_id => field values of task agent
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def count(self, field, value):
+        '''
+        Get number of placed tasks with a field value
+
+        :param field: hostname or attribute name
+        :type field: str
+        :param value: field value
+        :type value: str
+        :return: int
+        '''
+        return self._counts.get(field, {}).get(value, 0)
+
+    def __min_count(self, field, groups):
+        counts = self._counts[field]
+        if groups is None:
+            groups = len(self.engine.get_values(field))
+        if len(counts) < groups:
+            return 0
+        histogram = self._histograms[field]
+        return min([count for count, values in histogram.items() if values])
+
+    def __call__(self, offer):
+        '''
+        Check if a task of the group can be placed on offer agent
+
+        :param offer: offer to check
+        :type offer: `mesoshttp.offers.Offer`
+        :return: bool
+        '''
+        attributes = self.engine.get_attributes(offer)
+        with self._lock:
+            for (field, operator, value) in self._rules:
+                field_value = attributes.get(field)
+                if field_value is None:
+                    return False
+                if operator == 'UNIQUE':
+                    if field_value in self._counts[field]:
+                        return False
+                elif operator == 'MAX_PER':
+                    if self._counts[field].get(field_value, 0) >= value:
+                        return False
+                elif operator == 'CLUSTER':
+                    if value is not None:
+                        if field_value != value:
+                            return False
+                    elif self._counts[field] and field_value not in self._counts[field]:
+                        return False
+                elif operator == 'GROUP_BY':
+                    if self._counts[field].get(field_value, 0) > self.__min_count(field, value):
+                        return False
+                else:
+                    (regex, matches) = value
+                    if field_value not in matches:
+                        matches[field_value] = regex.match(field_value) is not None
+                    if matches[field_value] != (operator == 'LIKE'):
+                        return False
+        return True
+
+    def placed(self, task_id, offer):
+        '''
+        Count a task placed on offer agent
+
+        :param task_id: task identifier
+        :type task_id: str
+        :param offer: offer used by task
+        :type offer: `mesoshttp.offers.Offer` or JSON offer
+        '''
+        attributes = self.engine.get_attributes(offer)
+        values = dict([(field, attributes.get(field)) for field in self._fields])
+        with self._lock:
+            if task_id in self._tasks:
+                return
+            self._tasks[task_id] = values
+            for field, value in values.items():
+                if value is not None:
+                    self.__add(field, value, 1)
+        self.engine._add_task(task_id, self)
+
+    def released(self, task_id):
+        '''
+        Stop counting a task, when task ended or could not be launched
+
+        :param task_id: task identifier
+        :type task_id: str
+        :return: False if task was not counted
+        '''
+        with self._lock:
+            values = self._tasks.pop(task_id, None)
+            if values is None:
+                return False
+            for field, value in values.items():
+                if value is not None:
+                    self.__add(field, value, -1)
+        return True
+
+    def __add(self, field, value, delta):
+        counts = self._counts[field]
+        histogram = self._histograms[field]
+        count = counts.get(value, 0)
+        if count:
+            histogram[count] -= 1
+            if not histogram[count]:
+                del histogram[count]
+        count += delta
+        if count:
+            counts[value] = count
+            histogram[count] = histogram.get(count, 0) + 1
+        else:
+            counts.pop(value, None)
+
+
+class ConstraintEngine(object):
+    '''
+    Index of agent attributes and placement groups
+
+    Agent attributes are parsed once per agent, from the first offer of the
+    agent. Terminal task updates release tasks from their group, see
+    `attach`.
+    '''
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        # agent_id => {field: value}
+        self._agents = {}
+        # field => set of values over known agents
+        self._values = {}
+        self._groups = {}
+        # task_id => group
+        self._task_groups = {}
+        self._lock = threading.Lock()
+
+    def get_attributes(self, offer):
+        '''
+        Get indexed attributes of offer agent, hostname included
+
+        :param offer: offer of the agent
+        :type offer: `mesoshttp.offers.Offer` or JSON offer
+        :return: dict field => value
+        '''
+        if hasattr(offer, 'get_offer'):
+            offer = offer.get_offer()
+        agent_id = offer['agent_id']['value']
+        attributes = self._agents.get(agent_id)
+        if attributes is not None:
+            return attributes
+        attributes = {'hostname': offer.get('hostname')}
+        for attribute in offer.get('attributes', []):
+            value = _attribute_value(attribute)
+            if value is not None:
+                attributes[attribute['name']] = value
+        with self._lock:
+            self._agents[agent_id] = attributes
+            for field, value in attributes.items():
+                if value is not None:
+                    self._values.setdefault(field, set()).add(value)
+        return attributes
+
+    def get_values(self, field):
+        '''
+        Get values of a field over known agents
+
+        :param field: hostname or attribute name
+        :type field: str
+        :return: set
+        '''
+        return self._values.get(field, set())
+
+    def forget_agent(self, agent_id):
+        '''
+        Remove an agent from index, its attributes are parsed again on next offer
+
+        :param agent_id: agent identifier
+        :type agent_id: str
+        '''
+        with self._lock:
+            self._agents.pop(agent_id, None)
+
+    def group(self, name, constraints=None):
+        '''
+        Get or create a placement group
+
+        :param name: group name
+        :type name: str
+        :param constraints: list of [field, operator, value], used on group creation
+        :type constraints: list
+        :return: `PlacementGroup`
+        '''
+        with self._lock:
+            group = self._groups.get(name)
+            if group is None:
+                group = PlacementGroup(self, name, constraints or [])
+                self._groups[name] = group
+        return group
+
+    def remove_group(self, name):
+        with self._lock:
+            group = self._groups.pop(name, None)
+            if group is not None:
+                for task_id in list(group._tasks):
+                    self._task_groups.pop(task_id, None)
+        return group is not None
+
+    def _add_task(self, task_id, group):
+        with self._lock:
+            self._task_groups[task_id] = group
+
+    def task_ended(self, update):
+        '''
+        Release task of a terminal update from its group
+
+        :param update: update info received from Mesos
+        :type update: dict
+        '''
+        task_id = update['status']['task_id']['value']
+        with self._lock:
+            group = self._task_groups.pop(task_id, None)
+        if group is not None:
+            group.released(task_id)
+
+    def attach(self, update_dispatcher):
+        '''
+        Release tasks on terminal updates dispatched by an update dispatcher
+
+        :param update_dispatcher: client update dispatcher
+        :type update_dispatcher: `mesoshttp.watch.UpdateDispatcher`
+        '''
+        for state in TERMINAL_STATES:
+            update_dispatcher.watch_state(state, self.task_ended)
+
+
+class OfferConstraints(object):
+    '''
+    Agent attribute predicates per role, sent in SUBSCRIBE so that master
+    only sends offers of matching agents (Mesos >= 1.11)
+
+    Constraints of a group are lists `[field, predicate, value]`, all must
+    match. An agent is offered for a role if any group of the role matches,
+    roles without groups are not filtered. Field is an agent attribute
+    name, or a pseudoattribute: `hostname` (or `@hostname`), `@region`,
+    `@zone`. Predicates are:
+
+    * EXISTS / NOT_EXISTS: field is / is not set
+    * EQUALS value / NOT_EQUALS value: field value is / is not value
+    * LIKE regex / UNLIKE regex: field value must / must not match regex
+
+    As on master, EQUALS, NOT_EQUALS, LIKE and UNLIKE are satisfied by non
+    TEXT attributes::
+
+        offer_constraints = OfferConstraints()
+        offer_constraints.add('*', [['rack', 'LIKE', 'rack-[0-3]'], ['gpu', 'NOT_EXISTS']])
+        client.set_offer_constraints(offer_constraints)
+    '''
+
+    PSEUDOATTRIBUTES = {
+        'hostname': 'HOSTNAME',
+        '@hostname': 'HOSTNAME',
+        '@region': 'REGION',
+        '@zone': 'ZONE'
+    }
+
+    PREDICATES = {
+        'EXISTS': 'exists',
+        'NOT_EXISTS': 'not_exists',
+        'EQUALS': 'text_equals',
+        'NOT_EQUALS': 'text_not_equals',
+        'LIKE': 'text_matches',
+        'UNLIKE': 'text_not_matches'
+    }
+
+    def __init__(self):
+        # role => list of groups, a group being a list of (field, predicate, value)
+        self._roles = {}
+        self._regexes = {}
+
+    def __len__(self):
+        return len(self._roles)
+
+    def roles(self):
+        return list(self._roles)
+
+    def add(self, role, constraints):
+        '''
+        Add a group of constraints to a role
+
+        :param role: role of offers
+        :type role: str
+        :param constraints: list of [field, predicate, value]
+        :type constraints: list
+        '''
+        group = []
+        for constraint in constraints:
+            field = constraint[0]
+            predicate = constraint[1].upper()
+            value = None
+            if len(constraint) > 2:
+                value = constraint[2]
+            if predicate not in OfferConstraints.PREDICATES:
+                raise MesosException('Unknown offer constraint predicate %s' % (predicate))
+            if predicate not in ('EXISTS', 'NOT_EXISTS'):
+                if value is None:
+                    raise MesosException('Offer constraint %s needs a value' % (predicate))
+                if predicate in ('LIKE', 'UNLIKE') and value not in self._regexes:
+                    self._regexes[value] = re.compile('^(?:' + value + ')$')
+            group.append((field, predicate, value))
+        self._roles.setdefault(role, []).append(group)
+
+    def remove(self, role):
+        '''
+        Remove constraints of a role
+
+        :param role: role of offers
+        :type role: str
+        :return: False if role had no constraint
+        '''
+        return self._roles.pop(role, None) is not None
+
+    def to_json(self):
+        '''
+        Get JSON OfferConstraints
+
+        :return: dict
+        '''
+        role_constraints = {}
+        for role, groups in self._roles.items():
+            json_groups = []
+            for group in groups:
+                attribute_constraints = []
+                for (field, predicate, value) in group:
+                    if field in OfferConstraints.PSEUDOATTRIBUTES:
+                        selector = {'pseudoattribute_type': OfferConstraints.PSEUDOATTRIBUTES[field]}
+                    else:
+                        selector = {'attribute_name': field}
+                    if predicate in ('LIKE', 'UNLIKE'):
+                        arguments = {'regex': value}
+                    elif value is not None:
+                        arguments = {'value': value}
+                    else:
+                        arguments = {}
+                    attribute_constraints.append({
+                        'selector': selector,
+                        'predicate': {OfferConstraints.PREDICATES[predicate]: arguments}
+                    })
+                json_groups.append({'attribute_constraints': attribute_constraints})
+            role_constraints[role] = {'groups': json_groups}
+        return {'role_constraints': role_constraints}
+
+    @classmethod
+    def from_json(cls, offer_constraints):
+        '''
+        Create from JSON OfferConstraints
+
+        :param offer_constraints: JSON OfferConstraints
+        :type offer_constraints: dict
+        :return: `OfferConstraints`
+        '''
+        pseudoattributes = dict([(value, key) for key, value in OfferConstraints.PSEUDOATTRIBUTES.items()
+                                 if key != 'hostname'])
+        predicates = dict([(value, key) for key, value in OfferConstraints.PREDICATES.items()])
+        constraints = cls()
+        for role, role_constraints in (offer_constraints or {}).get('role_constraints', {}).items():
+            for group in role_constraints.get('groups', []):
+                fields = []
+                for attribute_constraint in group.get('attribute_constraints', []):
+                    selector = attribute_constraint['selector']
+                    if 'pseudoattribute_type' in selector:
+                        field = pseudoattributes[selector['pseudoattribute_type']]
+                    else:
+                        field = selector['attribute_name']
+                    (name, arguments) = list(attribute_constraint['predicate'].items())[0]
+                    fields.append([field, predicates[name], arguments.get('value', arguments.get('regex'))])
+                constraints.add(role, fields)
+        return constraints
+
+    def __get_field(self, agent, field):
+        '''
+        Get (type, value) of a field of an agent, or None if not set
+        '''
+        pseudoattribute = OfferConstraints.PSEUDOATTRIBUTES.get(field)
+        if pseudoattribute == 'HOSTNAME':
+            return ('TEXT', agent.get('hostname'))
+        if pseudoattribute is not None:
+            domain = agent.get('domain', {}).get('fault_domain', {})
+            value = domain.get(pseudoattribute.lower(), {}).get('name')
+            if value is None:
+                return None
+            return ('TEXT', value)
+        for attribute in agent.get('attributes', []):
+            if attribute['name'] == field:
+                return (attribute.get('type'), _attribute_value(attribute))
+        return None
+
+    def __match(self, agent, field, predicate, value):
+        attribute = self.__get_field(agent, field)
+        if predicate == 'EXISTS':
+            return attribute is not None
+        if predicate == 'NOT_EXISTS':
+            return attribute is None
+        if attribute is None:
+            return predicate in ('NOT_EQUALS', 'UNLIKE')
+        (attribute_type, attribute_value) = attribute
+        if attribute_type != 'TEXT':
+            return True
+        if predicate == 'EQUALS':
+            return attribute_value == value
+        if predicate == 'NOT_EQUALS':
+            return attribute_value != value
+        matches = self._regexes[value].match(attribute_value) is not None
+        return matches == (predicate == 'LIKE')
+
+    def matches(self, offer, role=None):
+        '''
+        Check if an offer (or an agent) matches constraints of a role, as master does
+
+        :param offer: offer to check, or JSON AgentInfo
+        :type offer: `mesoshttp.offers.Offer` or dict
+        :param role: role of offer, defaults to offer allocation role
+        :type role: str
+        :return: bool
+        '''
+        if hasattr(offer, 'get_offer'):
+            offer = offer.get_offer()
+        if role is None:
+            role = offer.get('allocation_info', {}).get('role', '*')
+        groups = self._roles.get(role)
+        if not groups:
+            return True
+        for group in groups:
+            matched = True
+            for (field, predicate, value) in group:
+                if not self.__match(offer, field, predicate, value):
+                    matched = False
+                    break
+            if matched:
+                return True
+        return False
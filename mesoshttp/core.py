@@ -1,15 +1,83 @@
 import logging
 
+import requests
 
-class CoreMesosObject(object):
+from mesoshttp.codec import JSON_CODEC
+
+
+class MesosContext(object):
     '''
-    Internal class to manage driver
+    Connection settings shared by all objects created on a scheduler stream
     '''
 
-    def __init__(self, mesos_url, frameworkId, streamId, requests_auth=None, verify=True):
-        self.logger = logging.getLogger(__name__)
+    __slots__ = ('mesos_url', 'frameworkId', 'streamId', 'requests_auth', 'verify', 'decline_filter', 'codec',
+                 'session', 'tracer')
+
+    def __init__(self, mesos_url, frameworkId, streamId, requests_auth=None, verify=True, decline_filter=None,
+                 codec=None, session=None, tracer=None):
         self.mesos_url = mesos_url
         self.streamId = streamId
         self.frameworkId = frameworkId
         self.requests_auth = requests_auth
         self.verify = verify
+        self.decline_filter = decline_filter
+        self.codec = codec or JSON_CODEC
+        self.session = session
+        self.tracer = tracer
+
+
+def _context_property(name):
+    def getter(self):
+        return getattr(self.context, name)
+
+    def setter(self, value):
+        setattr(self.context, name, value)
+
+    return property(getter, setter)
+
+
+class CoreMesosObject(object):
+    '''
+    Internal class to manage driver
+
+    Connection settings are stored in a `MesosContext`, which can be shared
+    by many objects to limit memory usage and creation time. Calls are sent
+    with the context session, any `mesoshttp.transport.Transport`, or with
+    requests if not set.
+    '''
+
+    __slots__ = ('context',)
+
+    logger = logging.getLogger(__name__)
+
+    mesos_url = _context_property('mesos_url')
+    streamId = _context_property('streamId')
+    frameworkId = _context_property('frameworkId')
+    requests_auth = _context_property('requests_auth')
+    verify = _context_property('verify')
+
+    def __init__(self, mesos_url, frameworkId, streamId, requests_auth=None, verify=True, codec=None, session=None):
+        self.context = MesosContext(mesos_url, frameworkId, streamId, requests_auth, verify, codec=codec,
+                                    session=session)
+
+    def send_call(self, message):
+        '''
+        Send a call to master scheduler API, encoded with context codec
+
+        :param message: JSON call
+        :type message: dict
+        :return: `requests.Response`, or response of context transport
+        '''
+        context = self.context
+        headers = {
+            'Content-Type': context.codec.content_type,
+            'Accept': context.codec.content_type,
+            'Mesos-Stream-Id': context.streamId
+        }
+        return (context.session or requests).post(
+            context.mesos_url + '/api/v1/scheduler',
+            context.codec.encode(message),
+            headers=headers,
+            auth=context.requests_auth,
+            verify=context.verify
+        )
@@ -0,0 +1,151 @@
+import logging
+import math
+import threading
+
+
+class AdaptiveDeclineFilter(object):
+    '''
+    Compute DECLINE refuse_seconds filters from offers history
+
+    Offers are grouped per agent and resource shape. Each time an offer of
+    a group is declined without the group being used since the last reset,
+    the refuse_seconds value grows exponentially (up to max_refuse_seconds).
+    Using an offer of the group, or a change of pending workload, resets it.
+
+    Usage::
+
+        client.set_decline_filter(AdaptiveDeclineFilter())
+        ...
+        offer.decline()  # refuse_seconds set from history
+        ...
+        client.decline_filter.workload_changed()  # new tasks to schedule
+
+    `MesosClient.SchedulerDriver.submit` and `revive` call `workload_changed`.
+    '''
+
+    def __init__(self, min_refuse_seconds=5, max_refuse_seconds=3600, factor=2):
+        '''
+        :param min_refuse_seconds: refuse_seconds of first decline
+        :type min_refuse_seconds: float
+        :param max_refuse_seconds: upper bound of refuse_seconds
+        :type max_refuse_seconds: float
+        :param factor: growth factor applied on each consecutive decline
+        :type factor: float
+        '''
+        self.logger = logging.getLogger(__name__)
+        self.min_refuse_seconds = min_refuse_seconds
+        self.max_refuse_seconds = max_refuse_seconds
+        self.factor = factor
+        # key => [declined, used, consecutive declines]
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def offer_key(offer):
+        '''
+        Get the (agent id, resource shape) key of an offer
+
+        Scalar resources are bucketed by power of two and ranges by number of
+        values so that small variations of available resources on an agent
+        keep the same shape.
+
+        :param offer: offer info received from Mesos
+        :type offer: dict
+        :return: tuple
+        '''
+        shape = []
+        for resource in offer.get('resources', []):
+            if resource.get('type') == 'SCALAR':
+                value = resource['scalar']['value']
+            elif resource.get('type') == 'RANGES':
+                value = 0
+                for value_range in resource['ranges'].get('range', []):
+                    value += value_range['end'] - value_range['begin'] + 1
+            else:
+                continue
+            bucket = None
+            if value > 0:
+                bucket = int(math.ceil(math.log(value, 2)))
+            shape.append((resource['name'], bucket))
+        return (offer['agent_id']['value'], tuple(sorted(shape)))
+
+    def refuse_seconds(self, offer):
+        '''
+        Get refuse_seconds value to use if offer is declined now
+
+        :param offer: offer info received from Mesos
+        :type offer: dict
+        :return: float
+        '''
+        with self._lock:
+            stat = self._stats.get(self.offer_key(offer))
+            consecutive = stat[2] if stat else 0
+        return self.__refuse_seconds(consecutive)
+
+    def __refuse_seconds(self, consecutive):
+        if consecutive <= 0:
+            return self.min_refuse_seconds
+        try:
+            value = self.min_refuse_seconds * (self.factor ** consecutive)
+        except OverflowError:
+            return self.max_refuse_seconds
+        return min(value, self.max_refuse_seconds)
+
+    def declined(self, offer):
+        '''
+        Record that offer is declined and get the filters to send
+
+        :param offer: offer info received from Mesos
+        :type offer: dict
+        :return: dict filters with refuse_seconds
+        '''
+        key = self.offer_key(offer)
+        with self._lock:
+            stat = self._stats.setdefault(key, [0, 0, 0])
+            refuse_seconds = self.__refuse_seconds(stat[2])
+            stat[0] += 1
+            stat[2] += 1
+        self.logger.debug('Mesos:Decline:Filter:%s:%s' % (key[0], str(refuse_seconds)))
+        return {'refuse_seconds': refuse_seconds}
+
+    def used(self, offer):
+        '''
+        Record that offer is accepted
+
+        :param offer: offer info received from Mesos
+        :type offer: dict
+        '''
+        key = self.offer_key(offer)
+        with self._lock:
+            stat = self._stats.setdefault(key, [0, 0, 0])
+            stat[1] += 1
+            stat[2] = 0
+
+    def workload_changed(self):
+        '''
+        Reset refuse_seconds of all agents, to call when pending workload changes
+
+        Declined/used counters are kept.
+        '''
+        with self._lock:
+            for stat in self._stats.values():
+                stat[2] = 0
+
+    def reset(self):
+        '''
+        Forget all history
+        '''
+        with self._lock:
+            self._stats = {}
+
+    def stats(self):
+        '''
+        Get declined/used counters per agent and resource shape
+
+        :return: dict {(agent_id, shape): {'declined': x, 'used': y, 'consecutive_declines': z}}
+        '''
+        with self._lock:
+            return dict([
+                (key, {'declined': stat[0], 'used': stat[1], 'consecutive_declines': stat[2]})
+                for key, stat in self._stats.items()
+            ])
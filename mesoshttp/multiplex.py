@@ -0,0 +1,570 @@
+import errno
+import logging
+import os
+import select
+import socket
+import ssl
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from mesoshttp.exception import MesosException
+from mesoshttp.stream import RecordReader
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit
+
+
+class _ChunkedDecoder(object):
+    '''
+    Incremental decoder of HTTP/1.1 chunked transfer encoding
+    '''
+
+    def __init__(self):
+        self._buffer = bytearray()
+        # None: waiting for chunk size, 0: waiting for chunk end
+        self._remaining = None
+        self.done = False
+
+    def feed(self, data):
+        '''
+        Add received data
+
+        :param data: data read from connection
+        :type data: bytes
+        :return: decoded content
+        '''
+        buffer = self._buffer
+        buffer.extend(data)
+        content = bytearray()
+        while not self.done:
+            if self._remaining is None:
+                newline = buffer.find(b'\r\n')
+                if newline < 0:
+                    break
+                size = int(bytes(buffer[:newline]).split(b';')[0].strip(), 16)
+                del buffer[:newline + 2]
+                if size == 0:
+                    self.done = True
+                    break
+                self._remaining = size
+            if self._remaining == 0:
+                if len(buffer) < 2:
+                    break
+                del buffer[:2]
+                self._remaining = None
+                continue
+            if not buffer:
+                break
+            size = min(self._remaining, len(buffer))
+            content.extend(buffer[:size])
+            del buffer[:size]
+            self._remaining -= size
+        return bytes(content)
+
+
+class _SubscriptionStream(object):
+    '''
+    Non blocking subscription connection of a framework
+    '''
+
+    CONNECTING = 'CONNECTING'
+    HANDSHAKE = 'HANDSHAKE'
+    SENDING = 'SENDING'
+    READING = 'READING'
+
+    def __init__(self, multiplexer, client):
+        self.multiplexer = multiplexer
+        self.client = client
+        self.sock = None
+        self.state = None
+        self.attempt = 0
+        self.redirects = 0
+        self.retry_at = 0
+        self.subscribed = False
+        self.eof = False
+        self.mesos_url = None
+        # masters to try for current attempt, and SUBSCRIBE (body, headers)
+        self.candidates = []
+        self.request = None
+        self._session = None
+        self._tls = False
+        self._hostname = None
+        self._out = None
+        self._want_read = False
+        self._head = None
+        self._decoder = None
+        self._reader = None
+        self._last_read = 0
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def open(self, mesos_url, body, headers):
+        '''
+        Start connection to master
+
+        Only master name resolution blocks: connection, TLS handshake and
+        SUBSCRIBE call are done by `progress` when socket is ready, answer
+        is read when socket is readable.
+        '''
+        client = self.client
+        # keep session or transport set by user
+        if client.session is None or client.session is self._session:
+            self._session = self.multiplexer.get_session(mesos_url)
+            client.set_session(self._session)
+        prepared = requests.Request(
+            'POST',
+            mesos_url + '/api/v1/scheduler',
+            data=body,
+            headers=headers,
+            auth=client.requests_auth
+        ).prepare()
+        url = urlsplit(prepared.url)
+        port = url.port or (443 if url.scheme == 'https' else 80)
+        lines = ['POST %s HTTP/1.1' % (prepared.path_url), 'Host: %s' % (url.netloc)]
+        for (name, value) in prepared.headers.items():
+            lines.append('%s: %s' % (name, value))
+        data = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+        if prepared.body:
+            data += prepared.body if isinstance(prepared.body, bytes) else prepared.body.encode('utf-8')
+
+        (family, socktype, proto, name, address) = socket.getaddrinfo(url.hostname, port, 0, socket.SOCK_STREAM)[0]
+        sock = socket.socket(family, socktype, proto)
+        sock.setblocking(False)
+        error = sock.connect_ex(address)
+        if error not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            sock.close()
+            raise socket.error(error, os.strerror(error))
+        self.sock = sock
+        self.state = _SubscriptionStream.CONNECTING
+        self.mesos_url = mesos_url
+        self.subscribed = False
+        self.eof = False
+        self.request = (body, headers)
+        self._tls = url.scheme == 'https'
+        self._hostname = url.hostname
+        self._out = data
+        self._want_read = False
+        self._head = bytearray()
+        self._decoder = None
+        self._reader = RecordReader()
+        self._last_read = time.time()
+
+    def __ssl_context(self):
+        verify = self.client.verify
+        if verify is False:
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        elif verify is True:
+            context = ssl.create_default_context()
+        else:
+            context = ssl.create_default_context(cafile=verify)
+        return context
+
+    def connected(self):
+        '''
+        Check if SUBSCRIBE call is sent
+        '''
+        return self.state == _SubscriptionStream.READING
+
+    def wants_read(self):
+        return self.state == _SubscriptionStream.READING or (
+            self.state in (_SubscriptionStream.HANDSHAKE, _SubscriptionStream.SENDING) and self._want_read
+        )
+
+    def wants_write(self):
+        return self.state == _SubscriptionStream.CONNECTING or (
+            self.state in (_SubscriptionStream.HANDSHAKE, _SubscriptionStream.SENDING) and not self._want_read
+        )
+
+    def progress(self):
+        '''
+        Continue connection, TLS handshake and SUBSCRIBE call when socket is ready
+
+        :return: True once SUBSCRIBE call is sent
+        '''
+        if self.state == _SubscriptionStream.CONNECTING:
+            error = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if error:
+                raise socket.error(error, os.strerror(error))
+            if self._tls:
+                self.sock = self.__ssl_context().wrap_socket(
+                    self.sock, server_hostname=self._hostname, do_handshake_on_connect=False
+                )
+                self.state = _SubscriptionStream.HANDSHAKE
+            else:
+                self.state = _SubscriptionStream.SENDING
+        self._want_read = False
+        try:
+            if self.state == _SubscriptionStream.HANDSHAKE:
+                self.sock.do_handshake()
+                self.state = _SubscriptionStream.SENDING
+            if self.state == _SubscriptionStream.SENDING:
+                while self._out:
+                    sent = self.sock.send(self._out)
+                    self._out = self._out[sent:]
+                self.state = _SubscriptionStream.READING
+        except ssl.SSLWantReadError:
+            self._want_read = True
+        except ssl.SSLWantWriteError:
+            pass
+        except socket.error as e:
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise
+        return self.connected()
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except Exception:
+                pass
+        self.sock = None
+        self.state = None
+
+    def expired(self, now):
+        '''
+        Check if connection timeout expired since connection start or last received data
+        '''
+        timeout = self.client.connection_timeout
+        if not self.connected():
+            timeout = timeout or FrameworkMultiplexer.WAIT_TIME
+        return timeout is not None and now - self._last_read > timeout
+
+    def __recv(self):
+        data = []
+        try:
+            while True:
+                chunk = self.sock.recv(FrameworkMultiplexer.CHUNK_SIZE)
+                if not chunk:
+                    self.eof = True
+                    break
+                data.append(chunk)
+                # select does not report data already decrypted by SSL layer
+                if not (isinstance(self.sock, ssl.SSLSocket) and self.sock.pending()):
+                    break
+        except ssl.SSLWantReadError:
+            pass
+        except socket.error as e:
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise
+        return b''.join(data)
+
+    def read(self):
+        '''
+        Read available data
+
+        :return: list of received records
+        '''
+        data = self.__recv()
+        if data:
+            self._last_read = time.time()
+        if self._decoder is None:
+            self._head.extend(data)
+            end = self._head.find(b'\r\n\r\n')
+            if end < 0:
+                if self.eof:
+                    raise MesosException('Connection closed before answer')
+                return []
+            data = bytes(self._head[end + 4:])
+            self.__answer(bytes(self._head[:end]).decode('latin-1'))
+            if self._decoder is None:
+                # redirected to another master
+                return []
+        records = []
+        if data:
+            if self._decoder is not False:
+                data = self._decoder.feed(data)
+                if self._decoder.done:
+                    self.eof = True
+            records = self._reader.feed(data)
+        return records
+
+    def __answer(self, head):
+        lines = head.split('\r\n')
+        status = int(lines[0].split(' ')[1])
+        headers = {}
+        for line in lines[1:]:
+            (name, value) = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+        self.client.logger.debug('Subscribe HTTP answer: ' + str(status))
+        if status == 307 and 'location' in headers:
+            # Not leader, reconnect to leader
+            location = headers['location']
+            if location.startswith('//'):
+                location = self.mesos_url.split('//')[0] + location
+            self.redirects += 1
+            if self.redirects > FrameworkMultiplexer.MAX_REDIRECTS:
+                raise MesosException('Mesos:Subscribe:Too many redirections, last to ' + location)
+            self.client.logger.info('Not master, connect to ' + location)
+            self.close()
+            self.open(location.split('/api/v1')[0], *self.request)
+            return
+        if status != 200:
+            raise MesosException('Mesos:Subscribe:Error:%d' % (status))
+        if 'chunked' in headers.get('transfer-encoding', ''):
+            self._decoder = _ChunkedDecoder()
+        else:
+            self._decoder = False
+        self.subscribed = True
+        self.client.open_stream(self.mesos_url, headers['mesos-stream-id'])
+
+
+class FrameworkMultiplexer(object):
+    '''
+    Run the subscriptions of many frameworks in a single loop
+
+    Each framework is a `MesosClient` with its own callbacks and driver,
+    `MesosClient.register` must not be called. All subscription connections
+    are read by `FrameworkMultiplexer.run`, in a single thread, without
+    blocking on connection to a master. Calls to a master share a connection
+    pool, unless a session or transport is set on the client::
+
+        multiplexer = FrameworkMultiplexer()
+        for client in clients:
+            multiplexer.add(client)
+        multiplexer.run()
+
+    Callbacks are called in the loop thread and should not block.
+    Framework is removed when `MesosClient.tearDown` or
+    `MesosClient.disconnect_framework` is called, or when it fails to
+    reconnect after `max_reconnect` tries.
+    '''
+
+    WAIT_TIME = 10
+    # Maximum size of data read at once from master stream
+    CHUNK_SIZE = 65536
+    # Maximum number of leader redirections followed for a subscription
+    MAX_REDIRECTS = 5
+
+    def __init__(self, pool_maxsize=10):
+        '''
+        :param pool_maxsize: maximum number of connections kept per master
+        :type pool_maxsize: int
+        '''
+        self.logger = logging.getLogger(__name__)
+        self.pool_maxsize = pool_maxsize
+        self.stop = False
+        self._streams = {}
+        self._sessions = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        (self._wakeup_read, self._wakeup_write) = os.pipe()
+
+    def __wakeup(self):
+        try:
+            os.write(self._wakeup_write, b'x')
+        except OSError:
+            pass
+
+    def get_session(self, mesos_url):
+        '''
+        Get the session shared by frameworks to send calls to a master
+
+        :param mesos_url: master http endpoint
+        :type mesos_url: str
+        :return: `requests.Session`
+        '''
+        url = urlsplit(mesos_url)
+        key = (url.scheme, url.netloc)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount(url.scheme + '://', adapter)
+                self._sessions[key] = session
+        return session
+
+    def add(self, client):
+        '''
+        Add a framework, it will subscribe at next loop iteration
+
+        :param client: framework client
+        :type client: `mesoshttp.client.MesosClient`
+        '''
+        with self._lock:
+            self._pending.append((client, True))
+        self.__wakeup()
+
+    def remove(self, client):
+        '''
+        Remove a framework and close its subscription, framework is not torn down
+
+        :param client: framework client
+        :type client: `mesoshttp.client.MesosClient`
+        '''
+        with self._lock:
+            self._pending.append((client, False))
+        self.__wakeup()
+
+    def __len__(self):
+        return len(self._streams)
+
+    def run(self):
+        '''
+        Blocking loop reading framework subscriptions until `close` is called
+        '''
+        try:
+            while not self.stop:
+                self.__sync()
+                now = time.time()
+                timeout = 1
+                for stream in list(self._streams.values()):
+                    client = stream.client
+                    if client.stop or client.disconnect:
+                        self.__release(stream)
+                    elif stream.sock is None:
+                        if stream.retry_at <= now:
+                            self.__connect(stream)
+                        else:
+                            timeout = min(timeout, stream.retry_at - now)
+                    elif stream.expired(now):
+                        if stream.connected():
+                            self.__lost(stream, 'connection timeout')
+                        else:
+                            self.__failed(stream, 'connection timeout')
+                streams = [stream for stream in self._streams.values() if stream.sock is not None]
+                (readable, writable, _) = select.select(
+                    [self._wakeup_read] + [stream for stream in streams if stream.wants_read()],
+                    [stream for stream in streams if stream.wants_write()],
+                    [],
+                    max(timeout, 0)
+                )
+                for stream in writable:
+                    if stream.sock is not None:
+                        self.__progress(stream)
+                for stream in readable:
+                    if stream == self._wakeup_read:
+                        os.read(self._wakeup_read, 4096)
+                    elif stream.sock is None:
+                        continue
+                    elif stream.connected():
+                        self.__read(stream)
+                    else:
+                        self.__progress(stream)
+        finally:
+            for stream in list(self._streams.values()):
+                stream.close()
+                stream.client.close_stream()
+            self._streams = {}
+
+    def close(self):
+        '''
+        Stop loop and close all connections
+        '''
+        self.stop = True
+        self.__wakeup()
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions = {}
+        for session in sessions:
+            session.close()
+
+    def __sync(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = []
+        for (client, added) in pending:
+            if added:
+                if client not in self._streams:
+                    self._streams[client] = _SubscriptionStream(self, client)
+            elif client in self._streams:
+                stream = self._streams.pop(client)
+                stream.close()
+                client.close_stream()
+
+    def __connect(self, stream):
+        client = stream.client
+        stream.attempt += 1
+        stream.redirects = 0
+        headers = {
+            'Content-Type': client.codec.content_type,
+            'Accept': client.codec.content_type
+        }
+        body = client.codec.encode(client.get_subscribe_call())
+        stream.request = (body, headers)
+        stream.candidates = list(client.mesos_urls)
+        self.__connect_next(stream)
+
+    def __connect_next(self, stream):
+        '''
+        Connect to next master of current attempt, or retry later if none is left
+        '''
+        client = stream.client
+        (body, headers) = stream.request
+        while stream.candidates:
+            mesos_url = stream.candidates.pop(0)
+            try:
+                mesos_url = client.resolve_master_url(mesos_url)
+                self.logger.info('Try to connect to master: %s' % (mesos_url))
+                stream.open(mesos_url, body, headers)
+                return
+            except Exception as e:
+                self.logger.error('Mesos:Subscribe:Failed for %s: %s' % (mesos_url, str(e)))
+        self.__retry(stream)
+
+    def __progress(self, stream):
+        try:
+            stream.progress()
+        except Exception as e:
+            self.__failed(stream, str(e))
+
+    def __failed(self, stream, error):
+        '''
+        Connection to master failed before SUBSCRIBE call was sent
+        '''
+        self.logger.error('Mesos:Subscribe:Failed for %s: %s' % (stream.mesos_url, error))
+        stream.close()
+        self.__connect_next(stream)
+
+    def __read(self, stream):
+        client = stream.client
+        try:
+            records = stream.read()
+            for record in records:
+                if client.stop or client.disconnect:
+                    self.__release(stream)
+                    return
+                client.process_record(record)
+        except Exception as e:
+            self.logger.exception('Mesos:Stream:Error:' + str(e))
+            self.__lost(stream, str(e))
+            return
+        if stream.eof:
+            self.__lost(stream, 'connection closed by master')
+
+    def __lost(self, stream, error):
+        subscribed = stream.subscribed
+        stream.close()
+        if subscribed:
+            stream.client.close_stream(error)
+        self.__retry(stream)
+
+    def __retry(self, stream):
+        client = stream.client
+        if client.stop or client.disconnect:
+            self.__release(stream)
+        elif stream.attempt >= client.max_reconnect:
+            self.logger.error('All connection tries failed for %s' % (client.frameworkName))
+            self.__release(stream)
+        else:
+            stream.retry_at = time.time() + FrameworkMultiplexer.WAIT_TIME
+
+    def __release(self, stream):
+        client = stream.client
+        if client.stop and client.driver and stream.subscribed:
+            try:
+                client.driver.tearDown()
+            except Exception as e:
+                self.logger.error('Mesos:TearDown:Failed:' + str(e))
+        if stream.subscribed:
+            client.close_stream()
+        stream.close()
+        self._streams.pop(client, None)
@@ -1,10 +1,9 @@
 import logging
-import json
-
-import requests
 
 from mesoshttp.core import CoreMesosObject
 from mesoshttp.exception import MesosException
+from mesoshttp.operations import OperationBuilder
+from mesoshttp.resources import OfferResources
 
 
 class Offer(CoreMesosObject):
@@ -12,10 +11,48 @@ class Offer(CoreMesosObject):
     Wrapper class for Mesos offers
     '''
 
-    def __init__(self, mesos_url, frameworkId, streamId, mesosOffer, requests_auth=None, verify=True):
+    __slots__ = ('offer', '_resources')
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, mesos_url, frameworkId, streamId, mesosOffer, requests_auth=None, verify=True,
+                 decline_filter=None):
         CoreMesosObject.__init__(self, mesos_url, frameworkId, streamId, requests_auth, verify)
-        self.logger = logging.getLogger(__name__)
+        self.context.decline_filter = decline_filter
         self.offer = mesosOffer
+        self._resources = None
+
+    @classmethod
+    def from_context(cls, context, mesosOffer):
+        '''
+        Create an offer sharing connection settings with other objects
+
+        :param context: connection settings
+        :type context: `mesoshttp.core.MesosContext`
+        :param mesosOffer: offer info received from Mesos
+        :type mesosOffer: dict
+        :return: `Offer`
+        '''
+        offer = cls.__new__(cls)
+        offer.context = context
+        offer.offer = mesosOffer
+        offer._resources = None
+        return offer
+
+    @property
+    def decline_filter(self):
+        return self.context.decline_filter
+
+    @property
+    def resources(self):
+        '''
+        Offered resources totals (cpus, mem, disk, gpus, ports, ...), parsed on first access
+
+        :return: `mesoshttp.resources.OfferResources`
+        '''
+        if self._resources is None:
+            self._resources = OfferResources(self.offer.get('resources', []))
+        return self._resources
 
     def get_offer(self):
         '''
@@ -29,8 +66,12 @@ class Offer(CoreMesosObject):
         '''
         Accept offer with task operations
 
+        operations can be a list of TaskInfo, sent in a single LAUNCH
+        operation, or an `OperationBuilder` whose operations are validated
+        against offer resources and sent in one ACCEPT.
+
         :param operations: JSON TaskInfo instances to accept in current offer
-        :type operations: list of json TaskInfo
+        :type operations: list of json TaskInfo or `mesoshttp.operations.OperationBuilder`
         :param options: Optional offer additional params (filters, ...)
         :type options: dict
         '''
@@ -41,63 +82,63 @@ class Offer(CoreMesosObject):
         offer_ids = [{'value': self.offer['id']['value']}]
         self.logger.debug('Mesos:ACCEPT Offer ids:' + str(offer_ids))
 
-        headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'Mesos-Stream-Id': self.streamId
-        }
-
-        tasks = []
-        for operation in operations:
-            if 'slave_id' not in operation:
-                operation['slave_id'] = {
-                    'value': self.offer['agent_id']['value']
-                }
-            tasks.append(operation)
+        if isinstance(operations, OperationBuilder):
+            operations.validate([self])
+            accept_operations = operations.get_operations(self.offer['agent_id']['value'])
+        else:
+            tasks = []
+            for operation in operations:
+                if 'agent_id' not in operation and 'slave_id' not in operation:
+                    operation['agent_id'] = {
+                        'value': self.offer['agent_id']['value']
+                    }
+                tasks.append(operation)
+            accept_operations = [{
+                'type': 'LAUNCH',
+                'launch': {'task_infos': tasks}
+            }]
 
         message = {
             "framework_id": {"value": self.frameworkId},
             "type": "ACCEPT",
             "accept": {
                 "offer_ids": offer_ids,
-                "operations": [{
-                    'type': 'LAUNCH',
-                    'launch': {'task_infos': tasks}
-                }]
+                "operations": accept_operations
             }
         }
         if options and options.get('filters'):
             message["accept"]["filters"] = options.get('filters')
 
-        message = json.dumps(message)
+        tracer = self.context.tracer
+        task_ids = None
+        if tracer is not None:
+            task_ids = tracer.accept_started(message)
         try:
-            r = requests.post(
-                self.mesos_url + '/api/v1/scheduler',
-                message,
-                headers=headers,
-                auth=self.requests_auth,
-                verify=self.verify
-            )
+            r = self.send_call(message)
             self.logger.debug('Mesos:Accept:' + str(message))
             self.logger.debug('Mesos:Accept:Anwser:%d:%s' % (r.status_code, r.text))
         except Exception as e:
+            if tracer is not None:
+                tracer.accept_done(task_ids)
             raise MesosException(e)
+        if tracer is not None:
+            tracer.accept_done(task_ids, r.status_code)
+        if self.decline_filter is not None:
+            self.decline_filter.used(self.offer)
         return True
 
     def decline(self, options=None):
         '''
         Decline offer
 
+        If a decline filter is set and no filters are given in options,
+        refuse_seconds is computed by the decline filter.
+
         :param options: Optional offer additional params (filters, ...)
         :type options: dict
         '''
         if not self.offer:
             return
-        headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'Mesos-Stream-Id': self.streamId
-        }
         offers_decline = {
             "framework_id": {"value": self.frameworkId},
             "type": "DECLINE",
@@ -105,21 +146,24 @@ class Offer(CoreMesosObject):
                 "offer_ids": []
             }
         }
+        filters = None
         if options and options.get('filters'):
-            offers_decline["decline"]["filters"] = options.get('filters')
+            filters = options.get('filters')
+        if self.decline_filter is not None:
+            adaptive_filters = self.decline_filter.declined(self.offer)
+            if filters is None:
+                filters = adaptive_filters
+        if filters:
+            offers_decline["decline"]["filters"] = filters
 
         self.logger.debug('Mesos:Decline:Offer:' + self.offer['id']['value'])
+        if self.context.tracer is not None:
+            self.context.tracer.offer_declined(self.offer['id']['value'])
         offers_decline['decline']['offer_ids'].append(
             {'value': self.offer['id']['value']}
         )
         try:
-            self.r = requests.post(
-                self.mesos_url + '/api/v1/scheduler',
-                json.dumps(offers_decline),
-                headers=headers,
-                auth=self.requests_auth,
-                verify=self.verify
-            )
+            self.send_call(offers_decline)
         except Exception as e:
             raise MesosException(e)
         return True
@@ -0,0 +1,268 @@
+import copy
+
+from mesoshttp.exception import MesosException
+from mesoshttp.resources import Resources
+
+
+class OperationBuilder(object):
+    '''
+    Build the list of operations of a single ACCEPT call
+
+    Operations are applied by master in the order they are added, so a
+    RESERVE followed by a CREATE and a LAUNCH using the created volume
+    can be sent in one ACCEPT. Usage::
+
+        builder = OperationBuilder()
+        builder.reserve(resources).create(volumes).launch([task])
+        offer.accept(builder)
+    '''
+
+    LAUNCH = 'LAUNCH'
+    LAUNCH_GROUP = 'LAUNCH_GROUP'
+    RESERVE = 'RESERVE'
+    UNRESERVE = 'UNRESERVE'
+    CREATE = 'CREATE'
+    DESTROY = 'DESTROY'
+
+    def __init__(self):
+        self.operations = []
+
+    def __len__(self):
+        return len(self.operations)
+
+    def launch(self, task_infos):
+        '''
+        Add a LAUNCH operation
+
+        :param task_infos: JSON TaskInfo instances to launch
+        :type task_infos: list
+        :return: self
+        '''
+        self.operations.append({
+            'type': OperationBuilder.LAUNCH,
+            'launch': {'task_infos': list(task_infos)}
+        })
+        return self
+
+    def launch_group(self, executor_info, task_infos):
+        '''
+        Add a LAUNCH_GROUP operation, tasks are started atomically in the same executor
+
+        :param executor_info: JSON ExecutorInfo of the default executor
+        :type executor_info: dict
+        :param task_infos: JSON TaskInfo instances of the group
+        :type task_infos: list
+        :return: self
+        '''
+        self.operations.append({
+            'type': OperationBuilder.LAUNCH_GROUP,
+            'launch_group': {
+                'executor': executor_info,
+                'task_group': {'tasks': list(task_infos)}
+            }
+        })
+        return self
+
+    def reserve(self, resources):
+        '''
+        Add a RESERVE operation
+
+        :param resources: JSON Resource instances to reserve
+        :type resources: list
+        :return: self
+        '''
+        self.operations.append({
+            'type': OperationBuilder.RESERVE,
+            'reserve': {'resources': list(resources)}
+        })
+        return self
+
+    def unreserve(self, resources):
+        '''
+        Add an UNRESERVE operation
+
+        :param resources: JSON Resource instances to unreserve
+        :type resources: list
+        :return: self
+        '''
+        self.operations.append({
+            'type': OperationBuilder.UNRESERVE,
+            'unreserve': {'resources': list(resources)}
+        })
+        return self
+
+    def create(self, volumes):
+        '''
+        Add a CREATE (persistent volumes) operation
+
+        :param volumes: JSON Resource instances with disk persistence info
+        :type volumes: list
+        :return: self
+        '''
+        self.operations.append({
+            'type': OperationBuilder.CREATE,
+            'create': {'volumes': list(volumes)}
+        })
+        return self
+
+    def destroy(self, volumes):
+        '''
+        Add a DESTROY (persistent volumes) operation
+
+        :param volumes: JSON Resource instances with disk persistence info
+        :type volumes: list
+        :return: self
+        '''
+        self.operations.append({
+            'type': OperationBuilder.DESTROY,
+            'destroy': {'volumes': list(volumes)}
+        })
+        return self
+
+    def get_tasks(self):
+        '''
+        Get all TaskInfo instances of LAUNCH and LAUNCH_GROUP operations
+
+        :return: list
+        '''
+        tasks = []
+        for operation in self.operations:
+            if operation['type'] == OperationBuilder.LAUNCH:
+                tasks.extend(operation['launch']['task_infos'])
+            elif operation['type'] == OperationBuilder.LAUNCH_GROUP:
+                tasks.extend(operation['launch_group']['task_group']['tasks'])
+        return tasks
+
+    def get_operations(self, agent_id=None):
+        '''
+        Get JSON operations to send in ACCEPT
+
+        :param agent_id: agent identifier set in tasks not defining it
+        :type agent_id: str
+        :return: list
+        '''
+        operations = copy.deepcopy(self.operations)
+        if agent_id is not None:
+            for operation in operations:
+                if operation['type'] == OperationBuilder.LAUNCH:
+                    tasks = operation['launch']['task_infos']
+                elif operation['type'] == OperationBuilder.LAUNCH_GROUP:
+                    tasks = operation['launch_group']['task_group']['tasks']
+                else:
+                    continue
+                for task in tasks:
+                    if 'agent_id' not in task and 'slave_id' not in task:
+                        task['agent_id'] = {'value': agent_id}
+        return operations
+
+    def validate(self, offers):
+        '''
+        Check operations can be applied on offers resources
+
+        Operations are applied in order on the offered resources, a
+        MesosException is raised on first operation using more resources
+        than available. Executor resources are used once per executor,
+        and not used by executors already running on agent.
+
+        :param offers: offers to accept
+        :type offers: list of `mesoshttp.offers.Offer` or JSON offers
+        '''
+        if not offers:
+            raise MesosException('No offer to apply operations on')
+        agent_ids = set()
+        available = _ResourcePool()
+        # executors running on agent or launched by a previous operation
+        executors = set()
+        for offer in offers:
+            if not isinstance(offer, dict):
+                offer = offer.get_offer()
+            agent_ids.add(offer['agent_id']['value'])
+            available.add(offer.get('resources', []))
+            for executor_id in offer.get('executor_ids', []):
+                executors.add(executor_id['value'])
+        if len(agent_ids) > 1:
+            raise MesosException('Offers from different agents: %s' % (','.join(sorted(agent_ids))))
+
+        for index, operation in enumerate(self.operations):
+            op_type = operation['type']
+            try:
+                if op_type == OperationBuilder.LAUNCH:
+                    for task in operation['launch']['task_infos']:
+                        available.subtract(task.get('resources', []))
+                        if 'executor' in task:
+                            self.__subtract_executor(available, task['executor'], executors)
+                elif op_type == OperationBuilder.LAUNCH_GROUP:
+                    self.__subtract_executor(available, operation['launch_group']['executor'], executors)
+                    for task in operation['launch_group']['task_group']['tasks']:
+                        available.subtract(task.get('resources', []))
+                elif op_type == OperationBuilder.RESERVE:
+                    resources = operation['reserve']['resources']
+                    available.subtract(resources, parent=True)
+                    available.add(resources)
+                elif op_type == OperationBuilder.UNRESERVE:
+                    resources = operation['unreserve']['resources']
+                    available.subtract(resources)
+                    available.add(resources, parent=True)
+                elif op_type == OperationBuilder.CREATE:
+                    volumes = operation['create']['volumes']
+                    available.subtract(volumes, volume=False)
+                    available.add(volumes)
+                elif op_type == OperationBuilder.DESTROY:
+                    volumes = operation['destroy']['volumes']
+                    available.subtract(volumes)
+                    available.add(volumes, volume=False)
+            except MesosException as e:
+                raise MesosException('Operation %d (%s) not applicable: %s' % (index, op_type, str(e)))
+        return True
+
+    @staticmethod
+    def __subtract_executor(available, executor, executors):
+        '''
+        Subtract resources of an executor, if not already running
+        '''
+        executor_id = executor.get('executor_id', {}).get('value')
+        if executor_id is not None:
+            if executor_id in executors:
+                return
+            executors.add(executor_id)
+        available.subtract(executor.get('resources', []))
+
+
+class _ResourcePool(object):
+    '''
+    Offered resources per name, reservations stack and volume
+
+    Reservations are keyed by the roles of their stack, so refined
+    reservations (several `reservations` entries) are distinct from the
+    reservation they refine. RESERVE and UNRESERVE move resources between
+    a stack and its parent stack, without its last reservation.
+    '''
+
+    def __init__(self):
+        self.resources = Resources()
+
+    @staticmethod
+    def _key(resource, parent=False, volume=None):
+        if resource.get('reservations'):
+            roles = tuple([reservation.get('role') for reservation in resource['reservations']])
+        elif resource.get('role', '*') != '*':
+            roles = (resource['role'],)
+        else:
+            roles = ()
+        if parent:
+            roles = roles[:-1]
+        if volume is None:
+            volume = 'persistence' in resource.get('disk', {})
+        persistence_id = None
+        if volume:
+            persistence_id = resource['disk']['persistence'].get('id')
+        return (resource['name'], roles, persistence_id)
+
+    def __parse(self, resources, parent, volume):
+        return Resources.parse(resources, key=lambda resource: self._key(resource, parent, volume))
+
+    def add(self, resources, parent=False, volume=None):
+        self.resources.add(self.__parse(resources, parent, volume))
+
+    def subtract(self, resources, parent=False, volume=None):
+        self.resources.subtract(self.__parse(resources, parent, volume))
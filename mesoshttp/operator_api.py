@@ -0,0 +1,300 @@
+import json
+import logging
+import threading
+import time
+
+import requests
+
+from mesoshttp.exception import MesosException
+from mesoshttp.stream import decode_record, iter_records
+from mesoshttp.update import TERMINAL_STATES
+
+
+class ClusterInventory(object):
+    '''
+    Local copy of master agents and active tasks
+
+    Inventory is initialized from a GET_STATE answer and kept up to date
+    with operator API SUBSCRIBE events.
+    '''
+
+    def __init__(self):
+        self._agents = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def load_state(self, state):
+        '''
+        Reset inventory from a GET_STATE answer
+
+        :param state: get_state content of GET_STATE answer or SUBSCRIBED event
+        :type state: dict
+        '''
+        agents = {}
+        for agent in state.get('get_agents', {}).get('agents', []):
+            agents[agent['agent_info']['id']['value']] = agent
+        tasks = {}
+        for task in state.get('get_tasks', {}).get('tasks', []):
+            if task.get('state') not in TERMINAL_STATES:
+                tasks[task['task_id']['value']] = task
+        with self._lock:
+            self._agents = agents
+            self._tasks = tasks
+
+    def apply(self, event):
+        '''
+        Apply an operator API event
+
+        :param event: event received on operator API stream
+        :type event: dict
+        '''
+        event_type = event['type']
+        with self._lock:
+            if event_type == 'AGENT_ADDED':
+                agent = event['agent_added']['agent']
+                self._agents[agent['agent_info']['id']['value']] = agent
+            elif event_type == 'AGENT_REMOVED':
+                self._agents.pop(event['agent_removed']['agent_id']['value'], None)
+            elif event_type == 'TASK_ADDED':
+                task = event['task_added']['task']
+                self._tasks[task['task_id']['value']] = task
+            elif event_type == 'TASK_UPDATED':
+                status = event['task_updated']['status']
+                task_id = status['task_id']['value']
+                state = event['task_updated']['state']
+                if state in TERMINAL_STATES:
+                    self._tasks.pop(task_id, None)
+                elif task_id in self._tasks:
+                    task = self._tasks[task_id]
+                    task['state'] = state
+                    task['statuses'] = [status]
+
+    def get_agent(self, agent_id):
+        '''
+        Get an agent
+
+        :param agent_id: agent identifier
+        :type agent_id: str
+        :return: JSON Agent (agent_info, total_resources, ...) or None
+        '''
+        with self._lock:
+            return self._agents.get(agent_id)
+
+    def get_agents(self):
+        '''
+        Get all registered agents
+
+        :return: list of JSON Agent
+        '''
+        with self._lock:
+            return list(self._agents.values())
+
+    def get_task(self, task_id):
+        '''
+        Get an active task
+
+        :param task_id: task identifier
+        :type task_id: str
+        :return: JSON Task or None
+        '''
+        with self._lock:
+            return self._tasks.get(task_id)
+
+    def get_tasks(self, agent_id=None, framework_id=None):
+        '''
+        Get active tasks
+
+        :param agent_id: only get tasks of this agent
+        :type agent_id: str
+        :param framework_id: only get tasks of this framework
+        :type framework_id: str
+        :return: list of JSON Task
+        '''
+        with self._lock:
+            tasks = list(self._tasks.values())
+        if agent_id is not None:
+            tasks = [task for task in tasks if task['agent_id']['value'] == agent_id]
+        if framework_id is not None:
+            tasks = [task for task in tasks if task['framework_id']['value'] == framework_id]
+        return tasks
+
+
+class OperatorClient(object):
+    '''
+    Client for master operator API (`/api/v1`)
+
+    Uses the same authentication and certificate verification settings
+    as `MesosClient`, see `MesosClient.get_operator_client`.
+    '''
+
+    WAIT_TIME = 10
+    # Maximum size of data read at once from master stream
+    CHUNK_SIZE = 65536
+    # Maximum number of leader redirections followed for a call
+    MAX_REDIRECTS = 5
+
+    def __init__(self, mesos_url, requests_auth=None, verify=True, connection_timeout=None):
+        '''
+        :param mesos_url: master http endpoint
+        :type mesos_url: str
+        :param requests_auth: requests authentication handler
+        :type requests_auth: `requests.auth.AuthBase`
+        :param verify: validate HTTPS certificate, or path to CA trust bundle
+        :type verify: bool or str
+        :param connection_timeout: timeout of subscription connection
+        :type connection_timeout: float
+        '''
+        self.logger = logging.getLogger(__name__)
+        self.mesos_url = mesos_url
+        self.requests_auth = requests_auth
+        self.verify = verify
+        self.connection_timeout = connection_timeout
+        self.inventory = ClusterInventory()
+        self.stop = False
+        self.long_pool = None
+        self.callbacks = {}
+
+    def on(self, eventName, callback):
+        '''
+        Register callback for an operator API event (AGENT_ADDED, TASK_UPDATED, ...)
+
+        Callbacks are called after inventory is updated.
+
+        :param eventName: name of the event
+        :type eventName: str
+        :param callback: function to call with event content
+        :type callback: def
+        '''
+        self.callbacks.setdefault(eventName, []).append(callback)
+        return True
+
+    def __post(self, message, stream=False):
+        headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        }
+        kwargs = {}
+        if stream and self.connection_timeout is not None:
+            kwargs['timeout'] = self.connection_timeout
+        redirects = 0
+        while True:
+            r = requests.post(
+                self.mesos_url + '/api/v1',
+                json.dumps(message),
+                stream=stream,
+                headers=headers,
+                auth=self.requests_auth,
+                verify=self.verify,
+                allow_redirects=False,
+                **kwargs
+            )
+            if r.status_code != 307 or 'Location' not in r.headers:
+                return r
+            r.close()
+            redirects += 1
+            if redirects > OperatorClient.MAX_REDIRECTS:
+                raise MesosException('Mesos:Operator:Too many redirections, last to ' + r.headers['Location'])
+            # Not leader, use leader location
+            location = r.headers['Location']
+            if location.startswith('//'):
+                location = self.mesos_url.split('//')[0] + location
+            self.mesos_url = location.split('/api/v1')[0]
+            self.logger.info('Mesos:Operator:Leader:' + self.mesos_url)
+
+    def call(self, call_type, content=None):
+        '''
+        Send an operator API call and get the answer
+
+        :param call_type: call type (GET_HEALTH, GET_FLAGS, ...)
+        :type call_type: str
+        :param content: call content, sent as the lower case call type field
+        :type content: dict
+        :return: dict answer
+        '''
+        message = {'type': call_type}
+        if content is not None:
+            message[call_type.lower()] = content
+        try:
+            r = self.__post(message)
+        except Exception as e:
+            raise MesosException(e)
+        if r.status_code != 200:
+            raise MesosException('Mesos:Operator:%s:Error:%d:%s' % (call_type, r.status_code, r.text))
+        return r.json()
+
+    def get_agents(self):
+        '''
+        Get agents registered on master
+
+        :return: list of JSON Agent
+        '''
+        return self.call('GET_AGENTS')['get_agents'].get('agents', [])
+
+    def get_state(self):
+        '''
+        Get master state (tasks, executors, frameworks and agents)
+
+        Local inventory is reset with the state.
+
+        :return: get_state content of answer
+        '''
+        state = self.call('GET_STATE')['get_state']
+        self.inventory.load_state(state)
+        return state
+
+    def get_roles(self):
+        '''
+        Get roles known by master
+
+        :return: list of JSON Role
+        '''
+        return self.call('GET_ROLES')['get_roles'].get('roles', [])
+
+    def subscribe(self, max_reconnect=3):
+        '''
+        Subscribe to master events and keep inventory up to date
+
+        This is a blocking loop, it should be executed in a separate thread
+        and is stopped by setting `stop` to True.
+
+        :param max_reconnect: number of reconnection retries when connection fails
+        :type max_reconnect: int
+        '''
+        attempt = 0
+        while not self.stop:
+            attempt += 1
+            try:
+                self.__subscribe()
+            except Exception as e:
+                self.logger.error('Mesos:Operator:Subscribe:Error:' + str(e))
+            if self.stop or attempt >= max_reconnect:
+                break
+            time.sleep(OperatorClient.WAIT_TIME)
+
+    def __subscribe(self):
+        self.long_pool = self.__post({'type': 'SUBSCRIBE'}, stream=True)
+        if self.long_pool.status_code != 200:
+            raise MesosException('Mesos:Operator:Subscribe:%d:%s' % (
+                self.long_pool.status_code, self.long_pool.text))
+        for record in iter_records(self.long_pool.iter_content(OperatorClient.CHUNK_SIZE)):
+            if self.stop:
+                break
+            event = decode_record(record)
+            event_type = event['type']
+            if event_type == 'SUBSCRIBED':
+                self.inventory.load_state(event['subscribed']['get_state'])
+            elif event_type != 'HEARTBEAT':
+                self.inventory.apply(event)
+            for callback in self.callbacks.get(event_type, []):
+                try:
+                    callback(event.get(event_type.lower()))
+                except Exception as e:
+                    self.logger.exception('Error in %s callback: %s' % (event_type, str(e)))
+
+    def close(self):
+        '''
+        Stop subscription loop and close its connection
+        '''
+        self.stop = True
+        if self.long_pool is not None:
+            self.long_pool.connection.close()
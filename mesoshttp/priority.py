@@ -0,0 +1,113 @@
+import heapq
+import itertools
+import threading
+
+from mesoshttp.codec import JSON_CODEC
+
+
+class PriorityEventQueue(object):
+    '''
+    Queue of raw event records, ordered by event priority
+
+    Events of the same priority are kept in arrival order. Offers
+    rescinded while their OFFERS event is queued are recorded so that they
+    can be dropped before delivery. When queue is full, put waits for
+    records to be handled, so that master stream is not read faster than
+    events are handled.
+    '''
+
+    # Lower is handled first, all updates share the same priority to keep
+    # updates of a task in order. HEARTBEAT events are cheap and used to
+    # detect disconnections and flush coalesced updates, they are not delayed
+    PRIORITIES = {
+        'SUBSCRIBED': 0,
+        'ERROR': 0,
+        'HEARTBEAT': 0,
+        'RESCIND': 1,
+        'FAILURE': 1,
+        'UPDATE': 2,
+        'MESSAGE': 3,
+        'OFFERS': 4
+    }
+    DEFAULT_PRIORITY = 3
+    # Default maximum number of queued records
+    MAXSIZE = 1000
+
+    def __init__(self, codec=None, maxsize=MAXSIZE):
+        '''
+        :param codec: codec of records, defaults to JSON
+        :type codec: `mesoshttp.codec.JsonCodec`
+        :param maxsize: maximum number of queued records, 0 for no limit
+        :type maxsize: int
+        '''
+        self.codec = codec or JSON_CODEC
+        self.maxsize = maxsize
+        self._heap = []
+        self._counter = itertools.count()
+        lock = threading.Lock()
+        self._condition = threading.Condition(lock)
+        self._not_full = threading.Condition(lock)
+        self._closed = False
+        self._queued_offers = 0
+        self._rescinded = set()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def put(self, record):
+        '''
+        Add a raw event record, waiting for a free slot if queue is full
+
+        :param record: raw JSON event
+        :type record: bytes
+        '''
+        event_type = self.codec.peek_event_type(record)
+        if event_type is None:
+            event_type = self.codec.decode(record)['type']
+        priority = PriorityEventQueue.PRIORITIES.get(event_type, PriorityEventQueue.DEFAULT_PRIORITY)
+        with self._condition:
+            while self.maxsize and len(self._heap) >= self.maxsize and not self._closed:
+                self._not_full.wait()
+            if event_type == 'OFFERS':
+                self._queued_offers += 1
+            elif event_type == 'RESCIND' and self._queued_offers:
+                self._rescinded.add(self.codec.decode(record)['rescind']['offer_id']['value'])
+            heapq.heappush(self._heap, (priority, next(self._counter), event_type, record))
+            self._condition.notify()
+
+    def get(self):
+        '''
+        Get next record to handle, waiting for one if queue is empty
+
+        :return: (record, rescinded offer ids) or None if queue is closed
+        '''
+        with self._condition:
+            while not self._heap and not self._closed:
+                self._condition.wait()
+            if not self._heap:
+                return None
+            (priority, count, event_type, record) = heapq.heappop(self._heap)
+            self._not_full.notify()
+            rescinded = None
+            if event_type == 'OFFERS':
+                self._queued_offers -= 1
+                rescinded = frozenset(self._rescinded)
+                if not self._queued_offers:
+                    self._rescinded = set()
+            return (record, rescinded)
+
+    def close(self, discard=False):
+        '''
+        Close queue, get will return None once queue is empty
+
+        :param discard: drop queued records
+        :type discard: bool
+        '''
+        with self._condition:
+            self._closed = True
+            if discard:
+                self._heap = []
+                self._queued_offers = 0
+                self._rescinded = set()
+            self._condition.notify_all()
+            self._not_full.notify_all()
@@ -0,0 +1,388 @@
+from mesoshttp.exception import MesosException
+
+# Scalars are compared with a tolerance as master does fixed point arithmetic
+SCALAR_TOLERANCE = 0.0005
+
+
+class OfferResources(object):
+    '''
+    Totals of offered resources, parsed on first access
+
+    Scalar resources are summed per name, ranges are merged as sorted
+    (begin, end) tuples and set items are gathered per name, whatever the
+    resources reservations, see `Resources.parse`.
+    '''
+
+    __slots__ = ('_resources', '_parsed')
+
+    def __init__(self, resources):
+        '''
+        :param resources: JSON Resource instances of an offer
+        :type resources: list
+        '''
+        self._resources = resources
+        self._parsed = None
+
+    def __get_parsed(self):
+        if self._parsed is None:
+            self._parsed = Resources.parse(self._resources)
+        return self._parsed
+
+    def scalar(self, name):
+        '''
+        Get total value of a scalar resource
+
+        :param name: resource name
+        :type name: str
+        :return: float, 0 if not offered
+        '''
+        return self.__get_parsed().scalars.get(name, 0)
+
+    def ranges(self, name):
+        '''
+        Get merged ranges of a ranges resource
+
+        :param name: resource name
+        :type name: str
+        :return: list of (begin, end) tuples, sorted
+        '''
+        return self.__get_parsed().ranges.get(name, [])
+
+    def items(self, name):
+        '''
+        Get items of a set resource
+
+        :param name: resource name
+        :type name: str
+        :return: set
+        '''
+        return self.__get_parsed().sets.get(name, set())
+
+    def as_resources(self):
+        '''
+        Get a copy of offered totals, to place tasks on the offer
+
+        :return: `Resources` keyed by resource name
+        '''
+        return self.__get_parsed().copy()
+
+    def port_allocator(self, name='ports'):
+        '''
+        Get an allocator handing out offered ports
+
+        :param name: ranges resource name
+        :type name: str
+        :return: `PortAllocator`
+        '''
+        return PortAllocator(self.ranges(name), name)
+
+    @property
+    def cpus(self):
+        return self.scalar('cpus')
+
+    @property
+    def mem(self):
+        return self.scalar('mem')
+
+    @property
+    def disk(self):
+        return self.scalar('disk')
+
+    @property
+    def gpus(self):
+        return self.scalar('gpus')
+
+    @property
+    def ports(self):
+        return self.ranges('ports')
+
+
+def _merge_intervals(intervals):
+    '''
+    Sort and merge overlapping or adjacent (begin, end) intervals
+    '''
+    merged = []
+    for (begin, end) in sorted(intervals):
+        if merged and begin <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((begin, end))
+    return merged
+
+
+def _add_intervals(intervals, other):
+    '''
+    Get union of two sorted interval lists
+    '''
+    # sort of two sorted runs is linear
+    return _merge_intervals(intervals + other)
+
+
+def _contains_intervals(intervals, other):
+    '''
+    Check if all intervals of a sorted list are included in another sorted list
+    '''
+    index = 0
+    for (begin, end) in other:
+        while index < len(intervals) and intervals[index][1] < begin:
+            index += 1
+        if index == len(intervals) or intervals[index][0] > begin or intervals[index][1] < end:
+            return False
+    return True
+
+
+def _subtract_intervals(intervals, other):
+    '''
+    Remove sorted intervals from a sorted interval list
+    '''
+    remaining = []
+    index = 0
+    for (begin, end) in intervals:
+        while index < len(other) and other[index][1] < begin:
+            index += 1
+        position = index
+        while begin <= end:
+            if position == len(other) or other[position][0] > end:
+                remaining.append((begin, end))
+                break
+            if other[position][0] > begin:
+                remaining.append((begin, other[position][0] - 1))
+            begin = max(begin, other[position][1] + 1)
+            position += 1
+    return remaining
+
+
+def _resource_name(resource):
+    return resource['name']
+
+
+class Resources(object):
+    '''
+    Scalar, ranges and set resources, with add, subtract and contains
+
+    Resources are keyed by name by default. Ranges are kept as sorted lists
+    of (begin, end) tuples, so operations are linear in the number of
+    intervals, not in the number of values::
+
+        available = offer.resources.as_resources()
+        task_resources = Resources.parse(task['resources'])
+        if available.contains(task_resources):
+            available.subtract(task_resources)
+    '''
+
+    __slots__ = ('scalars', 'ranges', 'sets')
+
+    def __init__(self, scalars=None, ranges=None, sets=None):
+        '''
+        :param scalars: key => value
+        :type scalars: dict
+        :param ranges: key => sorted list of (begin, end)
+        :type ranges: dict
+        :param sets: key => set of items
+        :type sets: dict
+        '''
+        self.scalars = scalars or {}
+        self.ranges = ranges or {}
+        self.sets = sets or {}
+
+    @classmethod
+    def parse(cls, resources, key=_resource_name):
+        '''
+        Create from JSON Resource instances
+
+        :param resources: JSON Resource instances
+        :type resources: list
+        :param key: function(resource) giving the key of a resource, defaults to its name
+        :type key: def
+        :return: `Resources`
+        '''
+        scalars = {}
+        ranges = {}
+        sets = {}
+        for resource in resources:
+            resource_type = resource.get('type')
+            resource_key = key(resource)
+            if resource_type == 'SCALAR':
+                scalars[resource_key] = scalars.get(resource_key, 0) + resource['scalar']['value']
+            elif resource_type == 'RANGES':
+                intervals = ranges.setdefault(resource_key, [])
+                for value_range in resource['ranges'].get('range', []):
+                    intervals.append((value_range['begin'], value_range['end']))
+            elif resource_type == 'SET':
+                sets.setdefault(resource_key, set()).update(resource['set'].get('item', []))
+        for resource_key in ranges:
+            ranges[resource_key] = _merge_intervals(ranges[resource_key])
+        return cls(scalars, ranges, sets)
+
+    def copy(self):
+        return Resources(
+            dict(self.scalars),
+            dict(self.ranges),
+            dict([(key, set(items)) for key, items in self.sets.items()])
+        )
+
+    def __repr__(self):
+        return 'Resources(%r, %r, %r)' % (self.scalars, self.ranges, self.sets)
+
+    def scalar(self, key):
+        return self.scalars.get(key, 0)
+
+    def contains(self, other):
+        '''
+        Check if other resources are included
+
+        :param other: resources to check
+        :type other: `Resources`
+        :return: bool
+        '''
+        for key, value in other.scalars.items():
+            if self.scalars.get(key, 0) + SCALAR_TOLERANCE < value:
+                return False
+        for key, intervals in other.ranges.items():
+            if intervals and not _contains_intervals(self.ranges.get(key, []), intervals):
+                return False
+        for key, items in other.sets.items():
+            if not items.issubset(self.sets.get(key, set())):
+                return False
+        return True
+
+    def add(self, other):
+        '''
+        Add other resources
+
+        :param other: resources to add
+        :type other: `Resources`
+        :return: self
+        '''
+        for key, value in other.scalars.items():
+            self.scalars[key] = self.scalars.get(key, 0) + value
+        for key, intervals in other.ranges.items():
+            self.ranges[key] = _add_intervals(self.ranges.get(key, []), intervals)
+        for key, items in other.sets.items():
+            self.sets[key] = self.sets.get(key, set()) | items
+        return self
+
+    def subtract(self, other):
+        '''
+        Subtract other resources
+
+        :param other: resources to subtract, must be included
+        :type other: `Resources`
+        :return: self
+        '''
+        for key, value in other.scalars.items():
+            available = self.scalars.get(key, 0)
+            if available + SCALAR_TOLERANCE < value:
+                raise MesosException('not enough %s (%s available, %s needed)' % (
+                    _key_name(key), str(available), str(value)))
+            self.scalars[key] = available - value
+        for key, intervals in other.ranges.items():
+            available = self.ranges.get(key, [])
+            if not _contains_intervals(available, intervals):
+                raise MesosException('%s ranges not available' % (_key_name(key)))
+            self.ranges[key] = _subtract_intervals(available, intervals)
+        for key, items in other.sets.items():
+            available = self.sets.get(key, set())
+            if not items.issubset(available):
+                raise MesosException('%s items not available' % (_key_name(key)))
+            self.sets[key] = available - items
+        return self
+
+    def __add__(self, other):
+        return self.copy().add(other)
+
+    def __sub__(self, other):
+        return self.copy().subtract(other)
+
+    def to_json(self):
+        '''
+        Get JSON Resource instances of resources keyed by name
+
+        :return: list
+        '''
+        resources = []
+        for name, value in self.scalars.items():
+            resources.append({'name': name, 'type': 'SCALAR', 'scalar': {'value': value}})
+        for name, intervals in self.ranges.items():
+            resources.append(_ranges_resource(name, intervals))
+        for name, items in self.sets.items():
+            resources.append({'name': name, 'type': 'SET', 'set': {'item': sorted(items)}})
+        return resources
+
+
+def _key_name(key):
+    if isinstance(key, tuple):
+        return key[0]
+    return key
+
+
+def _ranges_resource(name, intervals):
+    return {
+        'name': name,
+        'type': 'RANGES',
+        'ranges': {'range': [{'begin': begin, 'end': end} for (begin, end) in intervals]}
+    }
+
+
+class PortAllocator(object):
+    '''
+    Hand out ports of an offer to tasks
+
+    Ports are taken in order from a cursor over offered intervals, so
+    allocating N ports costs O(number of intervals used), whatever the
+    number of tasks already served::
+
+        allocator = offer.resources.port_allocator()
+        for task in tasks:
+            task['resources'].append(allocator.allocate_resource(2))
+    '''
+
+    def __init__(self, intervals, name='ports'):
+        '''
+        :param intervals: sorted (begin, end) intervals
+        :type intervals: list
+        :param name: ranges resource name
+        :type name: str
+        '''
+        self.name = name
+        self._intervals = intervals
+        self._index = 0
+        self._next = intervals[0][0] if intervals else None
+        self.available = sum([end - begin + 1 for (begin, end) in intervals])
+
+    def allocate(self, count):
+        '''
+        Allocate ports
+
+        :param count: number of ports
+        :type count: int
+        :return: sorted list of (begin, end) intervals
+        '''
+        if count > self.available:
+            raise MesosException('not enough %s (%d available, %d needed)' % (self.name, self.available, count))
+        allocated = []
+        remaining = count
+        while remaining:
+            end = self._intervals[self._index][1]
+            last = min(end, self._next + remaining - 1)
+            allocated.append((self._next, last))
+            remaining -= last - self._next + 1
+            if last == end:
+                self._index += 1
+                if self._index < len(self._intervals):
+                    self._next = self._intervals[self._index][0]
+            else:
+                self._next = last + 1
+        self.available -= count
+        return allocated
+
+    def allocate_resource(self, count):
+        '''
+        Allocate ports as a JSON Resource
+
+        :param count: number of ports
+        :type count: int
+        :return: JSON RANGES Resource
+        '''
+        return _ranges_resource(self.name, self.allocate(count))
@@ -0,0 +1,695 @@
+import heapq
+import itertools
+import json
+import random
+import time
+import uuid
+from collections import OrderedDict
+
+from mesoshttp.constraints import OfferConstraints
+from mesoshttp.exception import MesosException
+from mesoshttp.resources import SCALAR_TOLERANCE, Resources
+from mesoshttp.tracing import LatencyHistogram
+from mesoshttp.update import TERMINAL_STATES
+
+
+# Resources of a simulated agent, if not set
+DEFAULT_AGENT_RESOURCES = [
+    {'name': 'cpus', 'type': 'SCALAR', 'scalar': {'value': 32.0}},
+    {'name': 'mem', 'type': 'SCALAR', 'scalar': {'value': 128000.0}},
+    {'name': 'disk', 'type': 'SCALAR', 'scalar': {'value': 500000.0}},
+    {'name': 'ports', 'type': 'RANGES', 'ranges': {'range': [{'begin': 31000, 'end': 32000}]}}
+]
+
+# Resources whose allocated part is measured as utilisation
+UTILISATION_RESOURCES = ('cpus', 'mem')
+
+
+def default_attributes(index):
+    '''
+    Get attributes of a simulated agent: 40 racks over 3 zones
+
+    :param index: agent index
+    :type index: int
+    :return: list of JSON Attribute
+    '''
+    return [
+        {'name': 'rack', 'type': 'TEXT', 'text': {'value': 'rack-%d' % (index % 40)}},
+        {'name': 'zone', 'type': 'TEXT', 'text': {'value': 'zone-%d' % (index % 3)}}
+    ]
+
+
+class _SimulatedResponse(object):
+
+    __slots__ = ('status_code', 'text')
+
+    def __init__(self, status_code, text=''):
+        self.status_code = status_code
+        self.text = text
+
+
+class _SimulatedAgent(object):
+
+    __slots__ = ('agent_id', 'hostname', 'attributes', 'total', 'available', 'tasks', 'offer_id',
+                 'refused_until', 'active', 'matching')
+
+    def __init__(self, agent_id, hostname, attributes, total):
+        self.agent_id = agent_id
+        self.hostname = hostname
+        self.attributes = attributes
+        self.total = total
+        # resources neither used by tasks nor offered
+        self.available = total.copy()
+        self.tasks = set()
+        self.offer_id = None
+        # agent resources are not offered before this time (decline filters)
+        self.refused_until = 0
+        self.active = True
+        # agent matches framework offer constraints, None if not checked yet
+        self.matching = None
+
+
+class _SimulatedTask(object):
+
+    __slots__ = ('task_id', 'agent', 'resources', 'state')
+
+    def __init__(self, task_id, agent, resources):
+        self.task_id = task_id
+        self.agent = agent
+        self.resources = resources
+        self.state = 'TASK_STAGING'
+
+
+class ClusterSimulator(object):
+    '''
+    In-process master simulating a cluster, on a virtual clock
+
+    Simulator is set as the client session: calls sent by offers, updates
+    and driver (ACCEPT, DECLINE, KILL, REVIVE, SUPPRESS, RECONCILE,
+    TEARDOWN, UPDATE_FRAMEWORK) are applied to the simulated cluster, and events (OFFERS,
+    UPDATE, RESCIND, FAILURE, HEARTBEAT) are given to
+    `MesosClient.process_record`, so client callbacks, task queue and
+    constraints run as with a real master, without network. Offer
+    constraints of SUBSCRIBE call are applied::
+
+        client = MesosClient(mesos_urls=[])
+        client.on(MesosClient.SUBSCRIBED, subscribed)
+        simulator = ClusterSimulator(client, agents=10000)
+        simulator.run(duration=3600)
+        print(simulator.report())
+
+    Virtual time only moves between events, time spent in client code is
+    measured as decision latency of OFFERS events. Only unreserved
+    resources are simulated, operations other than LAUNCH and LAUNCH_GROUP
+    are ignored. Only JSON codec is supported.
+    '''
+
+    MASTER_URL = 'http://simulator:5050'
+    FRAMEWORK_ID = 'simulated-framework'
+
+    def __init__(
+            self,
+            client,
+            agents=100,
+            agent_resources=None,
+            attributes=default_attributes,
+            task_duration=60.0,
+            allocation_interval=1.0,
+            refuse_seconds=5.0,
+            staging_delay=0.5,
+            running_delay=1.0,
+            kill_delay=0.5,
+            offer_timeout=None,
+            mean_time_between_failures=None,
+            recovery_time=60.0,
+            heartbeat_interval=15.0,
+            seed=None):
+        '''
+        :param client: client to simulate a master for
+        :type client: `mesoshttp.client.MesosClient`
+        :param agents: number of agents created with agent_resources
+        :type agents: int
+        :param agent_resources: JSON Resource instances of an agent, defaults to DEFAULT_AGENT_RESOURCES
+        :type agent_resources: list
+        :param attributes: function(index) giving JSON Attribute instances of an agent
+        :type attributes: def
+        :param task_duration: seconds tasks run before TASK_FINISHED, or function(task_info)
+            giving seconds, None for tasks running until killed
+        :type task_duration: float or def
+        :param allocation_interval: seconds between offer cycles
+        :type allocation_interval: float
+        :param refuse_seconds: default seconds declined resources are not offered again
+        :type refuse_seconds: float
+        :param staging_delay: seconds from ACCEPT to TASK_STAGING
+        :type staging_delay: float
+        :param running_delay: seconds from TASK_STAGING to TASK_RUNNING
+        :type running_delay: float
+        :param kill_delay: seconds from KILL to TASK_KILLED
+        :type kill_delay: float
+        :param offer_timeout: seconds before an offer is rescinded, None to never rescind
+        :type offer_timeout: float
+        :param mean_time_between_failures: mean seconds between two agent failures over the cluster,
+            None for no failure
+        :type mean_time_between_failures: float
+        :param recovery_time: seconds before a failed agent comes back, None to never come back
+        :type recovery_time: float
+        :param heartbeat_interval: seconds between HEARTBEAT events
+        :type heartbeat_interval: float
+        :param seed: random seed of failures
+        :type seed: int
+        '''
+        if client.codec.content_type != 'application/json':
+            raise MesosException('Simulator only supports JSON codec')
+        self.client = client
+        self.attributes = attributes
+        self.task_duration = task_duration
+        self.allocation_interval = allocation_interval
+        self.refuse_seconds = refuse_seconds
+        self.staging_delay = staging_delay
+        self.running_delay = running_delay
+        self.kill_delay = kill_delay
+        self.offer_timeout = offer_timeout
+        self.mean_time_between_failures = mean_time_between_failures
+        self.recovery_time = recovery_time
+        self.heartbeat_interval = heartbeat_interval
+        self.random = random.Random(seed)
+        self.now = 0.0
+        self.agents = OrderedDict()
+        self.tasks = {}
+        self._timers = []
+        self._sequence = itertools.count()
+        self._offer_ids = itertools.count()
+        # offer_id => (agent, offered resources)
+        self._offers = {}
+        # agents which may have resources to offer, ordered for reproducible runs
+        self._offerable = OrderedDict()
+        self._suppressed = False
+        self.role = '*'
+        self.offer_constraints = OfferConstraints()
+        self._started = False
+        self._torn_down = False
+        # resource => amount used by tasks and amount on active agents
+        self._used = dict([(name, 0.0) for name in UTILISATION_RESOURCES])
+        self._capacity = dict([(name, 0.0) for name in UTILISATION_RESOURCES])
+        # resource => integral over virtual time of used and active resources
+        self._used_time = dict([(name, 0.0) for name in UTILISATION_RESOURCES])
+        self._capacity_time = dict([(name, 0.0) for name in UTILISATION_RESOURCES])
+        self.__call_handlers = {
+            'ACCEPT': self.__accept,
+            'DECLINE': self.__decline,
+            'KILL': self.__kill,
+            'REVIVE': self.__revive,
+            'SUPPRESS': self.__suppress,
+            'RECONCILE': self.__reconcile,
+            'TEARDOWN': self.__teardown,
+            'UPDATE_FRAMEWORK': self.__update_framework
+        }
+        self.calls = {}
+        self.events = {}
+        self.states = {}
+        self.launched = 0
+        self.decisions = LatencyHistogram()
+        self.wall_time = 0.0
+        self.client_time = 0.0
+
+        if agent_resources is None:
+            agent_resources = DEFAULT_AGENT_RESOURCES
+        for index in range(agents):
+            self.add_agent(resources=agent_resources, attributes=self.attributes(index))
+
+    def add_agent(self, agent_id=None, hostname=None, resources=None, attributes=None):
+        '''
+        Add an agent to the cluster
+
+        :param agent_id: agent identifier, generated if not set
+        :type agent_id: str
+        :param hostname: agent hostname, generated if not set
+        :type hostname: str
+        :param resources: JSON Resource instances, defaults to DEFAULT_AGENT_RESOURCES
+        :type resources: list
+        :param attributes: JSON Attribute instances
+        :type attributes: list
+        :return: agent identifier
+        '''
+        index = len(self.agents)
+        if agent_id is None:
+            agent_id = 'simulated-S%d' % (index)
+        if agent_id in self.agents:
+            raise MesosException('Agent %s already exists' % (agent_id))
+        agent = _SimulatedAgent(
+            agent_id,
+            hostname or 'agent%d.simulator' % (index),
+            attributes or [],
+            Resources.parse(resources or DEFAULT_AGENT_RESOURCES)
+        )
+        self.agents[agent_id] = agent
+        self.__count(self._capacity, agent.total, 1)
+        self._offerable[agent_id] = agent
+        return agent_id
+
+    def schedule(self, delay, function, *args):
+        '''
+        Call a function at a virtual time
+
+        Can be used to add workload during simulation, for example tasks
+        submitted every second.
+
+        :param delay: seconds from now
+        :type delay: float
+        :param function: function to call
+        :type function: def
+        '''
+        heapq.heappush(self._timers, (self.now + delay, next(self._sequence), function, args))
+
+    def post(self, url, data=None, **kwargs):
+        '''
+        Apply a call sent by client, as a `requests.Session`
+        '''
+        call = json.loads(data)
+        call_type = call['type']
+        self.calls[call_type] = self.calls.get(call_type, 0) + 1
+        handler = self.__call_handlers.get(call_type)
+        if handler is not None:
+            handler(call)
+        return _SimulatedResponse(202)
+
+    def __count(self, counters, resources, sign):
+        for name in UTILISATION_RESOURCES:
+            counters[name] += sign * resources.scalar(name)
+
+    def __advance(self, timestamp):
+        elapsed = timestamp - self.now
+        if elapsed <= 0:
+            return
+        for name in UTILISATION_RESOURCES:
+            self._used_time[name] += self._used[name] * elapsed
+            self._capacity_time[name] += self._capacity[name] * elapsed
+        self.now = timestamp
+
+    def __send(self, event):
+        # events are never given to client during a call
+        self.schedule(0, self.__deliver, event)
+
+    def __deliver(self, event):
+        event_type = event['type']
+        self.events[event_type] = self.events.get(event_type, 0) + 1
+        record = json.dumps(event, separators=(',', ':')).encode('utf-8')
+        start = time.time()
+        self.client.process_record(record)
+        elapsed = time.time() - start
+        self.client_time += elapsed
+        if event_type == 'OFFERS':
+            self.decisions.add(elapsed)
+
+    def __start(self):
+        self._started = True
+        self.client.set_session(self)
+        self.client.open_stream(ClusterSimulator.MASTER_URL, 'simulated-stream')
+        subscribe = self.client.get_subscribe_call()['subscribe']
+        self.__set_framework(subscribe['framework_info'], subscribe.get('offer_constraints'))
+        self.__deliver({
+            'type': 'SUBSCRIBED',
+            'subscribed': {
+                'framework_id': {'value': self.client.frameworkId or ClusterSimulator.FRAMEWORK_ID},
+                'heartbeat_interval_seconds': self.heartbeat_interval
+            }
+        })
+        self.schedule(0, self.__allocate)
+        if self.heartbeat_interval:
+            self.schedule(self.heartbeat_interval, self.__heartbeat)
+        if self.mean_time_between_failures:
+            self.schedule(self.random.expovariate(1.0 / self.mean_time_between_failures), self.__random_failure)
+
+    def __set_framework(self, framework_info, offer_constraints):
+        self.role = framework_info.get('role', '*')
+        self.offer_constraints = OfferConstraints.from_json(offer_constraints)
+        for agent in self.agents.values():
+            agent.matching = None
+            self._offerable[agent.agent_id] = agent
+
+    def __matches(self, agent):
+        if agent.matching is None:
+            agent.matching = self.offer_constraints.matches(
+                {'hostname': agent.hostname, 'attributes': agent.attributes}, self.role
+            )
+        return agent.matching
+
+    def run(self, duration=None, until=None):
+        '''
+        Run simulation
+
+        Can be called again to continue simulation.
+
+        :param duration: virtual seconds to simulate
+        :type duration: float
+        :param until: function() stopping simulation when it returns True, checked after each event
+        :type until: def
+        :return: dict of metrics, see `metrics`
+        '''
+        if duration is None and until is None:
+            raise MesosException('Simulation needs a duration or a stop condition')
+        start = time.time()
+        if not self._started:
+            self.__start()
+        end = None
+        if duration is not None:
+            end = self.now + duration
+        stopped = False
+        while self._timers and not stopped:
+            if end is not None and self._timers[0][0] > end:
+                break
+            (timestamp, sequence, function, args) = heapq.heappop(self._timers)
+            self.__advance(timestamp)
+            function(*args)
+            stopped = until is not None and until()
+        if end is not None and not stopped:
+            self.__advance(end)
+        self.wall_time += time.time() - start
+        return self.metrics()
+
+    def __heartbeat(self):
+        self.__deliver({'type': 'HEARTBEAT'})
+        self.schedule(self.heartbeat_interval, self.__heartbeat)
+
+    def __allocate(self):
+        if not self._suppressed and not self._torn_down:
+            offers = []
+            for agent in list(self._offerable.values()):
+                if agent.refused_until > self.now:
+                    continue
+                del self._offerable[agent.agent_id]
+                if not agent.active or agent.offer_id is not None or not self.__matches(agent):
+                    continue
+                if agent.available.scalar('cpus') <= SCALAR_TOLERANCE and \
+                        agent.available.scalar('mem') <= SCALAR_TOLERANCE:
+                    continue
+                offers.append(self.__make_offer(agent))
+            if offers:
+                self.__deliver({'type': 'OFFERS', 'offers': {'offers': offers}})
+        self.schedule(self.allocation_interval, self.__allocate)
+
+    def __make_offer(self, agent):
+        offer_id = '%s-O%d' % (ClusterSimulator.FRAMEWORK_ID, next(self._offer_ids))
+        resources = agent.available
+        agent.available = Resources()
+        agent.offer_id = offer_id
+        self._offers[offer_id] = (agent, resources)
+        if self.offer_timeout:
+            self.schedule(self.offer_timeout, self.__rescind, offer_id)
+        return {
+            'id': {'value': offer_id},
+            'framework_id': {'value': self.client.frameworkId},
+            'agent_id': {'value': agent.agent_id},
+            'hostname': agent.hostname,
+            'resources': resources.to_json(),
+            'attributes': agent.attributes,
+            'allocation_info': {'role': self.role}
+        }
+
+    def __close_offer(self, offer_id):
+        '''
+        Remove an outstanding offer
+
+        :return: (agent, offered resources) or None if offer is not outstanding
+        '''
+        offer = self._offers.pop(offer_id, None)
+        if offer is not None:
+            offer[0].offer_id = None
+        return offer
+
+    def __return(self, agent, resources, refuse_seconds=0):
+        '''
+        Give back resources of an offer or of an ended task to their agent
+        '''
+        if not agent.active:
+            return
+        agent.available.add(resources)
+        if refuse_seconds:
+            agent.refused_until = max(agent.refused_until, self.now + refuse_seconds)
+        self._offerable[agent.agent_id] = agent
+
+    def __rescind(self, offer_id):
+        offer = self.__close_offer(offer_id)
+        if offer is None:
+            return
+        self.__deliver({'type': 'RESCIND', 'rescind': {'offer_id': {'value': offer_id}}})
+        self.__return(offer[0], offer[1])
+
+    def __update(self, task_id, agent_id, state, reason=None, master=False):
+        status = {
+            'task_id': {'value': task_id},
+            'agent_id': {'value': agent_id},
+            'state': state,
+            'source': 'SOURCE_EXECUTOR',
+            'timestamp': self.now
+        }
+        if master:
+            status['source'] = 'SOURCE_MASTER'
+        else:
+            # updates of master are not acknowledged
+            status['uuid'] = uuid.UUID(int=self.random.getrandbits(128)).hex
+        if reason:
+            status['reason'] = reason
+        self.states[state] = self.states.get(state, 0) + 1
+        self.__send({'type': 'UPDATE', 'update': {'status': status}})
+
+    def __transition(self, task, state, reason=None, master=False):
+        if task.state in TERMINAL_STATES or self.tasks.get(task.task_id) is not task:
+            return
+        task.state = state
+        if state in TERMINAL_STATES:
+            self.__release(task)
+        self.__update(task.task_id, task.agent.agent_id, state, reason, master)
+
+    def __release(self, task):
+        del self.tasks[task.task_id]
+        self.__count(self._used, task.resources, -1)
+        agent = task.agent
+        agent.tasks.discard(task.task_id)
+        self.__return(agent, task.resources)
+
+    def __get_duration(self, task_info):
+        if callable(self.task_duration):
+            return self.task_duration(task_info)
+        return self.task_duration
+
+    def __launch(self, agent, task_info, resources):
+        task = _SimulatedTask(task_info['task_id']['value'], agent, resources)
+        self.tasks[task.task_id] = task
+        agent.tasks.add(task.task_id)
+        self.__count(self._used, resources, 1)
+        self.launched += 1
+        running = self.staging_delay + self.running_delay
+        self.schedule(self.staging_delay, self.__transition, task, 'TASK_STAGING')
+        self.schedule(running, self.__transition, task, 'TASK_RUNNING')
+        duration = self.__get_duration(task_info)
+        if duration is not None:
+            self.schedule(running + duration, self.__transition, task, 'TASK_FINISHED')
+
+    def __accept(self, call):
+        accept = call['accept']
+        task_infos = []
+        for operation in accept.get('operations', []):
+            if operation['type'] == 'LAUNCH':
+                task_infos.extend(operation['launch']['task_infos'])
+            elif operation['type'] == 'LAUNCH_GROUP':
+                task_infos.extend(operation['launch_group']['task_group']['tasks'])
+        offers = []
+        for offer_id in accept['offer_ids']:
+            offer = self.__close_offer(offer_id['value'])
+            if offer is not None:
+                offers.append(offer)
+        agents = set([agent.agent_id for (agent, resources) in offers])
+        if not offers or len(offers) < len(accept['offer_ids']) or len(agents) > 1:
+            for (agent, resources) in offers:
+                self.__return(agent, resources)
+            for task_info in task_infos:
+                agent_id = task_info.get('agent_id', task_info.get('slave_id', {})).get('value', '')
+                self.__update(task_info['task_id']['value'], agent_id, 'TASK_DROPPED', 'REASON_INVALID_OFFERS',
+                              master=True)
+            return
+        agent = offers[0][0]
+        available = Resources()
+        for (offer_agent, resources) in offers:
+            available.add(resources)
+        for task_info in task_infos:
+            task_id = task_info['task_id']['value']
+            resources = Resources.parse(task_info.get('resources', []))
+            if task_id in self.tasks or not available.contains(resources):
+                self.__update(task_id, agent.agent_id, 'TASK_ERROR', 'REASON_TASK_INVALID', master=True)
+                continue
+            available.subtract(resources)
+            self.__launch(agent, task_info, resources)
+        refuse_seconds = accept.get('filters', {}).get('refuse_seconds', self.refuse_seconds)
+        self.__return(agent, available, refuse_seconds)
+
+    def __decline(self, call):
+        decline = call['decline']
+        refuse_seconds = decline.get('filters', {}).get('refuse_seconds', self.refuse_seconds)
+        for offer_id in decline['offer_ids']:
+            offer = self.__close_offer(offer_id['value'])
+            if offer is not None:
+                self.__return(offer[0], offer[1], refuse_seconds)
+
+    def __kill(self, call):
+        task_id = call['kill']['task_id']['value']
+        task = self.tasks.get(task_id)
+        if task is None:
+            agent_id = call['kill'].get('agent_id', {}).get('value', '')
+            self.__update(task_id, agent_id, 'TASK_LOST', 'REASON_RECONCILIATION', master=True)
+            return
+        self.schedule(self.kill_delay, self.__transition, task, 'TASK_KILLED')
+
+    def __revive(self, call):
+        self._suppressed = False
+        for agent in self.agents.values():
+            agent.refused_until = 0
+
+    def __suppress(self, call):
+        self._suppressed = True
+
+    def __reconcile(self, call):
+        tasks = call['reconcile'].get('tasks', [])
+        if not tasks:
+            for task in self.tasks.values():
+                self.__update(task.task_id, task.agent.agent_id, task.state, 'REASON_RECONCILIATION', master=True)
+            return
+        for reconcile in tasks:
+            task_id = reconcile['task_id']['value']
+            task = self.tasks.get(task_id)
+            if task is None:
+                agent_id = reconcile.get('agent_id', {}).get('value', '')
+                self.__update(task_id, agent_id, 'TASK_LOST', 'REASON_RECONCILIATION', master=True)
+            else:
+                self.__update(task_id, task.agent.agent_id, task.state, 'REASON_RECONCILIATION', master=True)
+
+    def __update_framework(self, call):
+        update = call['update_framework']
+        role = self.role
+        self.__set_framework(update['framework_info'], update.get('offer_constraints'))
+        for (offer_id, (agent, resources)) in list(self._offers.items()):
+            if role != self.role or not self.__matches(agent):
+                self.schedule(0, self.__rescind, offer_id)
+
+    def __teardown(self, call):
+        self._torn_down = True
+        for task in list(self.tasks.values()):
+            self.__release(task)
+        for offer_id in list(self._offers):
+            (agent, resources) = self.__close_offer(offer_id)
+            self.__return(agent, resources)
+
+    def fail_agent(self, agent_id, recovery_time=None):
+        '''
+        Simulate failure of an agent
+
+        Agent offer is rescinded, its tasks are lost and a FAILURE event is
+        sent. Agent comes back with all its resources after recovery time.
+
+        :param agent_id: agent identifier
+        :type agent_id: str
+        :param recovery_time: seconds before agent comes back, defaults to simulator recovery_time
+        :type recovery_time: float
+        '''
+        agent = self.agents[agent_id]
+        if not agent.active:
+            return
+        agent.active = False
+        self.__count(self._capacity, agent.total, -1)
+        if agent.offer_id is not None:
+            self.__send({'type': 'RESCIND', 'rescind': {'offer_id': {'value': agent.offer_id}}})
+            self.__close_offer(agent.offer_id)
+        agent.available = Resources()
+        for task_id in list(agent.tasks):
+            self.__transition(self.tasks[task_id], 'TASK_LOST', 'REASON_AGENT_REMOVED', master=True)
+        self.__send({'type': 'FAILURE', 'failure': {'agent_id': {'value': agent_id}}})
+        if recovery_time is None:
+            recovery_time = self.recovery_time
+        if recovery_time is not None:
+            self.schedule(recovery_time, self.__recover, agent)
+
+    def __recover(self, agent):
+        agent.active = True
+        agent.available = agent.total.copy()
+        agent.refused_until = 0
+        self.__count(self._capacity, agent.total, 1)
+        self._offerable[agent.agent_id] = agent
+
+    def __random_failure(self):
+        active = [agent_id for agent_id, agent in self.agents.items() if agent.active]
+        if active:
+            self.fail_agent(self.random.choice(active))
+        self.schedule(self.random.expovariate(1.0 / self.mean_time_between_failures), self.__random_failure)
+
+    def utilisation(self):
+        '''
+        Get mean part of active agents resources used by tasks since simulation start
+
+        :return: dict resource name => ratio
+        '''
+        utilisation = {}
+        for name in UTILISATION_RESOURCES:
+            utilisation[name] = 0.0
+            if self._capacity_time[name]:
+                utilisation[name] = self._used_time[name] / self._capacity_time[name]
+        return utilisation
+
+    def metrics(self):
+        '''
+        Get simulation metrics
+
+        * time: simulated seconds
+        * wall_time: seconds spent in `run`, client_time: part spent in client code
+        * launched: number of launched tasks, running: number of tasks not ended
+        * throughput: launched tasks per wall second, virtual_throughput: per simulated second
+        * utilisation: see `utilisation`
+        * decisions: summary of wall time spent in client for each OFFERS event,
+          see `mesoshttp.tracing.LatencyHistogram.summary`
+        * events, calls, states: number of events, calls and task updates by type
+
+        :return: dict
+        '''
+        throughput = 0.0
+        if self.wall_time:
+            throughput = self.launched / self.wall_time
+        virtual_throughput = 0.0
+        if self.now:
+            virtual_throughput = self.launched / self.now
+        return {
+            'time': self.now,
+            'wall_time': self.wall_time,
+            'client_time': self.client_time,
+            'launched': self.launched,
+            'running': len(self.tasks),
+            'throughput': throughput,
+            'virtual_throughput': virtual_throughput,
+            'utilisation': self.utilisation(),
+            'decisions': self.decisions.summary(),
+            'events': dict(self.events),
+            'calls': dict(self.calls),
+            'states': dict(self.states)
+        }
+
+    def report(self):
+        '''
+        Get a text report of simulation metrics
+
+        :return: str
+        '''
+        metrics = self.metrics()
+        decisions = metrics['decisions']
+        lines = [
+            'simulated:   %.1f s in %.2f s wall time (%.2f s in client)' % (
+                metrics['time'], metrics['wall_time'], metrics['client_time']),
+            'launched:    %d tasks, %d not ended' % (metrics['launched'], metrics['running']),
+            'throughput:  %.1f tasks per wall second, %.1f tasks per simulated second' % (
+                metrics['throughput'], metrics['virtual_throughput']),
+            'utilisation: ' + ', '.join(['%s %.1f%%' % (name, ratio * 100)
+                                         for name, ratio in sorted(metrics['utilisation'].items())]),
+            'decisions:   %d OFFERS events, mean %.2f ms, p99 %.2f ms, max %.2f ms' % (
+                decisions['count'], decisions['mean'] * 1000, decisions['p99'] * 1000, decisions['max'] * 1000),
+            'events:      ' + ', '.join(['%s %d' % item for item in sorted(metrics['events'].items())]),
+            'calls:       ' + ', '.join(['%s %d' % item for item in sorted(metrics['calls'].items())]),
+            'updates:     ' + ', '.join(['%s %d' % item for item in sorted(metrics['states'].items())])
+        ]
+        return '\n'.join(lines)
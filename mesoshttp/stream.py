@@ -0,0 +1,171 @@
+import json
+import re
+
+
+# Mesos serializes the type field first, check it without decoding the record
+EVENT_TYPE_RE = re.compile(br'^\s*\{\s*"type"\s*:\s*"([A-Z_]+)"')
+
+
+class RecordReader(object):
+    '''
+    Incremental RecordIO parser
+
+    Stream is formatted as `<length>\\n<record><length>\\n<record>...`,
+    records are returned as raw bytes, whatever their content (JSON or protobuf).
+    '''
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._count_bytes = None
+
+    def feed(self, data):
+        '''
+        Add stream data
+
+        :param data: data read from stream
+        :type data: bytes
+        :return: list of complete records
+        '''
+        buffer = self._buffer
+        buffer.extend(data)
+        records = []
+        while True:
+            if self._count_bytes is None:
+                newline = buffer.find(b'\n')
+                if newline < 0:
+                    break
+                header = bytes(buffer[:newline]).strip()
+                del buffer[:newline + 1]
+                # filter out keep-alive new lines
+                if not header:
+                    continue
+                self._count_bytes = int(header)
+            if len(buffer) < self._count_bytes:
+                break
+            records.append(bytes(buffer[:self._count_bytes]))
+            del buffer[:self._count_bytes]
+            self._count_bytes = None
+        return records
+
+
+def iter_records(chunks):
+    '''
+    Get RecordIO records from the content of a Mesos stream
+
+    :param chunks: data of the HTTP stream (`requests.Response.iter_content`)
+    :type chunks: iterator
+    :return: iterator of bytes
+    '''
+    reader = RecordReader()
+    for chunk in chunks:
+        for record in reader.feed(chunk):
+            yield record
+
+
+def peek_event_type(record):
+    '''
+    Get the type of an event record without decoding it
+
+    :param record: raw JSON event
+    :type record: bytes
+    :return: event type or None if type could not be found
+    '''
+    match = EVENT_TYPE_RE.match(record)
+    if match is None:
+        return None
+    return match.group(1).decode('ascii')
+
+
+def decode_record(record):
+    '''
+    Decode a raw JSON record
+
+    :param record: raw JSON event
+    :type record: bytes
+    :return: dict
+    '''
+    return json.loads(record.decode('utf-8'))
+
+
+OFFERS_ARRAY_RE = re.compile(br'"offers"\s*:\s*\{\s*"offers"\s*:\s*\[')
+WHITESPACE_RE = re.compile(r'[\s,]*')
+
+
+def iter_offers(record):
+    '''
+    Decode offers of an OFFERS event record one at a time
+
+    Only the offer being iterated is decoded, the event is never decoded as
+    a whole unless the offers array can not be located in record.
+
+    :param record: raw JSON OFFERS event
+    :type record: bytes
+    :return: iterator of JSON offers
+    '''
+    match = OFFERS_ARRAY_RE.search(record)
+    if match is None:
+        for offer in decode_record(record)['offers'].get('offers', []):
+            yield offer
+        return
+    # Offsets of bytes prefix are the same once decoded as it is pure ascii
+    text = record.decode('utf-8')
+    decoder = json.JSONDecoder()
+    index = match.end()
+    while True:
+        index = WHITESPACE_RE.match(text, index).end()
+        if index >= len(text) or text[index] == ']':
+            return
+        (offer, index) = decoder.raw_decode(text, index)
+        yield offer
+
+
+class LazyOffers(object):
+    '''
+    Iterable over the offers of an OFFERS event record
+
+    Offers are decoded and wrapped while iterating, each offer only once:
+    offers decoded by a previous iteration are shared, so several callbacks
+    can iterate over the same offers.
+    '''
+
+    def __init__(self, record, offer_factory, excluded=None):
+        '''
+        :param record: raw JSON OFFERS event
+        :type record: bytes
+        :param offer_factory: function creating an `Offer` from a JSON offer
+        :type offer_factory: def
+        :param excluded: identifiers of offers to skip
+        :type excluded: set
+        '''
+        self.record = record
+        self.offer_factory = offer_factory
+        self.excluded = excluded
+        self._decoded = []
+        self._source = None
+
+    def __decode(self):
+        for offer in iter_offers(self.record):
+            if self.excluded and offer['id']['value'] in self.excluded:
+                continue
+            yield self.offer_factory(offer)
+
+    def __iter__(self):
+        decoded = self._decoded
+        index = 0
+        while True:
+            if index < len(decoded):
+                yield decoded[index]
+                index += 1
+                continue
+            if self.record is None:
+                return
+            if self._source is None:
+                self._source = self.__decode()
+            try:
+                offer = next(self._source)
+            except StopIteration:
+                # all offers are decoded, record is not needed anymore
+                self.record = None
+                self._source = None
+                return
+            decoded.append(offer)
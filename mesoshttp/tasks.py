@@ -0,0 +1,202 @@
+import logging
+import threading
+import time
+
+from mesoshttp.cache import resources_signature
+from mesoshttp.exception import MesosException
+from mesoshttp.resources import Resources
+
+
+class _PendingTask(object):
+    '''
+    Task waiting for an offer, with its resource requirements
+    '''
+
+    __slots__ = ('task_info', 'constraints', 'placements', 'resources', 'shape', 'future')
+
+    def __init__(self, task_info, constraints, future):
+        self.task_info = task_info
+        self.constraints = constraints or []
+        # constraints counting placed tasks, see `mesoshttp.constraints.PlacementGroup`
+        self.placements = [constraint for constraint in self.constraints if hasattr(constraint, 'placed')]
+        self.future = future
+        self.resources = Resources.parse(task_info.get('resources', []))
+        # tasks with the same shape fit on the same offers
+        self.shape = (resources_signature(self.resources), tuple(self.constraints))
+
+
+class TaskQueue(object):
+    '''
+    Tasks waiting to be launched on incoming offers
+
+    Tasks are submitted with `MesosClient.SchedulerDriver.submit`. On each
+    OFFERS event, pending tasks are matched in submission order against
+    offers, and tasks matched on an offer are launched in a single ACCEPT.
+    '''
+
+    # Minimum seconds between offers reception or REVIVE and a new REVIVE
+    REVIVE_INTERVAL = 5
+
+    def __init__(self, update_dispatcher, fit_cache=None):
+        '''
+        :param update_dispatcher: dispatcher resolving task futures
+        :type update_dispatcher: `mesoshttp.watch.UpdateDispatcher`
+        :param fit_cache: cache of fit results between offers of an agent
+        :type fit_cache: `mesoshttp.cache.FitCache`
+        '''
+        self.logger = logging.getLogger(__name__)
+        self.update_dispatcher = update_dispatcher
+        self.fit_cache = fit_cache
+        self._pending = []
+        self._lock = threading.Lock()
+        self.revive_interval = TaskQueue.REVIVE_INTERVAL
+        self._last_offers = 0
+        self._last_revive = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def submit(self, task_info, constraints=None):
+        '''
+        Add a task to launch
+
+        :param task_info: JSON TaskInfo, agent_id is set on launch
+        :type task_info: dict
+        :param constraints: functions(offer) returning True if task can run on offer,
+            or `mesoshttp.constraints.PlacementGroup`
+        :type constraints: list
+        :return: `mesoshttp.watch.TaskFuture` resolved when task is running or fails
+        '''
+        future = self.update_dispatcher.wait_for(task_info['task_id']['value'])
+        pending = _PendingTask(task_info, constraints, future)
+        with self._lock:
+            self._pending.append(pending)
+        return future
+
+    def revive_needed(self):
+        '''
+        Check if offers should be revived for new pending tasks
+
+        REVIVE clears all decline filters of the framework on master, so it
+        is skipped while offers are received, or if offers were revived less
+        than `revive_interval` seconds ago. If True, revive is recorded.
+
+        :return: bool
+        '''
+        now = time.time()
+        with self._lock:
+            if now - max(self._last_offers, self._last_revive) < self.revive_interval:
+                return False
+            self._last_revive = now
+        return True
+
+    def __fits(self, pending, offer, available):
+        if not available.contains(pending.resources):
+            return False
+        for constraint in pending.constraints:
+            if not constraint(offer):
+                return False
+        return True
+
+    def __place(self, pending, offer, available):
+        available.subtract(pending.resources)
+        for placement in pending.placements:
+            placement.placed(pending.task_info['task_id']['value'], offer)
+
+    def __minimum(self, pending):
+        '''
+        Get minimal value of scalar resources required by all pending tasks
+        '''
+        minimum = dict(pending[0].resources.scalars)
+        for task in pending:
+            scalars = task.resources.scalars
+            for name in list(minimum):
+                if name not in scalars:
+                    del minimum[name]
+                elif scalars[name] < minimum[name]:
+                    minimum[name] = scalars[name]
+            if not minimum:
+                break
+        return minimum
+
+    def __exhausted(self, scalars, minimum):
+        for name, value in minimum.items():
+            if scalars.get(name, 0) < value:
+                return True
+        return False
+
+    def launch(self, offers):
+        '''
+        Launch pending tasks on offers
+
+        :param offers: offers received from master
+        :type offers: list of `mesoshttp.offers.Offer`
+        :return: list of offers not used by any task
+        '''
+        with self._lock:
+            pending = self._pending
+            self._pending = []
+            if offers:
+                self._last_offers = time.time()
+        unused = []
+        minimum = None
+        if pending:
+            minimum = self.__minimum(pending)
+        for offer in offers:
+            if not pending:
+                unused.append(offer)
+                continue
+            available = offer.resources.as_resources()
+            agent_id = offer.get_offer()['agent_id']
+            fit_cache = self.fit_cache
+            if fit_cache is not None:
+                fit_cache.set_agent(agent_id['value'], resources_signature(available))
+            # shapes not fitting in available resources, until next placement
+            failed = set()
+            launched = []
+            waiting = []
+            for index, task in enumerate(pending):
+                if task.shape in failed:
+                    waiting.append(task)
+                    continue
+                # cached results are only valid for the whole offer
+                cached = fit_cache is not None and not launched and not task.placements
+                fits = None
+                if cached:
+                    fits = fit_cache.get(agent_id['value'], task.shape)
+                if fits is None:
+                    fits = self.__fits(task, offer, available)
+                    if cached:
+                        fit_cache.put(agent_id['value'], task.shape, fits)
+                if not fits:
+                    failed.add(task.shape)
+                    waiting.append(task)
+                    continue
+                self.__place(task, offer, available)
+                launched.append(task)
+                failed = set()
+                if self.__exhausted(available.scalars, minimum):
+                    # no other task can fit in remaining resources
+                    waiting.extend(pending[index + 1:])
+                    break
+            if not launched:
+                unused.append(offer)
+                continue
+            task_infos = []
+            for task in launched:
+                task_info = dict(task.task_info)
+                task_info['agent_id'] = agent_id
+                task_infos.append(task_info)
+            try:
+                offer.accept(task_infos)
+                pending = waiting
+            except MesosException as e:
+                self.logger.error('Mesos:TaskQueue:Accept:Error:' + str(e))
+                for task in launched:
+                    for placement in task.placements:
+                        placement.released(task.task_info['task_id']['value'])
+                pending = launched + waiting
+                unused.append(offer)
+        with self._lock:
+            self._pending = pending + self._pending
+        return unused
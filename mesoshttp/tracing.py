@@ -0,0 +1,289 @@
+import json
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+from mesoshttp.update import TERMINAL_STATES
+
+
+class LatencyHistogram(object):
+    '''
+    Histogram of latencies with power of 2 millisecond buckets
+    '''
+
+    # Last bucket holds latencies over 2^(BUCKETS - 1) ms (~9 minutes)
+    BUCKETS = 20
+
+    def __init__(self):
+        self.buckets = [0] * LatencyHistogram.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency):
+        '''
+        Add a latency
+
+        :param latency: latency in seconds
+        :type latency: float
+        '''
+        milliseconds = latency * 1000
+        index = 0
+        if milliseconds > 1:
+            index = min(int(math.ceil(math.log(milliseconds, 2))), LatencyHistogram.BUCKETS - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += latency
+        if latency > self.max:
+            self.max = latency
+
+    def percentile(self, percent):
+        '''
+        Get upper bound of the bucket holding a percentile
+
+        :param percent: percentile (50, 99, ...)
+        :type percent: float
+        :return: latency in seconds
+        '''
+        if not self.count:
+            return 0.0
+        rank = self.count * percent / 100.0
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(2 ** index / 1000.0, self.max)
+        return self.max
+
+    def summary(self):
+        '''
+        Get count, mean, max and percentiles in seconds
+
+        :return: dict
+        '''
+        mean = 0.0
+        if self.count:
+            mean = self.total / self.count
+        return {
+            'count': self.count,
+            'mean': mean,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99)
+        }
+
+
+class LaunchTracer(object):
+    '''
+    Timestamps of task launch stages, with per stage latency histograms
+
+    Stages of a task are:
+
+    * callback: from OFFERS event reception to ACCEPT call
+    * accept: ACCEPT call round-trip
+    * staging: from ACCEPT answer to TASK_STAGING update
+    * running: from TASK_STAGING (or ACCEPT answer) to TASK_RUNNING update
+    * total: from OFFERS event reception to TASK_RUNNING update
+
+    A span is recorded per task when it is running or reaches a terminal
+    state. Set with `MesosClient.set_tracer`::
+
+        tracer = LaunchTracer()
+        client.set_tracer(tracer)
+        ...
+        print(tracer.report())
+    '''
+
+    STAGES = ('callback', 'accept', 'staging', 'running', 'total')
+
+    def __init__(self, exporter=None, max_tasks=100000, max_spans=10000):
+        '''
+        :param exporter: function(span) called with each recorded span
+        :type exporter: def
+        :param max_tasks: maximum number of offers and tasks followed at once, oldest are dropped
+        :type max_tasks: int
+        :param max_spans: number of last spans kept for `export`
+        :type max_spans: int
+        '''
+        self.exporter = exporter
+        self.max_tasks = max_tasks
+        self._offers = OrderedDict()
+        self._tasks = OrderedDict()
+        self.spans = deque(maxlen=max_spans)
+        self.histograms = dict([(stage, LatencyHistogram()) for stage in LaunchTracer.STAGES])
+        self._lock = threading.Lock()
+
+    def __bound(self, items):
+        while len(items) > self.max_tasks:
+            items.popitem(last=False)
+
+    def offer_received(self, offer_id, timestamp=None):
+        '''
+        Record reception of an offer
+
+        :param offer_id: offer identifier
+        :type offer_id: str
+        :param timestamp: reception time of OFFERS event, defaults to now
+        :type timestamp: float
+        '''
+        with self._lock:
+            self._offers[offer_id] = timestamp or time.time()
+            self.__bound(self._offers)
+
+    def offer_declined(self, offer_id):
+        with self._lock:
+            self._offers.pop(offer_id, None)
+
+    def accept_started(self, message):
+        '''
+        Record start of an ACCEPT call
+
+        :param message: ACCEPT call
+        :type message: dict
+        :return: task identifiers of launched tasks, to give to `accept_done`
+        '''
+        now = time.time()
+        received = None
+        task_ids = []
+        with self._lock:
+            for offer_id in message['accept']['offer_ids']:
+                offer_received = self._offers.pop(offer_id['value'], None)
+                if offer_received is not None and (received is None or offer_received < received):
+                    received = offer_received
+            for operation in message['accept']['operations']:
+                if operation['type'] == 'LAUNCH':
+                    tasks = operation['launch']['task_infos']
+                elif operation['type'] == 'LAUNCH_GROUP':
+                    tasks = operation['launch_group']['task_group']['tasks']
+                else:
+                    continue
+                for task in tasks:
+                    task_id = task['task_id']['value']
+                    task_ids.append(task_id)
+                    self._tasks[task_id] = {
+                        'task_id': task_id,
+                        'offer_ids': [offer_id['value'] for offer_id in message['accept']['offer_ids']],
+                        'received': received,
+                        'accept': now
+                    }
+            self.__bound(self._tasks)
+        return task_ids
+
+    def accept_done(self, task_ids, status_code=None):
+        '''
+        Record end of an ACCEPT call
+
+        :param task_ids: result of `accept_started`
+        :type task_ids: list
+        :param status_code: HTTP status of call, None if call failed
+        :type status_code: int
+        '''
+        now = time.time()
+        with self._lock:
+            for task_id in task_ids:
+                task = self._tasks.get(task_id)
+                if task is None:
+                    continue
+                task['accepted'] = now
+                task['status_code'] = status_code
+        if status_code is None or status_code >= 300:
+            for task_id in task_ids:
+                self.__end(task_id, 'ACCEPT_FAILED', now)
+
+    def update(self, update, timestamp=None):
+        '''
+        Record a task update
+
+        :param update: update info received from Mesos
+        :type update: dict
+        :param timestamp: reception time of update, defaults to now
+        :type timestamp: float
+        '''
+        status = update['status']
+        task_id = status['task_id']['value']
+        state = status['state']
+        timestamp = timestamp or time.time()
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return
+            if state not in task:
+                task[state] = timestamp
+            if 'agent_id' in status:
+                task['agent_id'] = status['agent_id']['value']
+        if state == 'TASK_RUNNING' or state in TERMINAL_STATES:
+            self.__end(task_id, state, timestamp)
+
+    def __end(self, task_id, state, timestamp):
+        with self._lock:
+            task = self._tasks.pop(task_id, None)
+        if task is None:
+            return
+        stages = {}
+        accepted = task.get('accepted')
+        if task['received'] is not None:
+            stages['callback'] = task['accept'] - task['received']
+        if accepted is not None:
+            stages['accept'] = accepted - task['accept']
+            staging = task.get('TASK_STAGING')
+            if staging is not None:
+                stages['staging'] = staging - accepted
+            if state == 'TASK_RUNNING':
+                stages['running'] = timestamp - (staging or accepted)
+                if task['received'] is not None:
+                    stages['total'] = timestamp - task['received']
+        span = {
+            'task_id': task_id,
+            'agent_id': task.get('agent_id'),
+            'offer_ids': task['offer_ids'],
+            'state': state,
+            'start': task['received'] or task['accept'],
+            'end': timestamp,
+            'stages': stages
+        }
+        with self._lock:
+            for stage, latency in stages.items():
+                self.histograms[stage].add(latency)
+            self.spans.append(span)
+        if self.exporter is not None:
+            self.exporter(span)
+
+    def summary(self):
+        '''
+        Get latency summary of each stage
+
+        :return: dict stage => dict (count, mean, max, p50, p90, p99 in seconds)
+        '''
+        with self._lock:
+            return dict([(stage, histogram.summary()) for stage, histogram in self.histograms.items()])
+
+    def report(self):
+        '''
+        Get a text report of stages latencies, slowest stages first
+
+        :return: str
+        '''
+        summary = self.summary()
+        stages = [stage for stage in LaunchTracer.STAGES if stage != 'total']
+        stages.sort(key=lambda stage: summary[stage]['mean'], reverse=True)
+        lines = ['%-10s %8s %10s %10s %10s %10s' % ('stage', 'count', 'mean (ms)', 'p50 (ms)', 'p99 (ms)', 'max (ms)')]
+        for stage in stages + ['total']:
+            stats = summary[stage]
+            lines.append('%-10s %8d %10.1f %10.1f %10.1f %10.1f' % (
+                stage, stats['count'], stats['mean'] * 1000, stats['p50'] * 1000,
+                stats['p99'] * 1000, stats['max'] * 1000))
+        return '\n'.join(lines)
+
+    def export(self, stream):
+        '''
+        Write kept spans as JSON lines
+
+        :param stream: file like object
+        :type stream: file
+        '''
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            stream.write(json.dumps(span) + '\n')
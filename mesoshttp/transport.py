@@ -0,0 +1,249 @@
+import errno
+import logging
+import os
+import socket
+import ssl
+import threading
+
+import requests
+
+from mesoshttp.exception import MesosException
+
+try:
+    import http.client as httplib
+except ImportError:
+    import httplib
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit
+
+# send errors of a kept connection closed by master
+_STALE_ERRNOS = (errno.ECONNRESET, errno.EPIPE)
+
+try:
+    _RemoteDisconnected = httplib.RemoteDisconnected
+except AttributeError:
+    # python 2 raises BadStatusLine on a connection closed without answer
+    _RemoteDisconnected = httplib.BadStatusLine
+
+
+class Transport(object):
+    '''
+    Interface of objects sending calls to master
+
+    Transport is set with `MesosClient.set_transport`, and used by
+    `mesoshttp.core.CoreMesosObject.send_call` for all calls of the
+    framework (offers, updates, driver). A `requests.Session` implements
+    this interface.
+    '''
+
+    def post(self, url, data=None, headers=None, auth=None, verify=True):
+        '''
+        Send a POST request
+
+        :param url: request url
+        :type url: str
+        :param data: request body
+        :type data: str or bytes
+        :param headers: request headers
+        :type headers: dict
+        :param auth: requests authentication (`mesoshttp.acs.DCOSServiceAuth`, `requests.auth.HTTPBasicAuth`)
+        :type auth: `requests.auth.AuthBase`
+        :param verify: verify TLS certificates, or path to a CA bundle
+        :type verify: bool or str
+        :return: response with status_code and text
+        '''
+        raise NotImplementedError()
+
+    def close(self):
+        '''
+        Close transport connections
+        '''
+        pass
+
+
+class RequestsTransport(Transport):
+    '''
+    Transport sending calls with a `requests.Session`
+    '''
+
+    def __init__(self, session=None):
+        '''
+        :param session: session to use, defaults to a new session
+        :type session: `requests.Session`
+        '''
+        self.session = session or requests.Session()
+
+    def post(self, url, data=None, headers=None, auth=None, verify=True):
+        return self.session.post(url, data, headers=headers, auth=auth, verify=verify)
+
+    def close(self):
+        self.session.close()
+
+
+class _AuthRequest(object):
+    '''
+    Request given to requests authentication, only headers can be changed
+    '''
+
+    __slots__ = ('method', 'url', 'headers', 'body')
+
+    def __init__(self, url, headers, body):
+        self.method = 'POST'
+        self.url = url
+        self.headers = headers
+        self.body = body
+
+    def register_hook(self, event, hook):
+        raise MesosException('Authentication with response hooks is not supported by HTTPTransport')
+
+
+class HTTPResponse(object):
+    '''
+    Response of a `HTTPTransport` call
+    '''
+
+    __slots__ = ('status_code', 'headers', 'content')
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+
+class HTTPTransport(Transport):
+    '''
+    Lightweight transport on persistent `http.client` connections
+
+    Each thread keeps one connection per master and TLS setting, reused
+    between calls. Compared to requests, there is no adapter, hook, cookie
+    or proxy handling and responses are minimal, which lowers per call CPU
+    time of small calls (ACKNOWLEDGE, DECLINE, KILL)::
+
+        client.set_transport(HTTPTransport())
+
+    Authentications only setting headers (`mesoshttp.acs.DCOSServiceAuth`,
+    `requests.auth.HTTPBasicAuth`) are supported, verify has the same
+    meaning as with requests. Redirections are not followed.
+    '''
+
+    def __init__(self, timeout=None):
+        '''
+        :param timeout: connection and read timeout in seconds, defaults to None (no timeout)
+        :type timeout: float
+        '''
+        self.logger = logging.getLogger(__name__)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._ssl_contexts = {}
+        self._lock = threading.Lock()
+        # all connections, to close them from any thread
+        self._connections = []
+
+    def __get_ssl_context(self, verify):
+        with self._lock:
+            context = self._ssl_contexts.get(verify)
+            if context is None:
+                if verify is False:
+                    context = ssl.create_default_context()
+                    context.check_hostname = False
+                    context.verify_mode = ssl.CERT_NONE
+                elif verify is True:
+                    context = ssl.create_default_context()
+                elif os.path.isdir(verify):
+                    context = ssl.create_default_context(capath=verify)
+                else:
+                    context = ssl.create_default_context(cafile=verify)
+                self._ssl_contexts[verify] = context
+        return context
+
+    def __get_connection(self, scheme, netloc, verify):
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = {}
+            self._local.connections = connections
+        key = (scheme, netloc, verify)
+        connection = connections.get(key)
+        if connection is None:
+            if scheme == 'https':
+                connection = httplib.HTTPSConnection(
+                    netloc, timeout=self.timeout, context=self.__get_ssl_context(verify)
+                )
+            else:
+                connection = httplib.HTTPConnection(netloc, timeout=self.timeout)
+            connections[key] = connection
+            with self._lock:
+                self._connections.append(connection)
+        return (key, connection)
+
+    def __drop_connection(self, key, connection):
+        connection.close()
+        self._local.connections.pop(key, None)
+        with self._lock:
+            if connection in self._connections:
+                self._connections.remove(connection)
+
+    def post(self, url, data=None, headers=None, auth=None, verify=True):
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        headers = dict(headers or {})
+        if data is None:
+            data = b''
+        elif not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        headers['Content-Length'] = str(len(data))
+        if auth is not None:
+            auth(_AuthRequest(url, headers, data))
+
+        while True:
+            (key, connection) = self.__get_connection(parts.scheme, parts.netloc, verify)
+            # a kept connection may have been closed by master, request is
+            # sent again on a new connection only if master could not get it
+            reused = connection.sock is not None
+            try:
+                connection.request('POST', path, data, headers)
+            except socket.error as e:
+                self.__drop_connection(key, connection)
+                if reused and e.errno in _STALE_ERRNOS:
+                    self.logger.debug('Mesos:Transport:Retry:' + str(e))
+                    continue
+                raise
+            except httplib.HTTPException:
+                self.__drop_connection(key, connection)
+                raise
+            try:
+                response = connection.getresponse()
+            except _RemoteDisconnected as e:
+                self.__drop_connection(key, connection)
+                if reused:
+                    self.logger.debug('Mesos:Transport:Retry:' + str(e))
+                    continue
+                raise
+            except (httplib.HTTPException, socket.error):
+                # timeouts included, master may have processed the call
+                self.__drop_connection(key, connection)
+                raise
+            try:
+                content = response.read()
+            except (httplib.HTTPException, socket.error):
+                self.__drop_connection(key, connection)
+                raise
+            if response.will_close:
+                self.__drop_connection(key, connection)
+            return HTTPResponse(response.status, dict(response.getheaders()), content)
+
+    def close(self):
+        with self._lock:
+            connections = self._connections
+            self._connections = []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
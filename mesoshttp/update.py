@@ -1,22 +1,53 @@
 import logging
-import json
-
-import requests
+import time
+from collections import OrderedDict
 
 from mesoshttp.core import CoreMesosObject
 from mesoshttp.exception import MesosException
 
 
+# Task states after which no other update is sent for the task
+TERMINAL_STATES = frozenset([
+    'TASK_FINISHED',
+    'TASK_FAILED',
+    'TASK_KILLED',
+    'TASK_ERROR',
+    'TASK_LOST',
+    'TASK_DROPPED',
+    'TASK_GONE',
+    'TASK_GONE_BY_OPERATOR'
+])
+
+
 class Update(CoreMesosObject):
     '''
     This class manages Update message from Mesos master
     '''
 
+    __slots__ = ('mesosUpdate',)
+
+    logger = logging.getLogger(__name__)
+
     def __init__(self, mesos_url, frameworkId, streamId, mesosUpdate, requests_auth=None, verify=True):
         CoreMesosObject.__init__(self, mesos_url, frameworkId, streamId, requests_auth, verify)
-        self.logger = logging.getLogger(__name__)
         self.mesosUpdate = mesosUpdate
 
+    @classmethod
+    def from_context(cls, context, mesosUpdate):
+        '''
+        Create an update sharing connection settings with other objects
+
+        :param context: connection settings
+        :type context: `mesoshttp.core.MesosContext`
+        :param mesosUpdate: update info received from Mesos
+        :type mesosUpdate: dict
+        :return: `Update`
+        '''
+        update = cls.__new__(cls)
+        update.context = context
+        update.mesosUpdate = mesosUpdate
+        return update
+
     def ack(self):
         '''
         Acknowledge an update message
@@ -28,12 +59,6 @@ class Update(CoreMesosObject):
             self.mesosUpdate['status']['task_id']['value'],
             self.mesosUpdate['status']['state'])
         )
-        headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'Mesos-Stream-Id': self.streamId
-        }
-
         acknowledge = {
             "framework_id": {"value": self.frameworkId},
             "type": "ACKNOWLEDGE",
@@ -46,12 +71,58 @@ class Update(CoreMesosObject):
             }
         }
         try:
-            requests.post(
-                self.mesos_url + '/api/v1/scheduler',
-                json.dumps(acknowledge),
-                headers=headers,
-                auth=self.requests_auth,
-                verify=self.verify
-            )
+            self.send_call(acknowledge)
         except Exception as e:
             raise MesosException(e)
+
+
+class UpdateCoalescer(object):
+    '''
+    Keep only the latest update of each task within a time window
+
+    Updates in a terminal state are never delayed and replace pending
+    updates of the task.
+    '''
+
+    def __init__(self, window):
+        '''
+        :param window: time in seconds updates are kept before delivery
+        :type window: float
+        '''
+        self.window = window
+        self._pending = OrderedDict()
+        self._deadline = None
+
+    def add(self, update):
+        '''
+        Add an update
+
+        :param update: update info received from Mesos
+        :type update: dict
+        :return: list of updates to deliver now
+        '''
+        task_id = update['status']['task_id']['value']
+        self._pending.pop(task_id, None)
+        if update['status']['state'] in TERMINAL_STATES:
+            return [update]
+        self._pending[task_id] = update
+        if self._deadline is None:
+            self._deadline = time.time() + self.window
+        return []
+
+    def flush(self, force=False):
+        '''
+        Get pending updates if window is over
+
+        :param force: get pending updates even if window is not over
+        :type force: bool
+        :return: list of updates to deliver now
+        '''
+        if not self._pending:
+            return []
+        if not force and time.time() < self._deadline:
+            return []
+        updates = list(self._pending.values())
+        self._pending = OrderedDict()
+        self._deadline = None
+        return updates
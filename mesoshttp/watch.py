@@ -0,0 +1,228 @@
+import logging
+import threading
+
+from mesoshttp.exception import MesosException
+from mesoshttp.update import TERMINAL_STATES
+
+
+class TaskFuture(object):
+    '''
+    Pending result of a task, resolved by a task update
+    '''
+
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self._event = threading.Event()
+        self._update = None
+        self._exception = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def done(self):
+        '''
+        Check if future is resolved
+
+        :return: bool
+        '''
+        return self._event.is_set()
+
+    def result(self, timeout=None):
+        '''
+        Wait for the update resolving the future
+
+        :param timeout: maximum time to wait in seconds, defaults to None (no timeout)
+        :type timeout: float
+        :return: update info received from Mesos
+        '''
+        if not self._event.wait(timeout):
+            raise MesosException('Timeout waiting for task %s' % (self.task_id))
+        if self._exception is not None:
+            raise self._exception
+        return self._update
+
+    def exception(self, timeout=None):
+        '''
+        Wait for future resolution and get its error
+
+        :param timeout: maximum time to wait in seconds, defaults to None (no timeout)
+        :type timeout: float
+        :return: exception or None if future succeeded
+        '''
+        if not self._event.wait(timeout):
+            raise MesosException('Timeout waiting for task %s' % (self.task_id))
+        return self._exception
+
+    def add_done_callback(self, callback):
+        '''
+        Call function with the future when it is resolved
+
+        :param callback: function(future)
+        :type callback: def
+        '''
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def set_result(self, update):
+        self.__resolve(update, None)
+
+    def set_exception(self, exception):
+        self.__resolve(None, exception)
+
+    def __resolve(self, update, exception):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._update = update
+            self._exception = exception
+            self._event.set()
+            callbacks = self._callbacks
+            self._callbacks = []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                logging.getLogger(__name__).exception('Error in future callback: %s' % (str(e)))
+
+
+class UpdateDispatcher(object):
+    '''
+    Dispatch updates to callbacks registered per task, agent or state
+
+    Callbacks are found with dict lookups, so only interested callbacks
+    are called for each update.
+    '''
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._by_task = {}
+        self._by_agent = {}
+        self._by_state = {}
+        # task_id => list of (states, future)
+        self._waiters = {}
+        self._lock = threading.Lock()
+
+    def __add(self, index, key, callback):
+        with self._lock:
+            index.setdefault(key, []).append(callback)
+        return True
+
+    def __remove(self, index, key, callback):
+        with self._lock:
+            callbacks = index.get(key)
+            if not callbacks or callback not in callbacks:
+                return False
+            callbacks.remove(callback)
+            if not callbacks:
+                del index[key]
+        return True
+
+    def watch_task(self, task_id, callback):
+        '''
+        Call function on each update of a task
+
+        :param task_id: task identifier
+        :type task_id: str
+        :param callback: function(update)
+        :type callback: def
+        '''
+        return self.__add(self._by_task, task_id, callback)
+
+    def unwatch_task(self, task_id, callback):
+        return self.__remove(self._by_task, task_id, callback)
+
+    def watch_agent(self, agent_id, callback):
+        '''
+        Call function on each update of tasks running on an agent
+
+        :param agent_id: agent identifier
+        :type agent_id: str
+        :param callback: function(update)
+        :type callback: def
+        '''
+        return self.__add(self._by_agent, agent_id, callback)
+
+    def unwatch_agent(self, agent_id, callback):
+        return self.__remove(self._by_agent, agent_id, callback)
+
+    def watch_state(self, state, callback):
+        '''
+        Call function on each update with a task state
+
+        :param state: task state (TASK_RUNNING, ...)
+        :type state: str
+        :param callback: function(update)
+        :type callback: def
+        '''
+        return self.__add(self._by_state, state, callback)
+
+    def unwatch_state(self, state, callback):
+        return self.__remove(self._by_state, state, callback)
+
+    def wait_for(self, task_id, states=('TASK_RUNNING',), fail_on_terminal=True):
+        '''
+        Get a future resolved when task reaches one of the states
+
+        :param task_id: task identifier
+        :type task_id: str
+        :param states: expected task states
+        :type states: list
+        :param fail_on_terminal: fail future if task reaches another terminal state
+        :type fail_on_terminal: bool
+        :return: `TaskFuture`
+        '''
+        future = TaskFuture(task_id)
+        with self._lock:
+            self._waiters.setdefault(task_id, []).append(
+                (frozenset(states), fail_on_terminal, future)
+            )
+        return future
+
+    def dispatch(self, update):
+        '''
+        Call callbacks and resolve futures interested in update
+
+        :param update: update info received from Mesos
+        :type update: dict
+        :return: False if a callback failed
+        '''
+        status = update['status']
+        task_id = status['task_id']['value']
+        state = status['state']
+        agent_id = None
+        if 'agent_id' in status:
+            agent_id = status['agent_id']['value']
+        with self._lock:
+            callbacks = self._by_task.get(task_id, []) + self._by_state.get(state, [])
+            if agent_id is not None:
+                callbacks += self._by_agent.get(agent_id, [])
+            waiters = self._waiters.get(task_id)
+            resolved = []
+            if waiters:
+                pending = []
+                for waiter in waiters:
+                    if state in waiter[0] or (waiter[1] and state in TERMINAL_STATES):
+                        resolved.append(waiter)
+                    else:
+                        pending.append(waiter)
+                if pending:
+                    self._waiters[task_id] = pending
+                else:
+                    del self._waiters[task_id]
+
+        for (states, fail_on_terminal, future) in resolved:
+            if state in states:
+                future.set_result(update)
+            else:
+                future.set_exception(MesosException('Task %s is %s' % (task_id, state)))
+
+        is_ok = True
+        for callback in callbacks:
+            try:
+                callback(update)
+            except Exception as e:
+                is_ok = False
+                self.logger.exception('Error in %s update callback: %s' % (task_id, str(e)))
+        return is_ok
@@ -0,0 +1,312 @@
+import logging
+import multiprocessing
+import traceback
+import zlib
+
+from mesoshttp.exception import MesosException
+
+
+class Decisions(object):
+    '''
+    Decisions taken by a worker process, executed by the client process
+
+    Instance is given to worker handlers, handlers record what should be
+    done with offers and tasks.
+    '''
+
+    ACCEPT = 'ACCEPT'
+    DECLINE = 'DECLINE'
+    KILL = 'KILL'
+
+    def __init__(self):
+        self.items = []
+
+    def accept(self, offer_id, operations, options=None):
+        '''
+        Accept an offer
+
+        :param offer_id: offer identifier
+        :type offer_id: str
+        :param operations: JSON TaskInfo instances or `mesoshttp.operations.OperationBuilder`
+        :type operations: list
+        :param options: Optional offer additional params (filters, ...)
+        :type options: dict
+        '''
+        self.items.append((Decisions.ACCEPT, offer_id, operations, options))
+
+    def decline(self, offer_id, options=None):
+        '''
+        Decline an offer
+
+        :param offer_id: offer identifier
+        :type offer_id: str
+        :param options: Optional offer additional params (filters, ...)
+        :type options: dict
+        '''
+        self.items.append((Decisions.DECLINE, offer_id, options))
+
+    def kill(self, agent_id, task_id):
+        '''
+        Kill a task
+
+        :param agent_id: slave agent_id
+        :type agent_id: str
+        :param task_id: task identifier
+        :type task_id: str
+        '''
+        self.items.append((Decisions.KILL, agent_id, task_id))
+
+
+def _worker_loop(conn, offer_handler, update_handler):
+    '''
+    Worker process main loop, get batches from client process and send back decisions
+    '''
+    while True:
+        try:
+            batch = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if batch is None:
+            break
+        (kind, payload) = batch
+        decisions = Decisions()
+        error = None
+        try:
+            if kind == WorkerPool.OFFERS:
+                if offer_handler is not None:
+                    offer_handler(payload, decisions)
+            elif update_handler is not None:
+                for update in payload:
+                    update_handler(update, decisions)
+        except Exception:
+            error = traceback.format_exc()
+        conn.send((decisions.items, error))
+    conn.close()
+
+
+class WorkerPool(object):
+    '''
+    Fan out offers and updates handling to worker processes
+
+    The client process keeps the connection with master and sends raw
+    offers/updates to workers through pipes. Worker handlers record
+    decisions (accept, decline, kill) which are executed by the client
+    process with its own connection settings. Usage::
+
+        def place(offers, decisions):
+            for offer in offers:
+                decisions.decline(offer['id']['value'])
+
+        pool = WorkerPool(offer_handler=place, processes=4)
+        pool.attach(client)
+        client.register()
+
+    Handlers are executed in worker processes, so they must be module level
+    functions and cannot share state with the client process.
+
+    Offers of an OFFERS event are split among workers, client waits for
+    all workers decisions before handling next event. Updates are sent to a
+    worker selected from task identifier, so updates of a task are always
+    handled by the same worker, and their decisions are executed on next
+    events.
+
+    A worker process exiting is restarted, offers sent to it and not
+    decided yet are declined and its pending updates are lost.
+    '''
+
+    OFFERS = 'OFFERS'
+    UPDATE = 'UPDATE'
+
+    def __init__(self, offer_handler=None, update_handler=None, processes=None, decline_undecided=True):
+        '''
+        :param offer_handler: function(offers, decisions) called with a list of JSON offers
+        :type offer_handler: def
+        :param update_handler: function(update, decisions) called with a JSON update
+        :type update_handler: def
+        :param processes: number of worker processes, defaults to number of cpus
+        :type processes: int
+        :param decline_undecided: decline offers not accepted nor declined by workers
+        :type decline_undecided: bool
+        '''
+        self.logger = logging.getLogger(__name__)
+        self.offer_handler = offer_handler
+        self.update_handler = update_handler
+        self.processes = processes or multiprocessing.cpu_count()
+        self.decline_undecided = decline_undecided
+        self.client = None
+        self._workers = []
+        # Number of batches sent to each worker and not answered yet
+        self._pending = []
+        # Identifiers of offers of current event sent to each worker
+        self._sent = []
+        self._offers = {}
+
+    def __start_worker(self):
+        (parent_conn, child_conn) = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_worker_loop,
+            args=(child_conn, self.offer_handler, self.update_handler)
+        )
+        process.daemon = True
+        process.start()
+        child_conn.close()
+        return (process, parent_conn)
+
+    def start(self):
+        '''
+        Start worker processes
+        '''
+        if self._workers:
+            return
+        for _ in range(self.processes):
+            self._workers.append(self.__start_worker())
+            self._pending.append(0)
+            self._sent.append(set())
+
+    def __restart(self, index):
+        '''
+        Replace an exited worker process, declining undecided offers sent to it
+        '''
+        (process, conn) = self._workers[index]
+        self.logger.error('Mesos:Worker:%d:Exited:%d pending batches' % (process.pid, self._pending[index]))
+        conn.close()
+        process.join(1)
+        for offer_id in self._sent[index]:
+            offer = self._offers.pop(offer_id, None)
+            if offer is None:
+                continue
+            try:
+                offer.decline()
+            except MesosException as e:
+                self.logger.error('Mesos:Worker:Decline:Error:%s' % (str(e)))
+        self._sent[index] = set()
+        self._pending[index] = 0
+        self._workers[index] = self.__start_worker()
+
+    def stop(self):
+        '''
+        Stop worker processes, waiting for pending decisions
+        '''
+        self.collect(wait=True)
+        for (process, conn) in self._workers:
+            try:
+                conn.send(None)
+                conn.close()
+            except (IOError, OSError):
+                pass
+            process.join()
+        self._workers = []
+        self._pending = []
+        self._sent = []
+
+    def attach(self, client):
+        '''
+        Start workers and register pool callbacks on client
+
+        :param client: client receiving events from master
+        :type client: `mesoshttp.client.MesosClient`
+        '''
+        self.client = client
+        self.start()
+        if self.offer_handler is not None:
+            client.on(client.OFFERS, self.handle_offers)
+        if self.update_handler is not None:
+            client.on(client.UPDATE, self.handle_update)
+        client.on(client.HEARTBEAT, self.handle_heartbeat)
+
+    def handle_offers(self, offers):
+        '''
+        OFFERS callback, split offers among workers and execute decisions
+        '''
+        self.collect()
+        offers = list(offers)
+        if not offers:
+            return
+        for offer in offers:
+            self._offers[offer.get_offer()['id']['value']] = offer
+        batches = [[] for _ in self._workers]
+        for index, offer in enumerate(offers):
+            batches[index % len(batches)].append(offer.get_offer())
+        sent = []
+        for index, batch in enumerate(batches):
+            if batch:
+                self._sent[index] = set([offer['id']['value'] for offer in batch])
+                try:
+                    self._workers[index][1].send((WorkerPool.OFFERS, batch))
+                except (IOError, OSError):
+                    self.__restart(index)
+                    continue
+                self._pending[index] += 1
+                sent.append(index)
+        for index in sent:
+            while self._pending[index]:
+                self.__receive(index)
+        if self.decline_undecided:
+            for offer in list(self._offers.values()):
+                offer.decline()
+        self._offers = {}
+        self._sent = [set() for _ in self._workers]
+
+    def handle_update(self, update):
+        '''
+        UPDATE callback, send update to worker handling the task
+        '''
+        self.collect()
+        task_id = update['status']['task_id']['value']
+        index = (zlib.crc32(task_id.encode('utf-8')) & 0xffffffff) % len(self._workers)
+        try:
+            self._workers[index][1].send((WorkerPool.UPDATE, [update]))
+        except (IOError, OSError):
+            self.__restart(index)
+            try:
+                self._workers[index][1].send((WorkerPool.UPDATE, [update]))
+            except (IOError, OSError) as e:
+                self.logger.error('Mesos:Worker:Update:Lost:%s:%s' % (task_id, str(e)))
+                return
+        self._pending[index] += 1
+
+    def handle_heartbeat(self, heartbeat):
+        '''
+        HEARTBEAT callback, execute available decisions
+        '''
+        self.collect()
+
+    def collect(self, wait=False):
+        '''
+        Execute decisions sent back by workers
+
+        :param wait: wait for all pending batches
+        :type wait: bool
+        '''
+        for index, (process, conn) in enumerate(self._workers):
+            while self._pending[index] and (wait or conn.poll()):
+                self.__receive(index)
+
+    def __receive(self, index):
+        (process, conn) = self._workers[index]
+        try:
+            (decisions, error) = conn.recv()
+        except (EOFError, IOError, OSError):
+            self.__restart(index)
+            return
+        self._pending[index] -= 1
+        if error:
+            self.logger.error('Mesos:Worker:%d:Error:%s' % (process.pid, error))
+        for decision in decisions:
+            try:
+                self.__execute(decision)
+            except Exception as e:
+                self.logger.exception('Mesos:Worker:Decision:Error:%s' % (str(e)))
+
+    def __execute(self, decision):
+        if decision[0] == Decisions.KILL:
+            self.client.get_driver().kill(decision[1], decision[2])
+            return
+        offer = self._offers.pop(decision[1], None)
+        if offer is None:
+            self.logger.warn('Mesos:Worker:Unknown offer %s' % (decision[1]))
+            return
+        if decision[0] == Decisions.ACCEPT:
+            offer.accept(decision[2], decision[3])
+        elif decision[0] == Decisions.DECLINE:
+            offer.decline(decision[2])
@@ -47,12 +47,14 @@ config = {
         'Programming Language :: Python :: 3.4'
     ],
     'install_requires': [
-                         'cryptography',
-                         'kazoo',
-                         'pyjwt',
                          'requests'
 
                          ],
+    'extras_require': {
+        'dcos': ['cryptography', 'pyjwt'],
+        'protobuf': ['protobuf'],
+        'zookeeper': ['kazoo']
+    },
     'tests_require': ['nose', 'mock', 'flake8'],
     'test_suite': 'nose.collector',
     'packages': find_packages(),
@@ -0,0 +1,32 @@
+'''
+Micro-benchmarks of benchmark/bench_micro.py run with pytest-benchmark
+
+Skipped if pytest-benchmark is not installed. Results can be saved and
+compared between runs with pytest-benchmark options::
+
+    python -m pytest tests/test_benchmarks.py --benchmark-autosave
+    # change code
+    python -m pytest tests/test_benchmarks.py --benchmark-compare --benchmark-compare-fail=min:10%
+
+Other tests can be run without benchmarks with --benchmark-skip.
+'''
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmark'))
+
+import bench_micro  # noqa: E402
+
+
+(BENCHMARKS, reset_calls) = bench_micro.get_benchmarks()
+
+
+@pytest.mark.parametrize('function', [function for (name, function, operations) in BENCHMARKS],
+                         ids=[name for (name, function, operations) in BENCHMARKS])
+def test_micro(benchmark, function):
+    benchmark(function)
+    reset_calls()
@@ -0,0 +1,105 @@
+import json
+import threading
+import unittest
+
+from mesoshttp import bulk
+from mesoshttp.client import MesosClient
+from mesoshttp.core import MesosContext
+from mesoshttp.offers import Offer
+
+from tests.test_tasks import _RecordingTransport, _Response, make_offer, make_task
+
+
+class _FailingTransport(_RecordingTransport):
+    '''
+    Transport failing calls about some tasks, with an error or an HTTP status
+    '''
+
+    def __init__(self, failures):
+        _RecordingTransport.__init__(self)
+        self.failures = failures
+        self.lock = threading.Lock()
+
+    def post(self, url, data=None, headers=None, auth=None, verify=True):
+        with self.lock:
+            self.calls.append(data)
+        for task_id, failure in self.failures.items():
+            if '"%s"' % (task_id) in data:
+                if failure is None:
+                    raise IOError('connection refused')
+                return _Response(failure)
+        return _Response(202)
+
+
+class TestBulk(unittest.TestCase):
+
+    def make_driver(self, failures=None):
+        self.transport = _FailingTransport(failures or {})
+        return MesosClient.SchedulerDriver('http://master', 'F1', 'S1', session=self.transport)
+
+    def sent(self):
+        return [json.loads(data) for data in self.transport.calls]
+
+    def test_kill_many(self):
+        driver = self.make_driver()
+        progress = []
+        result = bulk.kill_many(driver, [('A1', 'T%d' % (index)) for index in range(20)], concurrency=4,
+                                progress=lambda done, total, errors: progress.append((done, total, errors)))
+        self.assertTrue(result.ok())
+        self.assertEqual(len(result), 20)
+        self.assertEqual(sorted(result.succeeded()), sorted(['T%d' % (index) for index in range(20)]))
+        self.assertEqual(sorted(progress), [(done, 20, 0) for done in range(1, 21)])
+        self.assertEqual(set([call['type'] for call in self.sent()]), set(['KILL']))
+
+    def test_calls_order(self):
+        driver = self.make_driver()
+        bulk.kill_many(driver, [('A1', 'T%d' % (index)) for index in range(5)], concurrency=1)
+        self.assertEqual([call['kill']['task_id']['value'] for call in self.sent()],
+                         ['T%d' % (index) for index in range(5)])
+
+    def test_partial_failure(self):
+        driver = self.make_driver({'T1': None, 'T3': 400})
+        result = bulk.kill_many(driver, [('A1', 'T%d' % (index)) for index in range(5)], concurrency=2)
+        # all calls are sent, failures do not stop other calls
+        self.assertEqual(len(self.transport.calls), 5)
+        self.assertFalse(result.ok())
+        self.assertEqual(result.done, 5)
+        self.assertEqual(sorted(result.failed()), ['T1', 'T3'])
+        self.assertEqual(sorted(result.succeeded()), ['T0', 'T2', 'T4'])
+        self.assertIn('connection refused', result.errors['T1'])
+        self.assertEqual(result.errors['T3'], 'Mesos:Kill:Error:400:')
+        self.assertEqual(result.results['T3'], 400)
+        self.assertNotIn('T1', result.results)
+
+    def test_message_many(self):
+        driver = self.make_driver()
+        result = bulk.message_many(driver, [('A1', 'E1', 'aGVsbG8='), ('A2', 'E2', 'aGVsbG8=')])
+        self.assertTrue(result.ok())
+        self.assertEqual(sorted(result.succeeded()), [0, 1])
+
+    def test_accept_many(self):
+        self.make_driver({'T2': None})
+        context = MesosContext('http://master', 'F1', 'S1', session=self.transport)
+        other = make_offer(context, 5).get_offer()
+        other['id'] = {'value': 'O6'}
+        launches = [
+            (make_offer(context, 5), [make_task(0)]),
+            (make_offer(context, 2), [make_task(2)]),
+            (Offer.from_context(context, other), [make_task(1)])
+        ]
+        result = bulk.accept_many(launches, concurrency=1)
+        # one ACCEPT per agent, in order of first offer of agent
+        calls = self.sent()
+        self.assertEqual([call['type'] for call in calls], ['ACCEPT', 'ACCEPT'])
+        self.assertEqual([offer_id['value'] for offer_id in calls[0]['accept']['offer_ids']], ['O5', 'O6'])
+        task_infos = calls[0]['accept']['operations'][0]['launch']['task_infos']
+        self.assertEqual([task_info['task_id']['value'] for task_info in task_infos], ['T0', 'T1'])
+        self.assertEqual([task_info['agent_id']['value'] for task_info in task_infos], ['A5', 'A5'])
+        self.assertEqual(result.succeeded(), ['A5'])
+        self.assertEqual(result.failed(), ['A2'])
+
+    def test_no_call(self):
+        driver = self.make_driver()
+        self.assertTrue(bulk.kill_many(driver, []).ok())
+        self.assertTrue(bulk.accept_many([]).ok())
+        self.assertEqual(self.transport.calls, [])
@@ -0,0 +1,86 @@
+import unittest
+
+from mesoshttp.cache import FitCache, resources_signature
+from mesoshttp.core import MesosContext
+from mesoshttp.resources import Resources
+from mesoshttp.tasks import TaskQueue
+from mesoshttp.watch import UpdateDispatcher
+
+from tests.test_tasks import _RecordingTransport, make_offer, make_task
+
+
+def make_signature(cpus, mem=1024):
+    return resources_signature(Resources.parse([
+        {'name': 'cpus', 'type': 'SCALAR', 'scalar': {'value': cpus}},
+        {'name': 'mem', 'type': 'SCALAR', 'scalar': {'value': mem}}
+    ]))
+
+
+class TestFitCache(unittest.TestCase):
+
+    def test_signature(self):
+        self.assertEqual(make_signature(2), make_signature(2.0))
+        self.assertNotEqual(make_signature(2), make_signature(3))
+
+    def test_put_needs_agent(self):
+        cache = FitCache()
+        cache.put('A1', 'shape', True)
+        self.assertIsNone(cache.get('A1', 'shape'))
+        cache.set_agent('A1', make_signature(2))
+        cache.put('A1', 'shape', True)
+        self.assertTrue(cache.get('A1', 'shape'))
+        self.assertEqual(cache.stats(), {'size': 1, 'hits': 1, 'misses': 1})
+
+    def test_same_signature_keeps_results(self):
+        cache = FitCache()
+        cache.set_agent('A1', make_signature(2))
+        cache.put('A1', 'shape', False)
+        cache.set_agent('A1', make_signature(2))
+        self.assertIs(cache.get('A1', 'shape'), False)
+
+    def test_new_signature_drops_results(self):
+        cache = FitCache()
+        cache.set_agent('A1', make_signature(2))
+        cache.set_agent('A2', make_signature(2))
+        cache.put('A1', 'shape', False)
+        cache.put('A2', 'shape', False)
+        cache.set_agent('A1', make_signature(4))
+        self.assertIsNone(cache.get('A1', 'shape'))
+        self.assertIs(cache.get('A2', 'shape'), False)
+
+    def test_invalidate(self):
+        cache = FitCache()
+        cache.set_agent('A1', make_signature(2))
+        cache.put('A1', 'shape', True)
+        cache.invalidate('A1')
+        self.assertIsNone(cache.get('A1', 'shape'))
+        # agent must be set again before caching
+        cache.put('A1', 'shape', True)
+        self.assertEqual(len(cache), 0)
+
+    def test_lru(self):
+        cache = FitCache(maxsize=2)
+        cache.set_agent('A1', make_signature(2))
+        cache.put('A1', 'a', True)
+        cache.put('A1', 'b', True)
+        cache.get('A1', 'a')
+        cache.put('A1', 'c', True)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('A1', 'b'))
+        self.assertTrue(cache.get('A1', 'a'))
+        self.assertTrue(cache.get('A1', 'c'))
+
+    def test_task_queue(self):
+        context = MesosContext('http://master', 'F1', 'S1', session=_RecordingTransport())
+        cache = FitCache()
+        task_queue = TaskQueue(UpdateDispatcher(), fit_cache=cache)
+        task_queue.submit(make_task(1, cpus=8))
+        self.assertEqual(len(task_queue.launch([make_offer(context, 1, cpus=4)])), 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+        # same agent, same resources: result comes from cache
+        self.assertEqual(len(task_queue.launch([make_offer(context, 1, cpus=4)])), 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+        # agent resources changed, result is computed again
+        self.assertEqual(task_queue.launch([make_offer(context, 1, cpus=8)]), [])
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(len(task_queue), 0)
@@ -0,0 +1,76 @@
+import json
+import unittest
+
+from mesoshttp.client import MesosClient
+from mesoshttp.constraints import OfferConstraints
+from mesoshttp.exception import MesosException
+
+from tests.test_tasks import _RecordingTransport, _Response
+
+
+class _RefusingTransport(_RecordingTransport):
+
+    def post(self, url, data=None, headers=None, auth=None, verify=True):
+        _RecordingTransport.post(self, url, data, headers, auth, verify)
+        return _Response(400)
+
+
+class TestUpdateFramework(unittest.TestCase):
+
+    def make_client(self, transport):
+        client = MesosClient(mesos_urls=[], frameworkName='framework')
+        client.set_transport(transport)
+        client.frameworkRole = 'web'
+        client.failover_timeout = 60
+        client.frameworkId = 'F1'
+        client.open_stream('http://master', 'S1')
+        return client
+
+    def settings(self, client):
+        return (client.frameworkRole, client.capabilities, client.failover_timeout, client.offer_constraints)
+
+    def test_update(self):
+        transport = _RecordingTransport()
+        client = self.make_client(transport)
+        offer_constraints = OfferConstraints()
+        offer_constraints.add('batch', [['rack', 'EQUALS', 'r1']])
+        self.assertTrue(client.update_framework(role='batch', capabilities=['MULTI_ROLE'],
+                                                offer_constraints=offer_constraints))
+        call = json.loads(transport.calls[0])
+        self.assertEqual(call['type'], 'UPDATE_FRAMEWORK')
+        framework_info = call['update_framework']['framework_info']
+        self.assertEqual(framework_info['role'], 'batch')
+        self.assertEqual(framework_info['capabilities'], [{'type': 'MULTI_ROLE'}])
+        self.assertEqual(framework_info['failover_timeout'], 60)
+        self.assertEqual(framework_info['id'], {'value': 'F1'})
+        self.assertEqual(call['update_framework']['offer_constraints'], offer_constraints.to_json())
+        self.assertEqual(client.frameworkRole, 'batch')
+
+    def test_rollback_on_error(self):
+        transport = _RecordingTransport(fail=True)
+        client = self.make_client(transport)
+        previous = self.settings(client)
+        with self.assertRaises(MesosException):
+            client.update_framework(role='batch', capabilities=['MULTI_ROLE'], failover_timeout=10,
+                                    offer_constraints=OfferConstraints())
+        self.assertEqual(self.settings(client), previous)
+        # next SUBSCRIBE uses previous settings
+        self.assertEqual(client.get_framework_info()['role'], 'web')
+
+    def test_rollback_on_refused_update(self):
+        transport = _RefusingTransport()
+        client = self.make_client(transport)
+        previous = self.settings(client)
+        with self.assertRaises(MesosException):
+            client.update_framework(role='batch')
+        self.assertEqual(len(transport.calls), 1)
+        self.assertEqual(self.settings(client), previous)
+
+    def test_not_subscribed(self):
+        transport = _RecordingTransport()
+        client = MesosClient(mesos_urls=[])
+        client.set_transport(transport)
+        self.assertFalse(client.update_framework(role='batch'))
+        self.assertEqual(transport.calls, [])
+        # applied on next SUBSCRIBE
+        self.assertEqual(client.get_subscribe_call()['subscribe']['framework_info']['role'], 'batch')
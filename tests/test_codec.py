@@ -0,0 +1,221 @@
+import json
+import unittest
+
+try:
+    from google.protobuf import descriptor_pb2, descriptor_pool, message_factory, text_format
+except ImportError:
+    descriptor_pb2 = None
+
+from mesoshttp.codec import JsonCodec, ProtobufCodec
+from mesoshttp.core import MesosContext
+from mesoshttp.offers import Offer
+
+from tests.test_tasks import _RecordingTransport
+
+
+# Subset of mesos/v1/mesos.proto and mesos/v1/scheduler/scheduler.proto,
+# with the same field numbers and types
+SCHEDULER_PROTO = '''
+name: "mesoshttp_test/scheduler.proto"
+package: "mesoshttp_test"
+syntax: "proto2"
+message_type {
+  name: "Value"
+  field { name: "type" number: 1 label: LABEL_REQUIRED type: TYPE_ENUM type_name: ".mesoshttp_test.Value.Type" }
+  field { name: "scalar" number: 2 label: LABEL_OPTIONAL type: TYPE_MESSAGE type_name: ".mesoshttp_test.Value.Scalar" }
+  field { name: "ranges" number: 3 label: LABEL_OPTIONAL type: TYPE_MESSAGE type_name: ".mesoshttp_test.Value.Ranges" }
+  nested_type {
+    name: "Scalar"
+    field { name: "value" number: 1 label: LABEL_REQUIRED type: TYPE_DOUBLE }
+  }
+  nested_type {
+    name: "Range"
+    field { name: "begin" number: 1 label: LABEL_REQUIRED type: TYPE_UINT64 }
+    field { name: "end" number: 2 label: LABEL_REQUIRED type: TYPE_UINT64 }
+  }
+  nested_type {
+    name: "Ranges"
+    field { name: "range" number: 1 label: LABEL_REPEATED type: TYPE_MESSAGE type_name: ".mesoshttp_test.Value.Range" }
+  }
+  enum_type {
+    name: "Type"
+    value { name: "SCALAR" number: 0 }
+    value { name: "RANGES" number: 1 }
+    value { name: "SET" number: 2 }
+    value { name: "TEXT" number: 3 }
+  }
+}
+message_type {
+  name: "ID"
+  field { name: "value" number: 1 label: LABEL_REQUIRED type: TYPE_STRING }
+}
+message_type {
+  name: "Resource"
+  field { name: "name" number: 1 label: LABEL_REQUIRED type: TYPE_STRING }
+  field { name: "type" number: 2 label: LABEL_REQUIRED type: TYPE_ENUM type_name: ".mesoshttp_test.Value.Type" }
+  field { name: "scalar" number: 3 label: LABEL_OPTIONAL type: TYPE_MESSAGE type_name: ".mesoshttp_test.Value.Scalar" }
+  field { name: "ranges" number: 4 label: LABEL_OPTIONAL type: TYPE_MESSAGE type_name: ".mesoshttp_test.Value.Ranges" }
+}
+message_type {
+  name: "Offer"
+  field { name: "id" number: 1 label: LABEL_REQUIRED type: TYPE_MESSAGE type_name: ".mesoshttp_test.ID" }
+  field { name: "framework_id" number: 2 label: LABEL_REQUIRED type: TYPE_MESSAGE type_name: ".mesoshttp_test.ID" }
+  field { name: "agent_id" number: 3 label: LABEL_REQUIRED type: TYPE_MESSAGE type_name: ".mesoshttp_test.ID" }
+  field { name: "hostname" number: 4 label: LABEL_REQUIRED type: TYPE_STRING }
+  field { name: "resources" number: 5 label: LABEL_REPEATED type: TYPE_MESSAGE type_name: ".mesoshttp_test.Resource" }
+  nested_type {
+    name: "Operation"
+    field { name: "type" number: 1 label: LABEL_OPTIONAL type: TYPE_ENUM type_name: ".mesoshttp_test.Offer.Operation.Type" }
+    field { name: "launch" number: 2 label: LABEL_OPTIONAL type: TYPE_MESSAGE type_name: ".mesoshttp_test.Offer.Operation.Launch" }
+    nested_type {
+      name: "Launch"
+      field { name: "task_infos" number: 1 label: LABEL_REPEATED type: TYPE_MESSAGE type_name: ".mesoshttp_test.TaskInfo" }
+    }
+    enum_type {
+      name: "Type"
+      value { name: "UNKNOWN" number: 0 }
+      value { name: "LAUNCH" number: 1 }
+    }
+  }
+}
+message_type {
+  name: "TaskInfo"
+  field { name: "name" number: 1 label: LABEL_REQUIRED type: TYPE_STRING }
+  field { name: "task_id" number: 2 label: LABEL_REQUIRED type: TYPE_MESSAGE type_name: ".mesoshttp_test.ID" }
+  field { name: "agent_id" number: 3 label: LABEL_REQUIRED type: TYPE_MESSAGE type_name: ".mesoshttp_test.ID" }
+  field { name: "resources" number: 4 label: LABEL_REPEATED type: TYPE_MESSAGE type_name: ".mesoshttp_test.Resource" }
+}
+message_type {
+  name: "Filters"
+  field { name: "refuse_seconds" number: 1 label: LABEL_OPTIONAL type: TYPE_DOUBLE }
+}
+message_type {
+  name: "Event"
+  field { name: "type" number: 1 label: LABEL_OPTIONAL type: TYPE_ENUM type_name: ".mesoshttp_test.Event.Type" }
+  field { name: "offers" number: 3 label: LABEL_OPTIONAL type: TYPE_MESSAGE type_name: ".mesoshttp_test.Event.Offers" }
+  field { name: "heartbeat_interval_ns" number: 4 label: LABEL_REPEATED type: TYPE_INT64 }
+  nested_type {
+    name: "Offers"
+    field { name: "offers" number: 1 label: LABEL_REPEATED type: TYPE_MESSAGE type_name: ".mesoshttp_test.Offer" }
+  }
+  enum_type {
+    name: "Type"
+    value { name: "UNKNOWN" number: 0 }
+    value { name: "SUBSCRIBED" number: 1 }
+    value { name: "OFFERS" number: 2 }
+    value { name: "HEARTBEAT" number: 8 }
+    value { name: "UPDATE_OPERATION_STATUS" number: 14 }
+  }
+}
+message_type {
+  name: "Call"
+  field { name: "framework_id" number: 1 label: LABEL_OPTIONAL type: TYPE_MESSAGE type_name: ".mesoshttp_test.ID" }
+  field { name: "type" number: 2 label: LABEL_OPTIONAL type: TYPE_ENUM type_name: ".mesoshttp_test.Call.Type" }
+  field { name: "accept" number: 4 label: LABEL_OPTIONAL type: TYPE_MESSAGE type_name: ".mesoshttp_test.Call.Accept" }
+  nested_type {
+    name: "Accept"
+    field { name: "offer_ids" number: 1 label: LABEL_REPEATED type: TYPE_MESSAGE type_name: ".mesoshttp_test.ID" }
+    field { name: "operations" number: 2 label: LABEL_REPEATED type: TYPE_MESSAGE type_name: ".mesoshttp_test.Offer.Operation" }
+    field { name: "filters" number: 3 label: LABEL_OPTIONAL type: TYPE_MESSAGE type_name: ".mesoshttp_test.Filters" }
+  }
+  enum_type {
+    name: "Type"
+    value { name: "UNKNOWN" number: 0 }
+    value { name: "ACCEPT" number: 3 }
+    value { name: "DECLINE" number: 4 }
+  }
+}
+'''
+
+
+class _SchedulerModule(object):
+    '''
+    Stands for a generated scheduler_pb2 module
+    '''
+
+    def __init__(self):
+        file_proto = text_format.Parse(SCHEDULER_PROTO, descriptor_pb2.FileDescriptorProto())
+        pool = descriptor_pool.DescriptorPool()
+        pool.Add(file_proto)
+        for name in ('Event', 'Call'):
+            descriptor = pool.FindMessageTypeByName('mesoshttp_test.' + name)
+            setattr(self, name, message_factory.GetMessageClass(descriptor))
+
+
+OFFERS_EVENT = {
+    'type': 'OFFERS',
+    'offers': {
+        'offers': [{
+            'id': {'value': 'O1'},
+            'framework_id': {'value': 'F1'},
+            'agent_id': {'value': 'A1'},
+            'hostname': 'agent1',
+            'resources': [
+                {'name': 'cpus', 'type': 'SCALAR', 'scalar': {'value': 2.5}},
+                {'name': 'ports', 'type': 'RANGES', 'ranges': {'range': [
+                    {'begin': 31000, 'end': 31010},
+                    {'begin': 18446744073709551000, 'end': 18446744073709551615}
+                ]}}
+            ]
+        }]
+    },
+    'heartbeat_interval_ns': [15000000000]
+}
+
+
+@unittest.skipIf(descriptor_pb2 is None, 'protobuf not installed')
+class TestProtobufCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.module = _SchedulerModule()
+        self.codec = ProtobufCodec(self.module)
+
+    def test_decode_matches_json(self):
+        record = self.module.Event()
+        text_format.Parse(
+            'type: OFFERS heartbeat_interval_ns: 15000000000 offers { offers { id { value: "O1" } '
+            'framework_id { value: "F1" } agent_id { value: "A1" } hostname: "agent1" '
+            'resources { name: "cpus" type: SCALAR scalar { value: 2.5 } } '
+            'resources { name: "ports" type: RANGES ranges { '
+            'range { begin: 31000 end: 31010 } '
+            'range { begin: 18446744073709551000 end: 18446744073709551615 } } } } }',
+            record
+        )
+        event = self.codec.decode(record.SerializeToString())
+        expected = JsonCodec().decode(json.dumps(OFFERS_EVENT).encode('utf-8'))
+        self.assertEqual(event, expected)
+        port_range = event['offers']['offers'][0]['resources'][1]['ranges']['range'][0]
+        self.assertIsInstance(port_range['begin'], int)
+        self.assertEqual(port_range['end'] - port_range['begin'], 10)
+
+    def test_peek_event_type(self):
+        record = self.module.Event(type=self.module.Event.OFFERS).SerializeToString()
+        self.assertEqual(self.codec.peek_event_type(record), 'OFFERS')
+        # multi bytes varint
+        record = self.module.Event(type=self.module.Event.UPDATE_OPERATION_STATUS).SerializeToString()
+        self.assertEqual(self.codec.peek_event_type(record), 'UPDATE_OPERATION_STATUS')
+        self.assertEqual(self.codec.peek_event_type(b'\x08\x80\x01'), None)
+
+    def test_peek_event_type_without_type(self):
+        self.assertEqual(self.codec.peek_event_type(b''), None)
+        self.assertEqual(self.codec.peek_event_type(b'\x1a\x00'), None)
+
+    def test_encode(self):
+        record = self.codec.encode({'type': 'DECLINE'})
+        self.assertEqual(self.module.Call.FromString(record).type, self.module.Call.DECLINE)
+
+    def test_encode_accept(self):
+        transport = _RecordingTransport()
+        context = MesosContext('http://master', 'F1', 'S1', codec=self.codec, session=transport)
+        offer = Offer.from_context(context, OFFERS_EVENT['offers']['offers'][0])
+        offer.accept([{
+            'name': 'task1',
+            'task_id': {'value': 'T1'},
+            'resources': [{'name': 'cpus', 'type': 'SCALAR', 'scalar': {'value': 1}}]
+        }], {'filters': {'refuse_seconds': 5.0}})
+        call = self.module.Call.FromString(transport.calls[0])
+        self.assertEqual(call.type, self.module.Call.ACCEPT)
+        self.assertEqual(call.accept.offer_ids[0].value, 'O1')
+        task_info = call.accept.operations[0].launch.task_infos[0]
+        self.assertEqual(task_info.task_id.value, 'T1')
+        self.assertEqual(task_info.agent_id.value, 'A1')
@@ -0,0 +1,173 @@
+import unittest
+
+from mesoshttp.constraints import ConstraintEngine, OfferConstraints, PlacementGroup
+from mesoshttp.exception import MesosException
+
+
+def make_offer(index, rack, attributes=None):
+    offer_attributes = [{'name': 'rack', 'type': 'TEXT', 'text': {'value': rack}}]
+    offer_attributes.extend(attributes or [])
+    return {
+        'id': {'value': 'O%d' % (index)},
+        'agent_id': {'value': 'A%d' % (index)},
+        'hostname': 'agent%d' % (index),
+        'attributes': offer_attributes
+    }
+
+
+class TestPlacementGroup(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = ConstraintEngine()
+
+    def test_attributes(self):
+        offer = make_offer(1, 'r1', [
+            {'name': 'cores', 'type': 'SCALAR', 'scalar': {'value': 8.0}},
+            {'name': 'ports', 'type': 'RANGES', 'ranges': {'range': [{'begin': 1, 'end': 3}]}},
+            {'name': 'disks', 'type': 'SET', 'set': {'item': ['a', 'b']}}
+        ])
+        attributes = self.engine.get_attributes(offer)
+        self.assertEqual(attributes, {
+            'hostname': 'agent1', 'rack': 'r1', 'cores': '8', 'ports': '[1-3]', 'disks': '{a,b}'
+        })
+        self.assertEqual(self.engine.get_values('rack'), set(['r1']))
+
+    def test_unknown_operator(self):
+        with self.assertRaises(MesosException):
+            PlacementGroup(self.engine, 'g', [['hostname', 'SOMEWHERE']])
+        with self.assertRaises(MesosException):
+            PlacementGroup(self.engine, 'g', [['hostname', 'LIKE']])
+
+    def test_missing_field(self):
+        group = self.engine.group('g', [['zone', 'UNIQUE']])
+        self.assertFalse(group(make_offer(1, 'r1')))
+
+    def test_unique(self):
+        group = self.engine.group('g', [['hostname', 'UNIQUE']])
+        self.assertTrue(group(make_offer(1, 'r1')))
+        group.placed('T1', make_offer(1, 'r1'))
+        self.assertFalse(group(make_offer(1, 'r1')))
+        self.assertTrue(group(make_offer(2, 'r1')))
+        self.assertTrue(group.released('T1'))
+        self.assertFalse(group.released('T1'))
+        self.assertTrue(group(make_offer(1, 'r1')))
+
+    def test_max_per(self):
+        group = self.engine.group('g', [['rack', 'MAX_PER', '2']])
+        group.placed('T1', make_offer(1, 'r1'))
+        self.assertTrue(group(make_offer(2, 'r1')))
+        group.placed('T2', make_offer(2, 'r1'))
+        self.assertFalse(group(make_offer(3, 'r1')))
+        self.assertTrue(group(make_offer(4, 'r2')))
+        self.assertEqual(group.count('rack', 'r1'), 2)
+        # same task counted once
+        group.placed('T2', make_offer(2, 'r1'))
+        self.assertEqual(len(group), 2)
+
+    def test_cluster(self):
+        group = self.engine.group('g', [['rack', 'CLUSTER', 'r2']])
+        self.assertFalse(group(make_offer(1, 'r1')))
+        self.assertTrue(group(make_offer(2, 'r2')))
+        group = self.engine.group('first', [['rack', 'CLUSTER']])
+        self.assertTrue(group(make_offer(1, 'r1')))
+        group.placed('T1', make_offer(1, 'r1'))
+        self.assertFalse(group(make_offer(2, 'r2')))
+        self.assertTrue(group(make_offer(3, 'r1')))
+
+    def test_group_by(self):
+        group = self.engine.group('g', [['rack', 'GROUP_BY', '2']])
+        group.placed('T1', make_offer(1, 'r1'))
+        # r1 has one more task than r2, which is not used yet
+        self.assertFalse(group(make_offer(2, 'r1')))
+        self.assertTrue(group(make_offer(3, 'r2')))
+        group.placed('T3', make_offer(3, 'r2'))
+        self.assertTrue(group(make_offer(2, 'r1')))
+
+    def test_group_by_known_agents(self):
+        for index, rack in enumerate(['r1', 'r2', 'r3']):
+            self.engine.get_attributes(make_offer(index, rack))
+        group = self.engine.group('g', [['rack', 'GROUP_BY']])
+        group.placed('T0', make_offer(0, 'r1'))
+        group.placed('T1', make_offer(1, 'r2'))
+        self.assertFalse(group(make_offer(0, 'r1')))
+        self.assertTrue(group(make_offer(2, 'r3')))
+
+    def test_like(self):
+        group = self.engine.group('g', [['rack', 'LIKE', 'r[12]'], ['hostname', 'UNLIKE', 'agent3']])
+        self.assertTrue(group(make_offer(1, 'r1')))
+        self.assertFalse(group(make_offer(2, 'r3')))
+        self.assertFalse(group(make_offer(3, 'r2')))
+        # regex must match the whole value
+        self.assertFalse(group(make_offer(4, 'r12')))
+
+    def test_task_ended(self):
+        group = self.engine.group('g', [['hostname', 'UNIQUE']])
+        group.placed('T1', make_offer(1, 'r1'))
+        self.engine.task_ended({'status': {'task_id': {'value': 'T1'}, 'state': 'TASK_FINISHED'}})
+        self.assertEqual(len(group), 0)
+        self.assertTrue(group(make_offer(1, 'r1')))
+
+    def test_group(self):
+        group = self.engine.group('g', [['hostname', 'UNIQUE']])
+        self.assertIs(self.engine.group('g'), group)
+        group.placed('T1', make_offer(1, 'r1'))
+        self.assertTrue(self.engine.remove_group('g'))
+        self.assertFalse(self.engine.remove_group('g'))
+        self.assertIsNot(self.engine.group('g'), group)
+
+
+class TestOfferConstraints(unittest.TestCase):
+
+    def setUp(self):
+        self.constraints = OfferConstraints()
+        self.constraints.add('*', [['rack', 'LIKE', 'r[12]'], ['gpu', 'NOT_EXISTS']])
+        self.constraints.add('*', [['@zone', 'EQUALS', 'z1']])
+
+    def test_add(self):
+        with self.assertRaises(MesosException):
+            self.constraints.add('*', [['rack', 'NEAR', 'r1']])
+        with self.assertRaises(MesosException):
+            self.constraints.add('*', [['rack', 'EQUALS']])
+        self.assertEqual(self.constraints.roles(), ['*'])
+
+    def test_matches(self):
+        self.assertTrue(self.constraints.matches(make_offer(1, 'r1')))
+        self.assertFalse(self.constraints.matches(make_offer(2, 'r3')))
+        # regex must match the whole value
+        self.assertFalse(self.constraints.matches(make_offer(3, 'r12')))
+        gpu = {'name': 'gpu', 'type': 'TEXT', 'text': {'value': 'yes'}}
+        self.assertFalse(self.constraints.matches(make_offer(4, 'r1', [gpu])))
+
+    def test_matches_any_group(self):
+        offer = make_offer(1, 'r3')
+        offer['domain'] = {'fault_domain': {'zone': {'name': 'z1'}, 'region': {'name': 'eu'}}}
+        self.assertTrue(self.constraints.matches(offer))
+        offer['domain']['fault_domain']['zone']['name'] = 'z2'
+        self.assertFalse(self.constraints.matches(offer))
+
+    def test_matches_role(self):
+        offer = make_offer(1, 'r3')
+        self.assertTrue(self.constraints.matches(offer, role='other'))
+        offer['allocation_info'] = {'role': 'other'}
+        self.assertTrue(self.constraints.matches(offer))
+        self.assertTrue(self.constraints.remove('*'))
+        self.assertTrue(self.constraints.matches(make_offer(1, 'r3')))
+
+    def test_non_text_attributes(self):
+        constraints = OfferConstraints()
+        constraints.add('*', [['cores', 'EQUALS', '4'], ['absent', 'NOT_EQUALS', '1']])
+        cores = {'name': 'cores', 'type': 'SCALAR', 'scalar': {'value': 8.0}}
+        self.assertTrue(constraints.matches(make_offer(1, 'r1', [cores])))
+        self.assertFalse(constraints.matches(make_offer(1, 'r1')))
+
+    def test_json(self):
+        constraints = OfferConstraints()
+        constraints.add('*', [['hostname', 'EQUALS', 'agent1'], ['rack', 'UNLIKE', 'r9'], ['gpu', 'EXISTS']])
+        json_constraints = constraints.to_json()
+        self.assertEqual(json_constraints, {'role_constraints': {'*': {'groups': [{'attribute_constraints': [
+            {'selector': {'pseudoattribute_type': 'HOSTNAME'}, 'predicate': {'text_equals': {'value': 'agent1'}}},
+            {'selector': {'attribute_name': 'rack'}, 'predicate': {'text_not_matches': {'regex': 'r9'}}},
+            {'selector': {'attribute_name': 'gpu'}, 'predicate': {'exists': {}}}
+        ]}]}}})
+        self.assertEqual(OfferConstraints.from_json(json_constraints).to_json(), json_constraints)
+        self.assertEqual(len(OfferConstraints.from_json(None)), 0)
@@ -0,0 +1,85 @@
+import unittest
+
+from mesoshttp.client import MesosClient
+from mesoshttp.core import MesosContext
+from mesoshttp.exception import MesosException
+from mesoshttp.filters import AdaptiveDeclineFilter
+from mesoshttp.offers import Offer
+from mesoshttp.operations import OperationBuilder
+
+from tests.test_tasks import _RecordingTransport, make_task
+
+
+def make_offer(agent='A1', cpus=4):
+    return {
+        'id': {'value': 'O1'},
+        'agent_id': {'value': agent},
+        'resources': [{'name': 'cpus', 'type': 'SCALAR', 'scalar': {'value': cpus}}]
+    }
+
+
+class TestAdaptiveDeclineFilter(unittest.TestCase):
+
+    def test_backoff(self):
+        decline_filter = AdaptiveDeclineFilter(min_refuse_seconds=5, max_refuse_seconds=30)
+        offer = make_offer()
+        values = [decline_filter.declined(offer)['refuse_seconds'] for _ in range(5)]
+        self.assertEqual(values, [5, 10, 20, 30, 30])
+        # other agent is not backed off
+        self.assertEqual(decline_filter.refuse_seconds(make_offer('A2')), 5)
+        decline_filter.used(offer)
+        self.assertEqual(decline_filter.refuse_seconds(offer), 5)
+
+    def test_same_shape(self):
+        decline_filter = AdaptiveDeclineFilter()
+        decline_filter.declined(make_offer(cpus=3))
+        self.assertEqual(decline_filter.refuse_seconds(make_offer(cpus=4)), 10)
+        self.assertEqual(decline_filter.refuse_seconds(make_offer(cpus=8)), 5)
+
+    def test_workload_changed_on_submit(self):
+        client = MesosClient(mesos_urls=[])
+        client.mesos_url = 'http://master'
+        client.frameworkId = 'F1'
+        client.set_transport(_RecordingTransport())
+        decline_filter = AdaptiveDeclineFilter()
+        client.set_decline_filter(decline_filter)
+        offer = make_offer()
+        for _ in range(3):
+            decline_filter.declined(offer)
+        driver = client.get_driver()
+        driver.submit(make_task(0))
+        self.assertEqual(decline_filter.refuse_seconds(offer), 5)
+        # queue is not empty, no REVIVE
+        decline_filter.declined(offer)
+        driver.submit(make_task(1))
+        self.assertEqual(decline_filter.refuse_seconds(offer), 5)
+        decline_filter.declined(offer)
+        driver.revive()
+        self.assertEqual(decline_filter.refuse_seconds(offer), 5)
+
+    def test_used_after_accept(self):
+        transport = _RecordingTransport()
+        client = MesosClient(mesos_urls=[])
+        client.mesos_url = 'http://master'
+        client.frameworkId = 'F1'
+        client.set_transport(transport)
+        decline_filter = AdaptiveDeclineFilter()
+        client.set_decline_filter(decline_filter)
+        context = MesosContext('http://master', 'F1', 'S1', decline_filter=decline_filter, session=transport)
+        mesos_offer = make_offer()
+        offer = Offer.from_context(context, mesos_offer)
+        decline_filter.declined(mesos_offer)
+        decline_filter.declined(mesos_offer)
+        # invalid operations
+        builder = OperationBuilder().launch([make_task(0, cpus=8)])
+        self.assertRaises(MesosException, client.combine_offers, [offer], builder)
+        self.assertRaises(MesosException, offer.accept, builder)
+        self.assertEqual(decline_filter.refuse_seconds(mesos_offer), 20)
+        # call failed
+        transport.fail = True
+        self.assertRaises(MesosException, client.combine_offers, [offer], [make_task(0)])
+        self.assertRaises(MesosException, offer.accept, [make_task(0)])
+        self.assertEqual(decline_filter.refuse_seconds(mesos_offer), 20)
+        transport.fail = False
+        client.combine_offers([offer], [make_task(0)])
+        self.assertEqual(decline_filter.refuse_seconds(mesos_offer), 5)
@@ -0,0 +1,159 @@
+import json
+import socket
+import threading
+import time
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from mesoshttp.client import MesosClient
+from mesoshttp.multiplex import FrameworkMultiplexer, _ChunkedDecoder
+from mesoshttp.transport import HTTPTransport
+
+
+class _Master(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+    # names of subscribed frameworks, redirected frameworks included
+    subscribe_calls = None
+
+
+class _MasterHandler(BaseHTTPRequestHandler):
+    '''
+    Answer SUBSCRIBE with a SUBSCRIBED event and keep stream open,
+    redirect framework "redirected" to itself
+    '''
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        call = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8'))
+        if call['type'] != 'SUBSCRIBE':
+            self.send_response(202)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        name = call['subscribe']['framework_info']['name']
+        self.server.subscribe_calls.append(name)
+        if name == 'redirected':
+            self.send_response(307)
+            self.send_header('Location', '//127.0.0.1:%d/api/v1/scheduler' % (self.server.server_address[1]))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        event = json.dumps({
+            'type': 'SUBSCRIBED',
+            'subscribed': {'framework_id': {'value': name}, 'heartbeat_interval_seconds': 15}
+        }).encode('utf-8')
+        record = ('%d\n' % (len(event))).encode('ascii') + event
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Mesos-Stream-Id', 'stream-' + name)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.wfile.write(('%x\r\n' % (len(record))).encode('ascii') + record + b'\r\n')
+        self.wfile.flush()
+        try:
+            while self.rfile.read(1):
+                pass
+        except Exception:
+            pass
+
+
+class TestChunkedDecoder(unittest.TestCase):
+
+    def test_feed(self):
+        data = b'5\r\nhello\r\n6;name=value\r\n world\r\n0\r\n\r\n'
+        for size in (1, 4, len(data)):
+            decoder = _ChunkedDecoder()
+            content = b''
+            for index in range(0, len(data), size):
+                content += decoder.feed(data[index:index + size])
+            self.assertEqual(content, b'hello world')
+            self.assertTrue(decoder.done)
+
+    def test_not_done(self):
+        decoder = _ChunkedDecoder()
+        self.assertEqual(decoder.feed(b'a\r\n0123'), b'0123')
+        self.assertFalse(decoder.done)
+
+
+class TestFrameworkMultiplexer(unittest.TestCase):
+
+    def setUp(self):
+        self.master = _Master(('127.0.0.1', 0), _MasterHandler)
+        self.master.subscribe_calls = []
+        thread = threading.Thread(target=self.master.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.url = 'http://127.0.0.1:%d' % (self.master.server_address[1])
+        # accepts connections but never answers
+        self.silent = socket.socket()
+        self.silent.bind(('127.0.0.1', 0))
+        self.silent.listen(5)
+        self.silent_url = 'https://127.0.0.1:%d' % (self.silent.getsockname()[1])
+        self.multiplexer = FrameworkMultiplexer()
+
+    def tearDown(self):
+        self.multiplexer.close()
+        self.master.shutdown()
+        self.master.server_close()
+        self.silent.close()
+
+    def run_until(self, condition, timeout=5):
+        thread = threading.Thread(target=self.multiplexer.run)
+        thread.daemon = True
+        thread.start()
+        end = time.time() + timeout
+        while not condition() and time.time() < end:
+            time.sleep(0.01)
+        self.multiplexer.close()
+        thread.join(timeout)
+
+    def make_client(self, name, mesos_urls, subscribed):
+        client = MesosClient(mesos_urls=mesos_urls, frameworkName=name)
+        client.on(MesosClient.SUBSCRIBED, lambda driver: subscribed.append(name))
+        self.multiplexer.add(client)
+        return client
+
+    def test_subscribe(self):
+        subscribed = []
+        transport = HTTPTransport()
+        first = self.make_client('first', [self.url], subscribed)
+        first.set_transport(transport)
+        second = self.make_client('second', [self.url], subscribed)
+        session = self.multiplexer.get_session(self.url)
+        self.run_until(lambda: len(subscribed) == 2)
+        self.assertEqual(sorted(subscribed), ['first', 'second'])
+        self.assertEqual(first.streamId, 'stream-first')
+        # transport set by user is kept, others share multiplexer session
+        self.assertIs(first.session, transport)
+        self.assertIs(second.session, session)
+
+    def test_silent_master_does_not_block_loop(self):
+        subscribed = []
+        silent = self.make_client('silent', [self.silent_url], subscribed)
+        silent.connection_timeout = 30
+        self.make_client('other', [self.url], subscribed)
+        start = time.time()
+        self.run_until(lambda: subscribed == ['other'])
+        self.assertEqual(subscribed, ['other'])
+        self.assertLess(time.time() - start, 5)
+
+    def test_redirections_limit(self):
+        subscribed = []
+        redirected = self.make_client('redirected', [self.url], subscribed)
+        redirected.max_reconnect = 1
+        self.run_until(lambda: self.master.subscribe_calls and len(self.multiplexer) == 0)
+        self.assertEqual(len(self.multiplexer), 0)
+        self.assertEqual(subscribed, [])
+        self.assertEqual(self.master.subscribe_calls, ['redirected'] * (FrameworkMultiplexer.MAX_REDIRECTS + 1))
@@ -0,0 +1,102 @@
+import unittest
+
+from mesoshttp.exception import MesosException
+from mesoshttp.operations import OperationBuilder
+
+
+def cpus(value, *roles):
+    resource = {'name': 'cpus', 'type': 'SCALAR', 'scalar': {'value': value}}
+    if roles:
+        resource['reservations'] = [{'type': 'DYNAMIC', 'role': role} for role in roles]
+    return resource
+
+
+def volume(size, role, persistence_id=None):
+    resource = {'name': 'disk', 'type': 'SCALAR', 'scalar': {'value': size}}
+    if role is not None:
+        resource['reservations'] = [{'type': 'DYNAMIC', 'role': role}]
+    if persistence_id is not None:
+        resource['disk'] = {'persistence': {'id': persistence_id}, 'volume': {'container_path': 'data', 'mode': 'RW'}}
+    return resource
+
+
+def task(index, resources):
+    return {'name': 'task%d' % (index), 'task_id': {'value': 'T%d' % (index)}, 'resources': resources}
+
+
+def offer(resources, agent_id='A1'):
+    return {'id': {'value': 'O1'}, 'agent_id': {'value': agent_id}, 'resources': resources}
+
+
+class TestOperationBuilder(unittest.TestCase):
+
+    def test_launch(self):
+        builder = OperationBuilder().launch([task(0, [cpus(1)]), task(1, [cpus(2)])])
+        self.assertTrue(builder.validate([offer([cpus(3)])]))
+        self.assertRaises(MesosException, builder.validate, [offer([cpus(2.5)])])
+        # reserved resources can not be used as unreserved
+        self.assertRaises(MesosException, builder.validate, [offer([cpus(3, 'web')])])
+
+    def test_launch_shared_executor(self):
+        executor = {'executor_id': {'value': 'E1'}, 'resources': [cpus(1)]}
+        tasks = [task(0, [cpus(1)]), task(1, [cpus(1)])]
+        for launched in tasks:
+            launched['executor'] = executor
+        builder = OperationBuilder().launch(tasks)
+        # executor resources are used once
+        self.assertTrue(builder.validate([offer([cpus(3)])]))
+        self.assertRaises(MesosException, builder.validate, [offer([cpus(2.5)])])
+
+    def test_launch_group_running_executor(self):
+        executor = {'executor_id': {'value': 'E1'}, 'resources': [cpus(1)]}
+        builder = OperationBuilder().launch_group(executor, [task(0, [cpus(1)])])
+        self.assertRaises(MesosException, builder.validate, [offer([cpus(1)])])
+        running = offer([cpus(1)])
+        running['executor_ids'] = [{'value': 'E1'}]
+        self.assertTrue(builder.validate([running]))
+
+    def test_get_operations_sets_agent(self):
+        builder = OperationBuilder().launch([task(0, [cpus(1)])])
+        operations = builder.get_operations('A1')
+        self.assertEqual(operations[0]['launch']['task_infos'][0]['agent_id'], {'value': 'A1'})
+        self.assertNotIn('agent_id', builder.operations[0]['launch']['task_infos'][0])
+
+    def test_offers_of_several_agents(self):
+        builder = OperationBuilder().launch([task(0, [cpus(1)])])
+        self.assertRaises(MesosException, builder.validate, [offer([cpus(1)]), offer([cpus(1)], 'A2')])
+
+    def test_reserve_create_launch(self):
+        builder = OperationBuilder()
+        builder.reserve([cpus(2, 'web'), volume(100, 'web')])
+        builder.create([volume(100, 'web', 'data')])
+        builder.launch([task(0, [cpus(2, 'web'), volume(100, 'web', 'data')])])
+        self.assertTrue(builder.validate([offer([cpus(2), volume(100, None)])]))
+        # volume not created
+        builder = OperationBuilder().reserve([cpus(2, 'web')]).launch([task(0, [volume(100, 'web', 'data')])])
+        self.assertRaises(MesosException, builder.validate, [offer([cpus(2), volume(100, 'web')])])
+
+    def test_unreserve(self):
+        builder = OperationBuilder().unreserve([cpus(2, 'web')]).launch([task(0, [cpus(2)])])
+        self.assertTrue(builder.validate([offer([cpus(2, 'web')])]))
+        self.assertRaises(MesosException, builder.validate, [offer([cpus(2, 'batch')])])
+
+    def test_refined_reservation(self):
+        offered = [offer([cpus(4, 'eng')])]
+        builder = OperationBuilder().reserve([cpus(2, 'eng', 'eng/web')])
+        builder.launch([task(0, [cpus(2, 'eng', 'eng/web')]), task(1, [cpus(2, 'eng')])])
+        self.assertTrue(builder.validate(offered))
+        # refined reservation is distinct from the reservation it refines
+        builder = OperationBuilder().reserve([cpus(2, 'eng', 'eng/web')])
+        builder.launch([task(0, [cpus(3, 'eng', 'eng/web')])])
+        self.assertRaises(MesosException, builder.validate, offered)
+        builder = OperationBuilder().reserve([cpus(2, 'eng', 'eng/web')]).launch([task(0, [cpus(3, 'eng')])])
+        self.assertRaises(MesosException, builder.validate, offered)
+        # refinement of a reservation not offered
+        builder = OperationBuilder().reserve([cpus(2, 'ops', 'ops/web')])
+        self.assertRaises(MesosException, builder.validate, offered)
+
+    def test_unreserve_refined_reservation(self):
+        builder = OperationBuilder().unreserve([cpus(2, 'eng', 'eng/web')]).launch([task(0, [cpus(2, 'eng')])])
+        self.assertTrue(builder.validate([offer([cpus(2, 'eng', 'eng/web')])]))
+        builder = OperationBuilder().unreserve([cpus(2, 'eng', 'eng/web')]).launch([task(0, [cpus(2)])])
+        self.assertRaises(MesosException, builder.validate, [offer([cpus(2, 'eng', 'eng/web')])])
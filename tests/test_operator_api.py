@@ -0,0 +1,81 @@
+import json
+import threading
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from mesoshttp.exception import MesosException
+from mesoshttp.operator_api import OperatorClient
+
+
+class _Master(HTTPServer):
+    '''
+    Master answering calls if leader, else redirecting to leader
+    '''
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), _MasterHandler)
+        self.leader = None
+        self.calls = 0
+
+
+class _MasterHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.calls += 1
+        if self.server.leader is not None:
+            self.send_response(307)
+            self.send_header('Location', '//127.0.0.1:%d/api/v1' % (self.server.leader.server_address[1]))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps({'type': 'GET_HEALTH', 'get_health': {'healthy': True}}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestOperatorClient(unittest.TestCase):
+
+    def setUp(self):
+        self.masters = []
+
+    def tearDown(self):
+        for master in self.masters:
+            master.shutdown()
+            master.server_close()
+
+    def start_master(self):
+        master = _Master()
+        thread = threading.Thread(target=master.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.masters.append(master)
+        return master
+
+    def url(self, master):
+        return 'http://127.0.0.1:%d' % (master.server_address[1])
+
+    def test_redirect_to_leader(self):
+        leader = self.start_master()
+        follower = self.start_master()
+        follower.leader = leader
+        client = OperatorClient(self.url(follower))
+        self.assertEqual(client.call('GET_HEALTH'), {'type': 'GET_HEALTH', 'get_health': {'healthy': True}})
+        self.assertEqual(client.mesos_url, self.url(leader))
+
+    def test_redirect_loop(self):
+        master = self.start_master()
+        master.leader = master
+        client = OperatorClient(self.url(master))
+        self.assertRaises(MesosException, client.call, 'GET_HEALTH')
+        self.assertEqual(master.calls, OperatorClient.MAX_REDIRECTS + 1)
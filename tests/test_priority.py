@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+import unittest
+
+from mesoshttp.priority import PriorityEventQueue
+
+
+def record(event):
+    return json.dumps(event).encode('utf-8')
+
+
+def offers(offer_id):
+    return record({'type': 'OFFERS', 'offers': {'offers': [{'id': {'value': offer_id}}]}})
+
+
+def update(task_id):
+    return record({'type': 'UPDATE', 'update': {'status': {'task_id': {'value': task_id}}}})
+
+
+HEARTBEAT = record({'type': 'HEARTBEAT'})
+
+
+class TestPriorityEventQueue(unittest.TestCase):
+
+    def get_types(self, events):
+        types = []
+        while len(events):
+            types.append(json.loads(events.get()[0].decode('utf-8'))['type'])
+        return types
+
+    def test_order(self):
+        events = PriorityEventQueue()
+        events.put(offers('O1'))
+        events.put(update('T1'))
+        events.put(HEARTBEAT)
+        events.put(record({'type': 'RESCIND', 'rescind': {'offer_id': {'value': 'O1'}}}))
+        self.assertEqual(self.get_types(events), ['HEARTBEAT', 'RESCIND', 'UPDATE', 'OFFERS'])
+
+    def test_updates_keep_arrival_order(self):
+        events = PriorityEventQueue()
+        for index in range(10):
+            events.put(update('T%d' % (index)))
+        tasks = []
+        while len(events):
+            tasks.append(json.loads(events.get()[0].decode('utf-8'))['update']['status']['task_id']['value'])
+        self.assertEqual(tasks, ['T%d' % (index) for index in range(10)])
+
+    def test_heartbeat_not_starved(self):
+        events = PriorityEventQueue(maxsize=0)
+        for index in range(100):
+            events.put(offers('O%d' % (index)))
+            events.put(update('T%d' % (index)))
+        events.put(HEARTBEAT)
+        self.assertEqual(events.get()[0], HEARTBEAT)
+
+    def test_rescinded(self):
+        events = PriorityEventQueue()
+        events.put(offers('O1'))
+        events.put(record({'type': 'RESCIND', 'rescind': {'offer_id': {'value': 'O1'}}}))
+        self.assertEqual(events.get()[1], None)
+        (item, rescinded) = events.get()
+        self.assertEqual(rescinded, frozenset(['O1']))
+        # no queued offers, rescinded offers are forgotten
+        events.put(record({'type': 'RESCIND', 'rescind': {'offer_id': {'value': 'O2'}}}))
+        events.get()
+        events.put(offers('O2'))
+        self.assertEqual(events.get()[1], frozenset())
+
+    def test_maxsize(self):
+        events = PriorityEventQueue(maxsize=2)
+        events.put(update('T1'))
+        events.put(update('T2'))
+        done = threading.Event()
+
+        def put():
+            events.put(update('T3'))
+            done.set()
+
+        thread = threading.Thread(target=put)
+        thread.daemon = True
+        thread.start()
+        time.sleep(0.05)
+        self.assertFalse(done.is_set())
+        events.get()
+        self.assertTrue(done.wait(1))
+        self.assertEqual(len(events), 2)
+
+    def test_close(self):
+        events = PriorityEventQueue(maxsize=1)
+        events.put(HEARTBEAT)
+        events.close()
+        # closed queue does not block producer
+        events.put(HEARTBEAT)
+        self.assertEqual(events.get()[0], HEARTBEAT)
+        self.assertEqual(events.get()[0], HEARTBEAT)
+        self.assertEqual(events.get(), None)
+        events.put(HEARTBEAT)
+        events.close(discard=True)
+        self.assertEqual(events.get(), None)
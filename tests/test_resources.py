@@ -0,0 +1,133 @@
+import unittest
+
+from mesoshttp.exception import MesosException
+from mesoshttp.resources import (
+    OfferResources, PortAllocator, Resources,
+    _add_intervals, _contains_intervals, _merge_intervals, _subtract_intervals
+)
+
+
+def ranges(name, *intervals):
+    return {
+        'name': name, 'type': 'RANGES',
+        'ranges': {'range': [{'begin': begin, 'end': end} for (begin, end) in intervals]}
+    }
+
+
+def scalar(name, value, role=None):
+    resource = {'name': name, 'type': 'SCALAR', 'scalar': {'value': value}}
+    if role is not None:
+        resource['reservations'] = [{'type': 'STATIC', 'role': role}]
+    return resource
+
+
+OFFERED = [
+    scalar('cpus', 2),
+    scalar('cpus', 1.5, role='web'),
+    scalar('mem', 4096),
+    ranges('ports', (31005, 31010), (31000, 31004), (32000, 32000)),
+    {'name': 'gpus_ids', 'type': 'SET', 'set': {'item': ['a', 'b']}}
+]
+
+
+class TestIntervals(unittest.TestCase):
+
+    def test_merge(self):
+        self.assertEqual(_merge_intervals([(5, 6), (1, 2), (3, 3), (10, 12), (11, 20)]), [(1, 3), (5, 6), (10, 20)])
+        self.assertEqual(_merge_intervals([]), [])
+
+    def test_add(self):
+        self.assertEqual(_add_intervals([(1, 2), (10, 12)], [(3, 4), (20, 20)]), [(1, 4), (10, 12), (20, 20)])
+
+    def test_contains(self):
+        intervals = [(1, 5), (10, 20)]
+        self.assertTrue(_contains_intervals(intervals, [(1, 1), (5, 5), (12, 20)]))
+        self.assertTrue(_contains_intervals(intervals, []))
+        self.assertFalse(_contains_intervals(intervals, [(4, 10)]))
+        self.assertFalse(_contains_intervals(intervals, [(21, 21)]))
+        self.assertFalse(_contains_intervals([], [(1, 1)]))
+
+    def test_subtract(self):
+        intervals = [(1, 10), (20, 30)]
+        self.assertEqual(_subtract_intervals(intervals, [(1, 1), (5, 6), (25, 30)]), [(2, 4), (7, 10), (20, 24)])
+        self.assertEqual(_subtract_intervals(intervals, [(1, 10), (20, 30)]), [])
+        self.assertEqual(_subtract_intervals(intervals, []), intervals)
+
+
+class TestResources(unittest.TestCase):
+
+    def test_parse(self):
+        resources = Resources.parse(OFFERED)
+        self.assertEqual(resources.scalars, {'cpus': 3.5, 'mem': 4096})
+        self.assertEqual(resources.ranges, {'ports': [(31000, 31010), (32000, 32000)]})
+        self.assertEqual(resources.sets, {'gpus_ids': set(['a', 'b'])})
+
+    def test_parse_key(self):
+        def key(resource):
+            reservations = resource.get('reservations', [])
+            return (resource['name'], reservations[-1]['role'] if reservations else '*')
+
+        resources = Resources.parse(OFFERED, key)
+        self.assertEqual(resources.scalar(('cpus', 'web')), 1.5)
+        self.assertEqual(resources.scalar(('cpus', '*')), 2)
+
+    def test_contains_subtract_add(self):
+        available = Resources.parse(OFFERED)
+        task = Resources.parse([scalar('cpus', 1), ranges('ports', (31002, 31003)), scalar('mem', 4096)])
+        self.assertTrue(available.contains(task))
+        remaining = available - task
+        self.assertEqual(remaining.scalars, {'cpus': 2.5, 'mem': 0})
+        self.assertEqual(remaining.ranges['ports'], [(31000, 31001), (31004, 31010), (32000, 32000)])
+        self.assertFalse(remaining.contains(task))
+        self.assertRaises(MesosException, remaining.subtract, task)
+        self.assertEqual((remaining + task).ranges, available.ranges)
+        # operators do not change operands
+        self.assertEqual(available.scalars['cpus'], 3.5)
+
+    def test_scalar_tolerance(self):
+        available = Resources.parse([scalar('cpus', 0.3)])
+        self.assertTrue(available.contains(Resources.parse([scalar('cpus', 0.1 + 0.2)])))
+
+    def test_to_json(self):
+        resources = Resources.parse(OFFERED)
+        self.assertEqual(Resources.parse(resources.to_json()).ranges, resources.ranges)
+
+
+class TestOfferResources(unittest.TestCase):
+
+    def test_totals(self):
+        resources = OfferResources(OFFERED)
+        self.assertEqual(resources.cpus, 3.5)
+        self.assertEqual(resources.mem, 4096)
+        self.assertEqual(resources.disk, 0)
+        self.assertEqual(resources.ports, [(31000, 31010), (32000, 32000)])
+        self.assertEqual(resources.items('gpus_ids'), set(['a', 'b']))
+
+    def test_as_resources_is_a_copy(self):
+        resources = OfferResources(OFFERED)
+        available = resources.as_resources()
+        available.subtract(Resources.parse([scalar('cpus', 3), ranges('ports', (31000, 31010))]))
+        self.assertEqual(resources.cpus, 3.5)
+        self.assertEqual(resources.ports, [(31000, 31010), (32000, 32000)])
+
+
+class TestPortAllocator(unittest.TestCase):
+
+    def test_allocate(self):
+        allocator = PortAllocator([(31000, 31002), (31010, 31020)])
+        self.assertEqual(allocator.available, 14)
+        self.assertEqual(allocator.allocate(2), [(31000, 31001)])
+        self.assertEqual(allocator.allocate(3), [(31002, 31002), (31010, 31011)])
+        self.assertEqual(allocator.available, 9)
+        self.assertEqual(allocator.allocate(9), [(31012, 31020)])
+        self.assertRaises(MesosException, allocator.allocate, 1)
+
+    def test_allocate_resource(self):
+        allocator = OfferResources(OFFERED).port_allocator()
+        resource = allocator.allocate_resource(12)
+        self.assertEqual(resource, ranges('ports', (31000, 31010), (32000, 32000)))
+
+    def test_empty(self):
+        allocator = PortAllocator([])
+        self.assertEqual(allocator.allocate(0), [])
+        self.assertRaises(MesosException, allocator.allocate, 1)
@@ -0,0 +1,97 @@
+import unittest
+
+from mesoshttp.client import MesosClient
+from mesoshttp.simulator import ClusterSimulator
+
+from tests.test_tasks import make_task
+
+
+AGENT_RESOURCES = [
+    {'name': 'cpus', 'type': 'SCALAR', 'scalar': {'value': 4}},
+    {'name': 'mem', 'type': 'SCALAR', 'scalar': {'value': 4096}}
+]
+
+
+def offered_cpus(offer):
+    for resource in offer.get_offer()['resources']:
+        if resource['name'] == 'cpus':
+            return resource['scalar']['value']
+    return 0
+
+
+class TestClusterSimulator(unittest.TestCase):
+    '''
+    One agent of 4 cpus, offered every second, a task of 3 cpus running 10 seconds
+    '''
+
+    def setUp(self):
+        self.client = MesosClient(mesos_urls=[])
+        self.offers = []
+        self.updates = []
+        self.rescinded = []
+        self.task = None
+        self.client.on(MesosClient.OFFERS, self.handle_offers)
+        self.client.on(MesosClient.UPDATE, self.handle_update)
+        self.client.on(MesosClient.RESCIND, lambda rescind: self.rescinded.append(self.simulator.now))
+
+    def make_simulator(self, **kwargs):
+        self.simulator = ClusterSimulator(
+            self.client, agents=1, agent_resources=AGENT_RESOURCES, task_duration=10.0, **kwargs
+        )
+        return self.simulator
+
+    def handle_offers(self, offers):
+        for offer in offers:
+            self.offers.append((self.simulator.now, offered_cpus(offer)))
+            if self.task is not None:
+                offer.accept([self.task])
+                self.task = None
+            elif self.simulator.offer_timeout is None:
+                offer.decline()
+
+    def handle_update(self, update):
+        self.updates.append((self.simulator.now, update['status']['state']))
+
+    def test_launch_and_finish(self):
+        simulator = self.make_simulator()
+        self.task = make_task(0, cpus=3)
+        metrics = simulator.run(duration=30)
+        self.assertEqual(metrics['time'], 30)
+        self.assertEqual(self.updates, [(0.5, 'TASK_STAGING'), (1.5, 'TASK_RUNNING'), (11.5, 'TASK_FINISHED')])
+        # remaining resources are refused 5 seconds after ACCEPT and DECLINE,
+        # task resources come back to agent when task is finished
+        self.assertEqual(self.offers[:4], [(0, 4), (5, 1), (10, 1), (15, 4)])
+        self.assertEqual(metrics['launched'], 1)
+        self.assertEqual(metrics['running'], 0)
+        self.assertEqual(metrics['calls']['ACCEPT'], 1)
+        self.assertEqual(metrics['calls']['ACKNOWLEDGE'], 3)
+        self.assertEqual(metrics['states'], {'TASK_STAGING': 1, 'TASK_RUNNING': 1, 'TASK_FINISHED': 1})
+        # 3 of 4 cpus used from ACCEPT to TASK_FINISHED, 11.5 of 30 seconds
+        self.assertAlmostEqual(metrics['utilisation']['cpus'], 3 * 11.5 / (4 * 30))
+
+    def test_run_until(self):
+        simulator = self.make_simulator()
+        self.task = make_task(0, cpus=3)
+        simulator.run(until=lambda: simulator.metrics()['running'] == 0 and simulator.launched)
+        self.assertEqual(simulator.now, 11.5)
+        # simulation continues from current time
+        simulator.run(duration=1)
+        self.assertEqual(simulator.now, 12.5)
+
+    def test_rescind(self):
+        simulator = self.make_simulator(offer_timeout=2.5)
+        simulator.run(duration=7)
+        # offers kept by framework are rescinded and offered again on next cycle
+        self.assertEqual(self.rescinded, [2.5, 5.5])
+        self.assertEqual([offer[0] for offer in self.offers], [0, 3, 6])
+
+    def test_agent_failure(self):
+        simulator = self.make_simulator(recovery_time=10)
+        self.task = make_task(0, cpus=3)
+        agent_id = list(simulator.agents)[0]
+        simulator.schedule(5, simulator.fail_agent, agent_id)
+        simulator.run(duration=16)
+        self.assertEqual(self.updates[-1], (5, 'TASK_LOST'))
+        self.assertEqual(simulator.events['FAILURE'], 1)
+        # agent comes back with all its resources
+        self.assertEqual(self.offers[-1], (15, 4))
@@ -0,0 +1,110 @@
+import json
+import unittest
+
+from mesoshttp.stream import LazyOffers, RecordReader, decode_record, iter_offers, iter_records, peek_event_type
+
+
+def offers_record(count, spaces=''):
+    event = {
+        'type': 'OFFERS',
+        'offers': {'offers': [{'id': {'value': 'O%d' % (index)}, 'hostname': 'agent%d' % (index)}
+                              for index in range(count)]}
+    }
+    return json.dumps(event, indent=spaces or None).encode('utf-8')
+
+
+def recordio(*records):
+    return b''.join([('%d\n' % (len(record))).encode('ascii') + record for record in records])
+
+
+class TestRecordReader(unittest.TestCase):
+
+    def test_feed(self):
+        reader = RecordReader()
+        self.assertEqual(reader.feed(recordio(b'{"a": 1}', b'{}')), [b'{"a": 1}', b'{}'])
+        self.assertEqual(reader.feed(b''), [])
+
+    def test_split_records(self):
+        data = recordio(b'{"type": "HEARTBEAT"}', b'0123456789' * 2)
+        for size in (1, 2, 3, 7):
+            reader = RecordReader()
+            records = []
+            for index in range(0, len(data), size):
+                records.extend(reader.feed(data[index:index + size]))
+            self.assertEqual(records, [b'{"type": "HEARTBEAT"}', b'0123456789' * 2])
+
+    def test_binary_records(self):
+        # protobuf records may contain new lines
+        reader = RecordReader()
+        self.assertEqual(reader.feed(recordio(b'\x08\n\n', b'\n')), [b'\x08\n\n', b'\n'])
+
+    def test_keep_alive_new_lines(self):
+        reader = RecordReader()
+        self.assertEqual(reader.feed(b'\n\n' + recordio(b'{}') + b'\n'), [b'{}'])
+        self.assertEqual(reader.feed(recordio(b'{}')), [b'{}'])
+
+    def test_iter_records(self):
+        data = recordio(b'{}', b'[]')
+        self.assertEqual(list(iter_records([data[:3], data[3:]])), [b'{}', b'[]'])
+
+
+class TestPeekEventType(unittest.TestCase):
+
+    def test_peek(self):
+        self.assertEqual(peek_event_type(b'{"type":"HEARTBEAT"}'), 'HEARTBEAT')
+        self.assertEqual(peek_event_type(b' { "type" : "UPDATE_OPERATION_STATUS", "x": 1}'), 'UPDATE_OPERATION_STATUS')
+        self.assertEqual(peek_event_type(offers_record(1)), 'OFFERS')
+        self.assertEqual(peek_event_type(offers_record(1, '  ')), 'OFFERS')
+
+    def test_type_not_first(self):
+        # caller falls back to decoding the record
+        self.assertEqual(peek_event_type(b'{"offers": {}, "type": "OFFERS"}'), None)
+        self.assertEqual(peek_event_type(b''), None)
+        self.assertEqual(peek_event_type(b'{"type": 3}'), None)
+
+
+class TestIterOffers(unittest.TestCase):
+
+    def test_iter_offers(self):
+        for record in (offers_record(3), offers_record(3, '  ')):
+            self.assertEqual(list(iter_offers(record)), decode_record(record)['offers']['offers'])
+
+    def test_empty(self):
+        self.assertEqual(list(iter_offers(offers_record(0))), [])
+
+    def test_offers_not_found(self):
+        # offers field not where expected, whole event is decoded
+        record = json.dumps({'offers': {'offers': [{'id': {'value': 'O1'}}]}, 'type': 'OFFERS'}).encode('utf-8')
+        self.assertEqual([offer['id']['value'] for offer in iter_offers(record)], ['O1'])
+
+
+class TestLazyOffers(unittest.TestCase):
+
+    def setUp(self):
+        self.created = []
+
+    def factory(self, offer):
+        self.created.append(offer['id']['value'])
+        return offer['id']['value']
+
+    def test_decoded_once(self):
+        offers = LazyOffers(offers_record(3), self.factory)
+        self.assertEqual(list(offers), ['O0', 'O1', 'O2'])
+        self.assertEqual(list(offers), ['O0', 'O1', 'O2'])
+        self.assertEqual(self.created, ['O0', 'O1', 'O2'])
+        self.assertEqual(offers.record, None)
+
+    def test_lazy(self):
+        offers = LazyOffers(offers_record(3), self.factory)
+        first = iter(offers)
+        self.assertEqual(next(first), 'O0')
+        self.assertEqual(self.created, ['O0'])
+        # second iteration gets decoded offers and continues decoding
+        self.assertEqual(list(offers), ['O0', 'O1', 'O2'])
+        self.assertEqual(list(first), ['O1', 'O2'])
+        self.assertEqual(self.created, ['O0', 'O1', 'O2'])
+
+    def test_excluded(self):
+        offers = LazyOffers(offers_record(3), self.factory, set(['O1']))
+        self.assertEqual(list(offers), ['O0', 'O2'])
+        self.assertEqual(self.created, ['O0', 'O2'])
@@ -0,0 +1,126 @@
+import json
+import unittest
+
+from mesoshttp.client import MesosClient
+from mesoshttp.core import MesosContext
+from mesoshttp.offers import Offer
+from mesoshttp.tasks import TaskQueue
+from mesoshttp.transport import Transport
+from mesoshttp.watch import UpdateDispatcher
+
+
+class _Response(object):
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = ''
+
+
+class _RecordingTransport(Transport):
+    '''
+    Transport recording calls, failing if fail is set
+    '''
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    def post(self, url, data=None, headers=None, auth=None, verify=True):
+        if self.fail:
+            raise IOError('connection refused')
+        self.calls.append(data)
+        return _Response(202)
+
+
+def make_offer(context, index, cpus=4, mem=4096):
+    return Offer.from_context(context, {
+        'id': {'value': 'O%d' % (index)},
+        'framework_id': {'value': 'F1'},
+        'agent_id': {'value': 'A%d' % (index)},
+        'hostname': 'agent%d' % (index),
+        'resources': [
+            {'name': 'cpus', 'type': 'SCALAR', 'scalar': {'value': cpus}},
+            {'name': 'mem', 'type': 'SCALAR', 'scalar': {'value': mem}}
+        ]
+    })
+
+
+def make_task(index, cpus=1, mem=1024):
+    return {
+        'name': 'task%d' % (index),
+        'task_id': {'value': 'T%d' % (index)},
+        'resources': [
+            {'name': 'cpus', 'type': 'SCALAR', 'scalar': {'value': cpus}},
+            {'name': 'mem', 'type': 'SCALAR', 'scalar': {'value': mem}}
+        ]
+    }
+
+
+class TestTaskQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = _RecordingTransport()
+        self.context = MesosContext('http://master', 'F1', 'S1', session=self.transport)
+        self.queue = TaskQueue(UpdateDispatcher())
+
+    def test_launch(self):
+        for index in range(5):
+            self.queue.submit(make_task(index))
+        unused = self.queue.launch([make_offer(self.context, 0), make_offer(self.context, 1, cpus=0.5)])
+        self.assertEqual([offer.get_offer()['id']['value'] for offer in unused], ['O1'])
+        self.assertEqual(len(self.queue), 1)
+        self.assertEqual(len(self.transport.calls), 1)
+
+    def test_launch_accept_error(self):
+        self.transport.fail = True
+        self.queue.submit(make_task(0))
+        offer = make_offer(self.context, 0)
+        unused = self.queue.launch([offer])
+        # tasks are queued again and offer is returned to be declined
+        self.assertEqual(unused, [offer])
+        self.assertEqual(len(self.queue), 1)
+
+    def test_revive_needed(self):
+        self.assertTrue(self.queue.revive_needed())
+        # revived recently
+        self.assertFalse(self.queue.revive_needed())
+        self.queue.revive_interval = 0
+        self.assertTrue(self.queue.revive_needed())
+
+    def test_revive_not_needed_while_offers_received(self):
+        self.queue.launch([make_offer(self.context, 0)])
+        self.assertFalse(self.queue.revive_needed())
+
+
+class TestClientOffers(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = _RecordingTransport()
+        self.client = MesosClient(mesos_urls=[])
+        self.client.mesos_url = 'http://master'
+        self.client.frameworkId = 'F1'
+        self.client.set_transport(self.transport)
+        self.record = json.dumps({'type': 'OFFERS', 'offers': {'offers': [
+            make_offer(self.client.get_driver().context, index).get_offer() for index in range(3)
+        ]}}).encode('utf-8')
+
+    def handle_offers(self):
+        self.client._MesosClient__handle_offers('OFFERS', None, self.record)
+        return [json.loads(call) for call in self.transport.calls]
+
+    def test_decline_without_callback(self):
+        calls = self.handle_offers()
+        self.assertEqual([call['type'] for call in calls], ['DECLINE'] * 3)
+
+    def test_decline_unused_without_callback(self):
+        self.client.get_driver().submit(make_task(0))
+        # REVIVE
+        del self.transport.calls[:]
+        calls = self.handle_offers()
+        self.assertEqual([call['type'] for call in calls], ['ACCEPT', 'DECLINE', 'DECLINE'])
+
+    def test_callback(self):
+        received = []
+        self.client.on(MesosClient.OFFERS, lambda offers: received.extend(offers))
+        self.assertEqual(self.handle_offers(), [])
+        self.assertEqual(len(received), 3)
@@ -0,0 +1,104 @@
+import io
+import json
+import time
+import unittest
+
+from mesoshttp.tracing import LatencyHistogram, LaunchTracer
+
+
+def accept_call(offer_id, task_ids):
+    return {
+        'type': 'ACCEPT',
+        'accept': {
+            'offer_ids': [{'value': offer_id}],
+            'operations': [{
+                'type': 'LAUNCH',
+                'launch': {'task_infos': [{'task_id': {'value': task_id}} for task_id in task_ids]}
+            }]
+        }
+    }
+
+
+def update(task_id, state):
+    return {'status': {'task_id': {'value': task_id}, 'agent_id': {'value': 'A1'}, 'state': state}}
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_buckets(self):
+        histogram = LatencyHistogram()
+        for latency in (0.0005, 0.001, 0.0015, 0.003, 0.004, 0.005, 3600):
+            histogram.add(latency)
+        # bucket i holds latencies in ]2^(i-1), 2^i] ms, first one up to 1 ms
+        self.assertEqual(histogram.buckets[:4], [2, 1, 2, 1])
+        self.assertEqual(histogram.buckets[LatencyHistogram.BUCKETS - 1], 1)
+        self.assertEqual(histogram.count, 7)
+        self.assertEqual(histogram.max, 3600)
+
+    def test_percentile(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(50), 0.0)
+        for _ in range(90):
+            histogram.add(0.0005)
+        for _ in range(10):
+            histogram.add(0.1)
+        summary = histogram.summary()
+        self.assertEqual(summary['count'], 100)
+        self.assertAlmostEqual(summary['mean'], (90 * 0.0005 + 10 * 0.1) / 100)
+        # upper bound of percentile bucket
+        self.assertEqual(summary['p50'], 0.001)
+        self.assertEqual(summary['p90'], 0.001)
+        # bucket bound (128 ms) is above max latency
+        self.assertEqual(summary['p99'], 0.1)
+        self.assertEqual(histogram.percentile(91), 0.1)
+
+
+class TestLaunchTracer(unittest.TestCase):
+
+    def test_span(self):
+        spans = []
+        tracer = LaunchTracer(exporter=spans.append)
+        received = time.time() - 1
+        tracer.offer_received('O1', received)
+        task_ids = tracer.accept_started(accept_call('O1', ['T1', 'T2']))
+        self.assertEqual(task_ids, ['T1', 'T2'])
+        tracer.accept_done(task_ids, 202)
+        tracer.update(update('T1', 'TASK_STAGING'), received + 2)
+        tracer.update(update('T1', 'TASK_RUNNING'), received + 3)
+        tracer.update(update('T2', 'TASK_FAILED'), received + 2)
+        self.assertEqual([(span['task_id'], span['state']) for span in spans],
+                         [('T1', 'TASK_RUNNING'), ('T2', 'TASK_FAILED')])
+        stages = spans[0]['stages']
+        self.assertEqual(sorted(stages), sorted(LaunchTracer.STAGES))
+        self.assertAlmostEqual(stages['running'], 1)
+        self.assertAlmostEqual(stages['total'], 3)
+        self.assertEqual(spans[0]['agent_id'], 'A1')
+        # failed task has no running stage
+        self.assertNotIn('running', spans[1]['stages'])
+        summary = tracer.summary()
+        self.assertEqual(summary['callback']['count'], 2)
+        self.assertEqual(summary['total']['count'], 1)
+        # updates of ended tasks are ignored
+        tracer.update(update('T1', 'TASK_FINISHED'))
+        self.assertEqual(len(spans), 2)
+
+    def test_accept_failed(self):
+        tracer = LaunchTracer()
+        tracer.offer_received('O1')
+        tracer.accept_done(tracer.accept_started(accept_call('O1', ['T1'])), 400)
+        self.assertEqual(tracer.spans[0]['state'], 'ACCEPT_FAILED')
+        self.assertEqual(tracer.summary()['accept']['count'], 1)
+        self.assertEqual(tracer.summary()['running']['count'], 0)
+        stream = io.StringIO()
+        tracer.export(stream)
+        self.assertEqual(json.loads(stream.getvalue())['task_id'], 'T1')
+
+    def test_max_tasks(self):
+        tracer = LaunchTracer(max_tasks=2)
+        for index in range(3):
+            tracer.offer_received('O%d' % (index))
+        # oldest offer is no longer followed, task has no reception time
+        task_ids = tracer.accept_started(accept_call('O0', ['T0']))
+        tracer.accept_done(task_ids, 202)
+        tracer.update(update('T0', 'TASK_RUNNING'))
+        self.assertEqual(sorted(tracer.spans[0]['stages']), ['accept', 'running'])
@@ -0,0 +1,169 @@
+import datetime
+import os
+import shutil
+import socket
+import ssl
+import tempfile
+import threading
+import time
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+try:
+    import ipaddress
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+except ImportError:
+    x509 = None
+
+from requests.auth import HTTPBasicAuth
+
+from mesoshttp.transport import HTTPTransport
+
+
+class _Master(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), _MasterHandler)
+        self.requests = []
+
+
+class _MasterHandler(BaseHTTPRequestHandler):
+    '''
+    Answers 202, closes the connection without telling client on /close,
+    answers after 1 second on /slow
+    '''
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.requests.append((self.path, dict(self.headers), body))
+        if self.path == '/slow':
+            time.sleep(1)
+        self.send_response(202)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        if self.path == '/close':
+            self.close_connection = True
+
+
+def make_certificate(directory):
+    '''
+    Create a self signed certificate of 127.0.0.1
+
+    :return: (certificate path, key path)
+    '''
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, u'127.0.0.1')])
+    now = datetime.datetime.utcnow()
+    certificate = x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(
+        key.public_key()
+    ).serial_number(1).not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(
+        now + datetime.timedelta(days=1)
+    ).add_extension(
+        x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address(u'127.0.0.1'))]), critical=False
+    ).add_extension(
+        x509.BasicConstraints(ca=True, path_length=None), critical=True
+    ).sign(key, hashes.SHA256())
+    certificate_path = os.path.join(directory, 'cert.pem')
+    key_path = os.path.join(directory, 'key.pem')
+    with open(certificate_path, 'wb') as certificate_file:
+        certificate_file.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, 'wb') as key_file:
+        key_file.write(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+    return (certificate_path, key_path)
+
+
+class TestHTTPTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.master = _Master()
+        self.url = 'http://127.0.0.1:%d' % (self.master.server_address[1])
+        threading.Thread(target=self.master.serve_forever).start()
+        self.transport = HTTPTransport(timeout=5)
+
+    def tearDown(self):
+        self.transport.close()
+        self.master.shutdown()
+        self.master.server_close()
+
+    def test_post(self):
+        r = self.transport.post(self.url + '/api/v1/scheduler?x=1', '{}', {'Content-Type': 'application/json'})
+        self.assertEqual(r.status_code, 202)
+        self.transport.post(self.url + '/api/v1/scheduler', b'{}')
+        (path, headers, body) = self.master.requests[0]
+        self.assertEqual(path, '/api/v1/scheduler?x=1')
+        self.assertEqual(headers['Content-Type'], 'application/json')
+        self.assertEqual(body, b'{}')
+        # connection is kept between calls
+        self.assertEqual(len(self.transport._connections), 1)
+
+    def test_auth(self):
+        self.transport.post(self.url, b'{}', auth=HTTPBasicAuth('user', 'secret'))
+        headers = self.master.requests[0][1]
+        self.assertEqual(headers['Authorization'], 'Basic dXNlcjpzZWNyZXQ=')
+
+    def test_retry_closed_connection(self):
+        self.transport.post(self.url + '/close', b'{}')
+        r = self.transport.post(self.url, b'{}')
+        self.assertEqual(r.status_code, 202)
+        self.assertEqual([request[0] for request in self.master.requests], ['/close', '/'])
+
+    def test_no_retry_on_timeout(self):
+        self.transport.timeout = 0.2
+        self.transport.post(self.url, b'{}')
+        with self.assertRaises(socket.timeout):
+            self.transport.post(self.url + '/slow', b'{}')
+        # call may have been processed by master, it is not sent again
+        self.assertEqual([request[0] for request in self.master.requests], ['/', '/slow'])
+
+    def test_no_retry_on_new_connection(self):
+        self.master.shutdown()
+        self.master.server_close()
+        with self.assertRaises(socket.error):
+            self.transport.post(self.url, b'{}')
+
+
+@unittest.skipIf(x509 is None, 'cryptography not installed')
+class TestHTTPTransportVerify(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        (self.certificate, key) = make_certificate(self.directory)
+        self.master = _Master()
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.certificate, key)
+        self.master.socket = context.wrap_socket(self.master.socket, server_side=True)
+        self.url = 'https://127.0.0.1:%d' % (self.master.server_address[1])
+        threading.Thread(target=self.master.serve_forever).start()
+        self.transport = HTTPTransport(timeout=5)
+
+    def tearDown(self):
+        self.transport.close()
+        self.master.shutdown()
+        self.master.server_close()
+        shutil.rmtree(self.directory)
+
+    def test_verify(self):
+        with self.assertRaises(ssl.SSLError):
+            self.transport.post(self.url, b'{}')
+        self.assertEqual(self.transport.post(self.url, b'{}', verify=self.certificate).status_code, 202)
+        self.assertEqual(self.transport.post(self.url, b'{}', verify=False).status_code, 202)
+        # a connection per verify setting
+        self.assertEqual(len(self.transport._connections), 2)
@@ -0,0 +1,108 @@
+import threading
+import unittest
+
+from mesoshttp.exception import MesosException
+from mesoshttp.update import UpdateCoalescer
+from mesoshttp.watch import UpdateDispatcher
+
+
+def update(task_id, state, agent_id=None):
+    status = {'task_id': {'value': task_id}, 'state': state}
+    if agent_id is not None:
+        status['agent_id'] = {'value': agent_id}
+    return {'status': status}
+
+
+class TestUpdateCoalescer(unittest.TestCase):
+
+    def test_latest_update_per_task(self):
+        coalescer = UpdateCoalescer(60)
+        self.assertEqual(coalescer.add(update('T1', 'TASK_STAGING')), [])
+        self.assertEqual(coalescer.add(update('T2', 'TASK_STAGING')), [])
+        self.assertEqual(coalescer.add(update('T1', 'TASK_RUNNING')), [])
+        # window is not over
+        self.assertEqual(coalescer.flush(), [])
+        self.assertEqual(coalescer.flush(force=True), [update('T2', 'TASK_STAGING'), update('T1', 'TASK_RUNNING')])
+        self.assertEqual(coalescer.flush(force=True), [])
+
+    def test_terminal_update_not_delayed(self):
+        coalescer = UpdateCoalescer(60)
+        coalescer.add(update('T1', 'TASK_RUNNING'))
+        coalescer.add(update('T2', 'TASK_RUNNING'))
+        self.assertEqual(coalescer.add(update('T1', 'TASK_FAILED')), [update('T1', 'TASK_FAILED')])
+        # pending update of task is dropped
+        self.assertEqual(coalescer.flush(force=True), [update('T2', 'TASK_RUNNING')])
+
+    def test_window_over(self):
+        coalescer = UpdateCoalescer(0)
+        coalescer.add(update('T1', 'TASK_RUNNING'))
+        self.assertEqual(coalescer.flush(), [update('T1', 'TASK_RUNNING')])
+
+
+class TestUpdateDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.dispatcher = UpdateDispatcher()
+
+    def test_wait_for(self):
+        future = self.dispatcher.wait_for('T1')
+        done = []
+        future.add_done_callback(done.append)
+        self.dispatcher.dispatch(update('T2', 'TASK_RUNNING'))
+        self.dispatcher.dispatch(update('T1', 'TASK_STAGING'))
+        self.assertFalse(future.done())
+        running = update('T1', 'TASK_RUNNING')
+        threading.Timer(0.05, self.dispatcher.dispatch, [running]).start()
+        self.assertIs(future.result(timeout=5), running)
+        self.assertIsNone(future.exception())
+        self.assertEqual(done, [future])
+        # callback added once resolved is called at once
+        future.add_done_callback(done.append)
+        self.assertEqual(done, [future, future])
+
+    def test_wait_for_timeout(self):
+        future = self.dispatcher.wait_for('T1')
+        self.dispatcher.dispatch(update('T1', 'TASK_STAGING'))
+        with self.assertRaises(MesosException):
+            future.result(timeout=0.05)
+        with self.assertRaises(MesosException):
+            future.exception(timeout=0.05)
+
+    def test_wait_for_terminal(self):
+        failed = self.dispatcher.wait_for('T1')
+        finished = self.dispatcher.wait_for('T1', states=['TASK_FINISHED'], fail_on_terminal=False)
+        self.dispatcher.dispatch(update('T1', 'TASK_FAILED'))
+        self.assertIsInstance(failed.exception(timeout=0), MesosException)
+        self.assertRaises(MesosException, failed.result, 0)
+        self.assertFalse(finished.done())
+        self.dispatcher.dispatch(update('T1', 'TASK_FINISHED'))
+        self.assertEqual(finished.result(timeout=0)['status']['state'], 'TASK_FINISHED')
+
+    def test_watch(self):
+        by_task = []
+        by_agent = []
+        by_state = []
+        self.dispatcher.watch_task('T1', by_task.append)
+        self.dispatcher.watch_agent('A1', by_agent.append)
+        self.dispatcher.watch_state('TASK_RUNNING', by_state.append)
+        self.dispatcher.dispatch(update('T1', 'TASK_STAGING', 'A2'))
+        self.dispatcher.dispatch(update('T2', 'TASK_RUNNING', 'A1'))
+        self.assertEqual(len(by_task), 1)
+        self.assertEqual(by_agent, [update('T2', 'TASK_RUNNING', 'A1')])
+        self.assertEqual(by_state, [update('T2', 'TASK_RUNNING', 'A1')])
+        self.assertTrue(self.dispatcher.unwatch_task('T1', by_task.append))
+        self.assertFalse(self.dispatcher.unwatch_task('T1', by_task.append))
+        self.dispatcher.dispatch(update('T1', 'TASK_RUNNING'))
+        self.assertEqual(len(by_task), 1)
+
+    def test_failing_callback(self):
+        called = []
+
+        def fail(update):
+            raise ValueError('callback error')
+
+        self.dispatcher.watch_state('TASK_RUNNING', fail)
+        self.dispatcher.watch_state('TASK_RUNNING', called.append)
+        # other callbacks are called
+        self.assertFalse(self.dispatcher.dispatch(update('T1', 'TASK_RUNNING')))
+        self.assertEqual(len(called), 1)
@@ -0,0 +1,101 @@
+import json
+import os
+import unittest
+
+from mesoshttp.core import MesosContext
+from mesoshttp.workers import WorkerPool
+
+from tests.test_tasks import _RecordingTransport, make_offer
+
+
+def decline_or_exit(offers, decisions):
+    for offer in offers:
+        if offer['id']['value'] == 'O0':
+            os._exit(1)
+        decisions.decline(offer['id']['value'])
+
+
+def accept_nothing(offers, decisions):
+    pass
+
+
+def ignore_update(update, decisions):
+    pass
+
+
+class _ExitedProcess(object):
+
+    pid = 0
+
+    def join(self, timeout=None):
+        pass
+
+
+class _BrokenConnection(object):
+
+    def send(self, data):
+        raise IOError('broken pipe')
+
+    def close(self):
+        pass
+
+
+class TestWorkerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = _RecordingTransport()
+        self.context = MesosContext('http://master', 'F1', 'S1', session=self.transport)
+
+    def declined(self):
+        offer_ids = []
+        for data in self.transport.calls:
+            call = json.loads(data)
+            self.assertEqual(call['type'], 'DECLINE')
+            offer_ids.extend([offer_id['value'] for offer_id in call['decline']['offer_ids']])
+        return sorted(offer_ids)
+
+    def test_decline_undecided(self):
+        pool = WorkerPool(offer_handler=accept_nothing, processes=2)
+        pool.start()
+        try:
+            pool.handle_offers([make_offer(self.context, index) for index in range(3)])
+        finally:
+            pool.stop()
+        self.assertEqual(self.declined(), ['O0', 'O1', 'O2'])
+
+    def test_worker_exit(self):
+        pool = WorkerPool(offer_handler=decline_or_exit, processes=2, decline_undecided=False)
+        pool.start()
+        try:
+            first = pool._workers[0][0]
+            pool.handle_offers([make_offer(self.context, index) for index in range(4)])
+            # offers of exited worker are declined, others are decided by workers
+            self.assertEqual(self.declined(), ['O0', 'O1', 'O2', 'O3'])
+            self.assertEqual(pool._pending, [0, 0])
+            self.assertEqual(pool._offers, {})
+            self.assertNotEqual(pool._workers[0][0].pid, first.pid)
+            self.assertTrue(pool._workers[0][0].is_alive())
+            # restarted worker handles next offers
+            self.transport.calls = []
+            pool.handle_offers([make_offer(self.context, index) for index in range(2, 4)])
+            self.assertEqual(self.declined(), ['O2', 'O3'])
+        finally:
+            pool.stop()
+
+    def test_update_worker_not_restarted(self):
+        pool = WorkerPool(update_handler=ignore_update, processes=1)
+        pool._workers = [(_ExitedProcess(), _BrokenConnection())]
+        pool._pending = [0]
+        pool._sent = [set()]
+        restarted = []
+
+        def start_worker():
+            restarted.append(True)
+            return (_ExitedProcess(), _BrokenConnection())
+
+        pool._WorkerPool__start_worker = start_worker
+        # update is lost, but not counted as pending
+        pool.handle_update({'status': {'task_id': {'value': 'T1'}, 'state': 'TASK_RUNNING'}})
+        self.assertEqual(restarted, [True])
+        self.assertEqual(pool._pending, [0])
+        pool.stop()